@@ -9,6 +9,7 @@ expr="
 /self._remove_reader()/d;
 /^ *async def _poll(/,\$d;
 s/def _poll_s/def _poll/g;
+s/def _wait_readable_s/def _wait_readable/g;
 
 s/await //g;
 s/asyncio.sleep/time.sleep/g;
@@ -20,6 +21,7 @@ s/async for /for /g;
 s/async with /with /g;
 s/anext(/next(/g;
 s/asynccontextmanager/contextmanager/g;
+s/contextlib.aclosing(/contextlib.closing(/g;
 s/AsyncGenerator/Generator/g;
 s/StopAsyncIteration/StopIteration/g;
 s/  # type: ignore\[attr-defined\]//g;
@@ -1,5 +1,7 @@
 from freeiam import errors, ldap
 from freeiam.ldap.constants import Mod
+from freeiam.ldap.ldif import LDIFReader
+from freeiam.ldap.modlist import modify_modlist
 
 
 base_dn = 'dc=freeiam,dc=org'
@@ -74,6 +76,23 @@ async def ldap_modify_user_examples():
             (Mod.Add, 'title', [b'Dr.']),
         ]
         await conn.modify_ml(dn, ml)
+
+        # modify() only sends the differences according to the schema:
+        # unchanged values (e.g. differing only in case) send no request at all
+        # and of large groups only the added and removed members are sent
+        await conn.get_schema()  # loads the matching rules of the attributes
+        group = f'cn=staff,ou=groups,{base_dn}'
+        old = await conn.get(group, attrs=['member'])
+        members = [*old.attr['member'], dn.encode('UTF-8')]
+        print(modify_modlist(old.attr, {'member': members}))
+        await conn.modify(group, old.attr, {'member': members})
+
+        # or record the changes while mutating the attributes, which sends them
+        # without comparing all values, e.g. of groups with many members
+        attrs = (await conn.get(group, attrs=['member'])).attr.track()
+        attrs.add_values('member', [f'uid=erika,{base_dn}'.encode()])
+        attrs.remove_values('member', [dn.encode('UTF-8')])
+        await conn.modify(group, attrs)
         # end MODIFY
 
 
@@ -130,4 +149,28 @@ async def ldap_remove_subtree_recursively_example():
         # start RECURSIVE REMOVE
         dn = f'ou=users,{base_dn}'
         await conn.delete_recursive(dn)
+        # deletes are pipelined level by level, or done by a single request
+        # if the server supports the Tree Delete control
+        await conn.delete_recursive(dn, concurrency=50)
         # end RECURSIVE REMOVE
+
+
+async def ldap_bulk_import_examples():
+    async with ldap.Connection('ldap://localhost:389') as conn:
+        ...  # do bind()
+
+        # start BULK IMPORT
+        # import a LDIF file concurrently, parents are added before their children
+        with LDIFReader.open('/var/backups/people.ldif.gz') as reader:
+            report = await conn.bulk_import(
+                reader,
+                connections=4,
+                concurrency=64,
+                skip_existing=True,  # resume an interrupted import
+            )
+        print(report.applied, 'records applied', report.rate, 'per second')
+        for record, error in report.failed:
+            print('failed', record.dn, error)
+        for record in report.skipped:
+            print('skipped', record.dn)
+        # end BULK IMPORT
@@ -1,5 +1,12 @@
 from freeiam import errors, ldap
-from freeiam.ldap.constants import Scope
+from freeiam.ldap.constants import LDAPChangeType, Scope
+from freeiam.ldap.delta import FileWatermarkStore
+from freeiam.ldap.ldif import LDIFReader
+from freeiam.ldap.membership import GroupGraph
+from freeiam.ldap.pagination import TypeAhead, VLVCursor
+from freeiam.ldap.psearch import ChangeFeed, ChangeType
+from freeiam.ldap.replica import LocalReplica
+from freeiam.ldap.syncrepl import FileCookieStore, SyncEventType
 
 
 async def ldap_search_examples():
@@ -41,6 +48,16 @@ async def ldap_search_examples():
             page_size=10,
         ):
             print(entry.dn, entry.attr, entry.page)
+
+        # request the next page while the current one is consumed, buffer up to 3 pages
+        async for entry in conn.search_paged(
+            search_base,
+            Scope.Subtree,
+            '(&(uid=*)(objectClass=person))',
+            page_size=500,
+            prefetch=3,
+        ):
+            print(entry.dn, entry.attr, entry.page)
         # end PAGEDSEARCH
 
         # start SORTSEARCH
@@ -66,6 +83,20 @@ async def ldap_search_examples():
             print(entry.dn, entry.attr, entry.page)
         # end VLVSEARCH
 
+        # start KEYSETSEARCH
+        # search paginated by a sorted key attribute, resumable after a crash
+        last_uid = None  # e.g. restored from a checkpoint
+        async for entry in conn.search_keyset(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            key_attr='uid',
+            page_size=500,
+            start=last_uid,
+        ):
+            last_uid = entry.attr['uid'][0].decode()
+        # end KEYSETSEARCH
+
         # start GETOBJ
         # get a certain object, and use its attributes
         obj = await conn.get('uid=max.mustermann,dc=freeiam,dc=org')
@@ -81,6 +112,16 @@ async def ldap_search_examples():
         print(cn)
         # end GETATTR
 
+        # start GETMANY
+        # get many objects at once, the searches are pipelined
+        members = await conn.get_attr('cn=admins,ou=groups,dc=freeiam,dc=org', 'member')
+        async for dn, result in conn.get_many(members, ['uid', 'mail'], concurrency=50):
+            if isinstance(result, errors.LdapError):
+                print(dn, 'could not be retrieved:', result)
+                continue
+            print(dn, result.attr)
+        # end GETMANY
+
         # start UNIQUE
         # find unique entry
         try:
@@ -108,3 +149,235 @@ async def ldap_search_examples():
         # or if you just need to know whether a object exists
         await conn.exists('uid=max.mustermann,dc=freeiam,dc=org')
         # end EXISTS
+
+
+async def ldap_vlv_examples():
+    async with ldap.Connection('ldap://localhost:389') as conn:
+        ...  # do bind()
+        search_base = 'dc=freeiam,dc=org'
+
+        # start VLVCURSOR
+        # jump to any page of a sorted result list, e.g. for a UI grid
+        cursor = VLVCursor(
+            search_base,
+            Scope.SUBTREE,
+            '(&(uid=*)(objectClass=person))',
+            sorting=[('uid', 'caseIgnoreOrderingMatch', False)],
+            page_size=50,
+        )
+        for entry in await conn.search_vlv_page(cursor, 400):
+            print(entry.dn, entry.page)
+        print('total pages', cursor.last_page)
+        # or get a window of entries around an offset
+        await conn.search_vlv_window(cursor, 1000, before=5, after=5)
+        # end VLVCURSOR
+
+        # start TYPEAHEAD
+        # autocomplete by seeking the VLV window to the typed prefix
+        type_ahead = TypeAhead(search_base, 'uid', attrs=['cn'], size=10)
+        for typed in ('m', 'ma', 'max'):
+            for entry in await conn.search_type_ahead(type_ahead, typed):
+                print(typed, entry.dn, entry.attr['cn'])
+        # end TYPEAHEAD
+
+
+async def ldap_parallel_examples():
+    async with ldap.Connection('ldap://localhost:389') as conn:
+        ...  # do bind()
+        search_base = 'dc=freeiam,dc=org'
+
+        # start PARALLELSEARCH
+        # split a large subtree search into disjoint partitions, searched concurrently
+        async for entry in conn.search_parallel(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            ['uid'],
+            partition_by='entryUUID',
+            partitions=8,
+            connections=2,
+        ):
+            print(entry.dn)
+        # or split at the children of the search base
+        search = conn.search_parallel(search_base, Scope.SUBTREE, '(uid=*)')
+        async for entry in search:
+            print(entry.dn)
+        # end PARALLELSEARCH
+
+        # start SEARCHMANY
+        # search the same filter below several bases, merged in sort order
+        tenants = ['ou=tenant1,dc=freeiam,dc=org', 'ou=tenant2,dc=freeiam,dc=org']
+        async for entry in conn.search_many(
+            tenants,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            ['uid'],
+            sort_key=[('uid', 'caseIgnoreOrderingMatch', False)],
+        ):
+            print(entry.dn)
+        # end SEARCHMANY
+
+        # start SORTEDSEARCH
+        # sort on the client side if the server rejects server side sorting
+        async for entry in conn.search_sorted(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            ['uid'],
+            sorting=['-uid:caseIgnoreOrderingMatch'],
+            run_size=50_000,  # at most that many entries are kept in memory
+        ):
+            print(entry.dn)
+        # end SORTEDSEARCH
+
+        # start COUNT
+        # count entries without receiving them, e.g. for dashboards
+        users = await conn.count(search_base, Scope.SUBTREE, '(objectClass=person)')
+        print(users)
+        # end COUNT
+
+        # start RANGES
+        # iterate over huge multi valued attributes, which Active Directory
+        # returns in ranges (member;range=0-1499), fetching range by range
+        group = 'cn=Domain Users,cn=Users,dc=freeiam,dc=org'
+        async for member in conn.iter_attr(group, 'member'):
+            print(member)
+        # or fetch all remaining ranges of a search result
+        result = await conn.resolve_ranges(await conn.get(group, ['member']))
+        print(len(result.attr['member']))
+        # end RANGES
+
+        # start GROUPGRAPH
+        # resolve nested group memberships in memory
+        graph = GroupGraph(search_base)
+        await conn.refresh_groups(graph)
+        user = 'uid=max.mustermann,dc=freeiam,dc=org'
+        print(graph.is_member(user, 'cn=admins,dc=freeiam,dc=org'))
+        print(graph.groups_of(user))
+        print(graph.cycles())  # groups nested into each other
+        # later: fetch only the groups modified since the last refresh
+        await conn.refresh_groups(graph)
+        # end GROUPGRAPH
+
+        # start DEREF
+        # get groups together with the uid and mail of their members in one search
+        # (requires a server supporting the Dereference control)
+        async for group in conn.search_iter(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=groupOfNames)',
+            ['cn'],
+            deref={'member': ['uid', 'mail']},
+        ):
+            for member in group.dereferenced.get('member', []):
+                print(group.dn, member.dn, member.attr.get('mail'))
+        # end DEREF
+
+        # start SYNCREPL
+        # keep a local copy up to date via syncrepl (RFC 4533)
+        # the cookie is persisted, so a restart only fetches the changes since then
+        store = FileCookieStore('/var/lib/freeiam/syncrepl.cookie')
+        async for event in conn.syncrepl(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            mode='refreshAndPersist',
+            cookie_store=store,
+        ):
+            if event.type in {SyncEventType.Add, SyncEventType.Modify}:
+                print('changed', event.uuid, event.dn, event.attr)
+            elif event.type == SyncEventType.Delete:
+                print('deleted', event.uuid)
+            elif event.type == SyncEventType.PresentDone:
+                print('delete all entries which were not reported as present')
+        # end SYNCREPL
+
+        # start REPLICA
+        # answer reads of hot authorization data locally
+        replica = LocalReplica(
+            search_base,
+            filter_expr='(|(objectClass=person)(objectClass=groupOfNames))',
+            indexes=['objectClass', 'uid', 'member'],
+            max_staleness=30,
+        )
+        await conn.refresh_replica(replica)
+        # refresh incrementally, e.g. periodically or with persist=True in a task
+        await conn.refresh_replica(replica)
+        user = replica.get(f'uid=max,{search_base}')
+        groups = replica.search(filter_expr=f'(member={user.dn})', attrs=['cn'])
+        print(user.attr, [group.dn for group in groups])
+        # end REPLICA
+
+
+async def ldap_change_examples():
+    async with ldap.Connection('ldap://localhost:389') as conn:
+        ...  # do bind()
+        search_base = 'dc=freeiam,dc=org'
+
+        # start WATCH
+        # watch for changes via a persistent search (not supported by OpenLDAP)
+        # one persistent search is shared by all subscribers of the feed
+        feed = ChangeFeed(
+            conn.watch(
+                search_base,
+                Scope.SUBTREE,
+                '(objectClass=person)',
+                change_types=[LDAPChangeType.Modify, LDAPChangeType.Delete],
+            ),
+            maxsize=100,
+        )
+        async with feed.subscribe() as changes:
+            async for event in changes:
+                if event.type == ChangeType.Resync:
+                    print('connection was lost, the current content follows')
+                print(event.type.name, event.dn, event.attr)
+        # end WATCH
+
+        # start DELTA
+        # export only the entries changed since the last (nightly) run
+        store = FileWatermarkStore('/var/lib/freeiam/watermarks.json')
+        delta = await conn.export_delta(
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            ['uid', 'cn', 'mail'],
+            store=store,
+            overlap=300,  # seconds of tolerated clock skew
+        )
+        for entry in delta.changed:
+            print('changed', entry.dn, entry.attr)
+        for dn in delta.deleted:
+            print('deleted', dn)
+        # end DELTA
+
+        # start CHANGELOG
+        # follow the accesslog overlay, resuming after the last processed record
+        checkpoints = FileCookieStore('/var/lib/freeiam/accesslog.checkpoint')
+        async for record in conn.read_changelog(
+            'cn=accesslog',
+            target=search_base,
+            checkpoint_store=checkpoints,
+            poll_interval=5,
+        ):
+            if record.type == LDAPChangeType.ModifyDN:
+                print('moved', record.dn, record.new_dn)
+            else:
+                print(record.type.name, record.dn, record.modlist)
+        # end CHANGELOG
+
+        # start LDIF
+        # stream a (compressed) LDIF dump of the entries without holding them in memory
+        count = await conn.export_ldif(
+            '/var/backups/people.ldif.gz',
+            search_base,
+            Scope.SUBTREE,
+            '(objectClass=person)',
+            page_size=1000,
+        )
+        print(count, 'entries exported')
+
+        # read the records lazily, e.g. from a memory-mapped file
+        with LDIFReader.open('/var/backups/people.ldif', memory_map=True) as reader:
+            for record in reader:
+                print(record.type.name, record.dn, record.attr)
+        # end LDIF
@@ -35,6 +35,14 @@ class NotUnique(Error):
         return self.args[0]
 
 
+class StaleReplica(Error):
+    """The local replica hasn't been synchronized within the configured staleness bound."""
+
+
+class SubscriberOverflow(Error):
+    """A subscriber didn't consume the change events fast enough and exceeded its queue size."""
+
+
 class LdapError(Error):
     """LDAP Error wrapper base class."""
 
@@ -0,0 +1,23 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""File helpers."""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Replace the file atomically by a temporary file with the text, which is synced to disk before. The temporary file is removed on failure."""
+    temporary: Path | None = None
+    try:
+        with tempfile.NamedTemporaryFile('w', encoding='UTF-8', dir=path.parent, prefix=f'.{path.name}.', delete=False) as fd:
+            temporary = Path(fd.name)
+            fd.write(text)
+            fd.flush()
+            os.fsync(fd.fileno())
+        temporary.replace(path)
+    except BaseException:
+        if temporary is not None:
+            temporary.unlink(missing_ok=True)
+        raise
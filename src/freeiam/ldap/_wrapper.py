@@ -2,10 +2,13 @@
 # SPDX-License-Identifier: MIT OR Apache-2.0
 """Data wrapper."""
 
+import functools
+import typing
 from dataclasses import dataclass
 from typing import Any, Self, TypeAlias
 
 import ldap.controls
+from ldap.controls.deref import DereferenceControl
 
 from freeiam.ldap.attr import Attributes
 from freeiam.ldap.constants import ResponseType
@@ -71,14 +74,25 @@ class _Response:
     """The list of python-ldap decoded response controls."""
 
     name: str | None = None
-    """The OID (responseName) of a extended operation response."""
+    """The OID (responseName) of a extended operation or intermediate response."""
 
     value: bytes | None = None
-    """The raw ASN.1 encoded reponseValue of an extended operation response."""
+    """The raw ASN.1 encoded reponseValue of an extended operation or intermediate response."""
+
+    entry_ctrls: dict[str, LDAPResponseControlList] | None = None
+    """The response controls attached to the individual search entries, by DN."""
 
     def __post_init__(self) -> None:
         if not isinstance(self.type, ResponseType | None):
             self.type = ResponseType(self.type)
+        if self.type == ResponseType.Intermediate and self.data:  # requested with add_intermediates
+            intermediate = typing.cast('list[tuple[str, bytes | None, LDAPResponseControlList]]', self.data)
+            self.name, self.value, self.ctrls = intermediate[0]
+            self.data = []
+        if self.data and len(self.data[0]) == 3:  # noqa: PLR2004  # entries requested with add_ctrls
+            entries = typing.cast('list[tuple[str, dict[str, list[bytes]], LDAPResponseControlList]]', self.data)
+            self.entry_ctrls = {dn: ctrls for dn, _attrs, ctrls in entries if ctrls}
+            self.data = [(dn, attrs) for dn, attrs, _ctrls in entries]
 
 
 @dataclass
@@ -132,9 +146,28 @@ class Result:
     def from_response(
         cls, dn: DN | str | None, attr: dict[str, list[bytes]] | None, controls: Controls | None, response: _Response, **kwargs: Any
     ) -> Self:
+        ctrls = response.ctrls
+        if response.entry_ctrls and isinstance(dn, str) and dn in response.entry_ctrls:
+            ctrls = [*(ctrls or []), *response.entry_ctrls[dn]]
         dn = dn if dn is None else DN.get(dn)
         attrs = attr if attr is None else Attributes(attr)
-        return cls(dn, attrs, cls._control_response(controls, response.ctrls), response, **kwargs)
+        return cls(dn, attrs, cls._control_response(controls, ctrls), response, **kwargs)
+
+    @functools.cached_property
+    def dereferenced(self) -> dict[str, list['Result']]:
+        """
+        The entries referenced by DN valued attributes, as requested via the Dereference control (``search(deref=...)``).
+
+        The control is only decoded for searches requesting it, the results are built on first access.
+        """
+        dereferenced: dict[str, list[Result]] = {}
+        control = self.controls.get(DereferenceControl()) if self.controls is not None else None
+        for attr, entries in (getattr(control, 'derefRes', None) or {}).items():
+            dereferenced[attr] = [
+                Result(DN(dn), Attributes({key: [value.encode('UTF-8') for value in values] for key, values in attrs.items()}), None, self._response)
+                for dn, attrs in entries
+            ]
+        return dereferenced
 
     @classmethod
     def set_controls(cls, response: _Response, controls: Controls | None) -> None:
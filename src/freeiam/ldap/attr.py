@@ -3,17 +3,43 @@
 """LDAP Attributes."""
 
 import contextlib
+import re
 import typing
 
+from freeiam.ldap.constants import Mod
 from freeiam.ldap.schema import Schema
 
 
+_RANGE = re.compile(r'^(?P<attr>[^;]+)(?:;[^;]+)*?;range=(?P<low>\d+)-(?P<high>\d+|\*)(?:;.*)?$', re.IGNORECASE)
+
+
 class Attributes(dict[str, list[bytes]]):  # noqa: FURB189
-    """LDAP Attributes."""
+    """
+    LDAP Attributes.
+
+    After :meth:`track` the mutations via item assignment, ``del``, :meth:`add_values` and :meth:`remove_values`
+    are recorded as modification list in :attr:`changes`, which :meth:`Connection.modify() <freeiam.ldap.connection.Connection.modify>`
+    sends without comparing all values. :meth:`update`, ``|=``, :meth:`setdefault`, :meth:`pop`, :meth:`popitem` and :meth:`clear`
+    are recorded as the item assignments and deletions they consist of. Mutations of the value lists themselves aren't recorded.
+
+    >>> attrs = Attributes({'cn': [b'Max'], 'member': [b'uid=a', b'uid=b'], 'mail': [b'max@freeiam.org']}).track()
+    >>> attrs.add_values('member', [b'uid=c'])
+    >>> attrs.remove_values('Member', [b'uid=a'])
+    >>> attrs['CN'] = [b'Moritz']
+    >>> del attrs['mail']
+    >>> attrs
+    {'cn': [b'Moritz'], 'member': [b'uid=b', b'uid=c']}
+    >>> attrs.changes[:2]
+    [(<Mod.Add: 0>, 'member', [b'uid=c']), (<Mod.Delete: 1>, 'member', [b'uid=a'])]
+    >>> attrs.changes[2:]
+    [(<Mod.Replace: 2>, 'cn', [b'Moritz']), (<Mod.Delete: 1>, 'mail', None)]
+    """
 
     ALIASES: typing.ClassVar[dict[str, str]] = {}
     SCHEMA: Schema | None = None
 
+    _changes: list[tuple[Mod, str, list[bytes] | None]] | None = None
+
     def __getitem__(self, key: str) -> list[bytes]:
         with contextlib.suppress(KeyError):
             return super().__getitem__(key)
@@ -23,8 +49,158 @@ class Attributes(dict[str, list[bytes]]):  # noqa: FURB189
         key = self.ALIASES.get(key, key)
         return {k.lower(): v for k, v in self.items()}[key.lower()]
 
+    def __setitem__(self, key: str, values: list[bytes]) -> None:
+        if self._changes is None:
+            super().__setitem__(key, values)
+            return
+        key = self._name(key)
+        super().__setitem__(key, values)
+        self._discard(key)
+        self._changes.append((Mod.Replace, key, list(values)))
+
+    def __delitem__(self, key: str) -> None:
+        if self._changes is None:
+            super().__delitem__(key)
+            return
+        key = self._name(key)
+        super().__delitem__(key)
+        # replacing with no values deletes the attribute also if it has only been added by the discarded changes
+        self._changes.append((Mod.Replace if self._discard(key) else Mod.Delete, key, None))
+
+    def __ior__(self, other: typing.Any) -> typing.Self:  # type: ignore[override,misc]
+        self.update(other)
+        return self
+
+    def update(self, *args: typing.Any, **kwargs: list[bytes]) -> None:
+        """Update the attributes, recorded as replacement of each given attribute."""
+        if self._changes is None:
+            super().update(*args, **kwargs)
+            return
+        for key, values in dict(*args, **kwargs).items():
+            self[key] = values
+
+    def setdefault(self, key: str, default: list[bytes]) -> list[bytes]:
+        """Get the values of an attribute, which is set to ``default`` if it doesn't exist (recorded as replacement)."""
+        if self._changes is None:
+            return super().setdefault(key, default)
+        key = self._name(key)
+        if key not in self:
+            self[key] = default
+        return super().__getitem__(key)
+
+    def pop(self, key: str, *default: typing.Any) -> typing.Any:
+        """Remove an attribute and get its values, recorded as deletion."""
+        if self._changes is None:
+            return super().pop(key, *default)
+        key = self._name(key)
+        if key not in self:
+            return super().pop(key, *default)
+        values = super().__getitem__(key)
+        del self[key]
+        return values
+
+    def popitem(self) -> tuple[str, list[bytes]]:
+        """Remove the last attribute and get its name and values, recorded as deletion."""
+        if self._changes is None:
+            return super().popitem()
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def clear(self) -> None:
+        """Remove all attributes, recorded as deletion of each attribute."""
+        if self._changes is None:
+            super().clear()
+            return
+        for key in list(self):
+            del self[key]
+
+    @property
+    def tracking(self) -> bool:
+        """Whether mutations are recorded."""
+        return self._changes is not None
+
+    @property
+    def changes(self) -> list[tuple[Mod, str, list[bytes] | None]]:
+        """Get the modification list of the recorded mutations."""
+        return [] if self._changes is None else list(self._changes)
+
+    def track(self) -> typing.Self:
+        """Start recording mutations, discarding the already recorded ones."""
+        self._changes = []
+        return self
+
+    def add_values(self, key: str, values: list[bytes]) -> None:
+        """Add values to an attribute by extending its value list in place, without checking whether they exist already."""
+        key = self._name(key)
+        super().setdefault(key, []).extend(values)
+        if self._changes is not None:
+            self._record(Mod.Add, key, values)
+
+    def remove_values(self, key: str, values: list[bytes]) -> None:
+        """Remove values from an attribute, which is removed if no values remain."""
+        key = self._name(key)
+        removed = set(values)
+        remaining = [value for value in self.get(key, []) if value not in removed]
+        if remaining:
+            super().__setitem__(key, remaining)
+        else:
+            super().pop(key, None)
+        if self._changes is not None:
+            self._record(Mod.Delete, key, values)
+
+    def _name(self, key: str) -> str:
+        """Get the name of an existing attribute (case insensitive), or else the given name."""
+        if key in self:
+            return key
+        lower = self.ALIASES.get(key, key).lower()
+        return next((name for name in self if self.ALIASES.get(name, name).lower() == lower), key)
+
+    def _record(self, op: Mod, key: str, values: list[bytes]) -> None:
+        changes = typing.cast('list[tuple[Mod, str, list[bytes] | None]]', self._changes)
+        if changes and changes[-1][:2] == (op, key) and changes[-1][2] is not None:  # merge consecutive changes
+            changes[-1][2].extend(values)
+        else:
+            changes.append((op, key, list(values)))
+
+    def _discard(self, key: str) -> bool:
+        """Discard the recorded changes of an attribute, which are obsolete after replacing or deleting it."""
+        changes = typing.cast('list[tuple[Mod, str, list[bytes] | None]]', self._changes)
+        count = len(changes)
+        changes[:] = [change for change in changes if change[1] != key]
+        return len(changes) != count
+
     @classmethod
     def set_schema(cls, subschema: Schema) -> None:
         """Set aliases from schema."""
         cls.SCHEMA = subschema
         cls.ALIASES.update(subschema.get_attribute_aliases())
+
+    def get_range(self, key: str) -> tuple[list[bytes], int | None] | None:
+        """
+        Get the values of an attribute returned via range retrieval (e.g. ``member;range=0-1499`` by Active Directory).
+
+        Returns the values together with the start of the next range, which is ``None`` if these are the last values.
+        Returns ``None`` if the attribute isn't returned in ranges.
+
+        >>> Attributes({'member;range=0-1': [b'a', b'b']}).get_range('member')
+        ([b'a', b'b'], 2)
+        >>> Attributes({'member;range=2-*': [b'c']}).get_range('Member')
+        ([b'c'], None)
+        >>> Attributes({'member': [b'a']}).get_range('member') is None
+        True
+        """
+        key = self.ALIASES.get(key, key).lower()
+        for name, values in self.items():
+            match = _RANGE.match(name)
+            if match and self.ALIASES.get(match['attr'], match['attr']).lower() == key:
+                return values, None if match['high'] == '*' else int(match['high']) + 1
+        return None
+
+    def ranged(self) -> list[str]:
+        """
+        Get the names of the attributes returned via range retrieval.
+
+        >>> Attributes({'cn': [b'x'], 'member;range=0-1499': [b'a']}).ranged()
+        ['member']
+        """
+        return [match['attr'] for name in self if (match := _RANGE.match(name))]
@@ -0,0 +1,314 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Dependency aware bulk imports."""
+
+import heapq
+import itertools
+import time
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from freeiam import errors
+from freeiam.ldap._wrapper import Result
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.ldif import ChangeRecord, Modification
+
+
+__all__ = ('RETRYABLE_ERRORS', 'BulkImport', 'ImportGraph', 'ImportReport', 'as_change_record')
+
+RETRYABLE_ERRORS: tuple[type[errors.LdapError], ...] = (
+    errors.Busy,
+    errors.Unavailable,
+    errors.UnwillingToPerform,
+    errors.Timeout,
+    errors.NoSuchObject,
+    errors.NotAllowedOnNonleaf,
+    errors.ServerDown,
+    errors.ConnectError,
+)
+"""Errors after which a record is retried, e.g. because its parent is added later or the server is overloaded."""
+
+
+def as_change_record(record: ChangeRecord | Result) -> ChangeRecord:
+    """Get the change record adding the entry of a search result."""
+    if isinstance(record, ChangeRecord):
+        return record
+    if record.dn is None:
+        msg = 'Search results without DN cannot be imported'
+        raise ValueError(msg)
+    modlist: list[Modification] = [(Mod.Add, attr, list(values)) for attr, values in (record.attr or {}).items()]
+    return ChangeRecord('', LDAPChangeType.Add, record.dn, modlist)
+
+
+@dataclass
+class ImportReport:
+    """The outcome of a bulk import."""
+
+    applied: int = 0
+    """The number of successfully applied records."""
+
+    existing: int = 0
+    """The number of added entries which existed already (if they are skipped)."""
+
+    failed: list[tuple[ChangeRecord, Exception]] = field(default_factory=list)
+    """The records which failed permanently, with their last error."""
+
+    skipped: list[ChangeRecord] = field(default_factory=list)
+    """The records which weren't applied, because the entry or one of its superiors couldn't be added."""
+
+    retries: int = 0
+    """The number of retried operations."""
+
+    duration: float = 0.0
+    """The duration of the import in seconds."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether all records have been applied."""
+        return not self.failed and not self.skipped
+
+    @property
+    def rate(self) -> float:
+        """The number of applied records per second."""
+        return self.applied / self.duration if self.duration else 0.0
+
+
+class ImportGraph:
+    """
+    The parent to child dependencies of the records of a bulk import.
+
+    The records of a DN are applied in order, one after another.
+    The records of a DN become ready after all records of its parent DN are done, if the parent is part of the import.
+    Records whose parent isn't part of the import are ready immediately, the parent is expected to exist.
+    If the parent is added after its children have been dispatched, the children fail and can :meth:`wait` for it.
+    Deletions are reversed: a parent is deleted after the records of its children which are part of the import are done.
+
+    >>> graph = ImportGraph()
+    >>> for dn in ('ou=people,dc=freeiam,dc=org', 'cn=child,ou=people,dc=freeiam,dc=org'):
+    ...     graph.add(ChangeRecord('', LDAPChangeType.Add, DN(dn)))
+    >>> parent = graph.pop()
+    >>> str(parent.dn), graph.pop()
+    ('ou=people,dc=freeiam,dc=org', None)
+    >>> graph.done(parent)
+    >>> str(graph.pop().dn)
+    'cn=child,ou=people,dc=freeiam,dc=org'
+    """
+
+    __slots__ = ('_children', '_deleting', '_pending_children', '_queued', '_ready', '_size')
+
+    def __init__(self) -> None:
+        self._queued: dict[DN, deque[ChangeRecord]] = {}
+        self._children: dict[DN, list[DN]] = {}
+        self._pending_children: dict[DN, int] = {}
+        self._deleting: set[DN] = set()
+        self._ready: deque[ChangeRecord] = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Get the number of records which aren't done yet."""
+        return self._size
+
+    def add(self, record: ChangeRecord) -> None:
+        """Add a record."""
+        queue = self._queued.setdefault(record.dn, deque())
+        queue.append(record)
+        self._size += 1
+        if len(queue) == 1:
+            if record.dn.parent is not None:
+                self._pending_children[record.dn.parent] = self._pending_children.get(record.dn.parent, 0) + 1
+            self._schedule(record.dn)
+
+    def pop(self) -> ChangeRecord | None:
+        """Get the next ready record."""
+        while self._ready:
+            record = self._ready.popleft()
+            if not self.wait_children(record):
+                return record
+        return None
+
+    def wait(self, record: ChangeRecord) -> bool:
+        """Let a record, which failed because its parent doesn't exist yet, wait for its parent, if the parent is part of the import."""
+        parent = record.dn.parent
+        if parent is None or parent not in self._queued:
+            return False
+        self._children.setdefault(parent, []).append(record.dn)
+        return True
+
+    def wait_children(self, record: ChangeRecord) -> bool:
+        """Let a deletion wait for the records of the children of the entry, if any of them are part of the import."""
+        if record.type != LDAPChangeType.Delete or not self._pending_children.get(record.dn):
+            return False
+        self._deleting.add(record.dn)
+        return True
+
+    def done(self, record: ChangeRecord) -> None:
+        """Mark the record as done, the following record of the DN or the waiting children become ready."""
+        queue = self._queued[record.dn]
+        queue.popleft()
+        self._size -= 1
+        if queue:
+            self._schedule(record.dn)
+            if queue[0].type == LDAPChangeType.Delete:  # the children are applied before the parent is deleted
+                self._release(record.dn)
+            return
+        self._remove(record.dn)
+
+    def fail(self, record: ChangeRecord) -> list[ChangeRecord]:
+        """Remove a record whose entry couldn't be added, returns the following records of the DN and of its descendants which are skipped."""
+        skipped: list[ChangeRecord] = []
+        self._queued[record.dn].popleft()
+        self._size -= 1
+        dns = [record.dn]
+        while dns:
+            dn = dns.pop()
+            skipped.extend(self._queued.get(dn, ()))
+            dns.extend(self._children.pop(dn, []))
+            if dn in self._queued:
+                self._remove(dn)
+        self._size -= len(skipped)
+        return skipped
+
+    def _schedule(self, dn: DN) -> None:
+        record = self._queued[dn][0]
+        parent = dn.parent
+        if (
+            record.type != LDAPChangeType.Delete
+            and parent is not None
+            and parent in self._queued
+            and self._queued[parent][0].type != LDAPChangeType.Delete
+        ):
+            self._children.setdefault(parent, []).append(dn)
+        else:
+            self._ready.append(record)
+
+    def _release(self, dn: DN) -> None:
+        for child in self._children.pop(dn, []):
+            if child in self._queued:
+                self._schedule(child)
+
+    def _remove(self, dn: DN) -> None:
+        """Remove the DN whose records are done, a deletion of its parent becomes ready after the last child."""
+        del self._queued[dn]
+        self._release(dn)
+        parent = dn.parent
+        if parent is None or parent not in self._pending_children:
+            return
+        self._pending_children[parent] -= 1
+        if self._pending_children[parent]:
+            return
+        del self._pending_children[parent]
+        if parent in self._deleting and parent in self._queued:
+            self._deleting.discard(parent)
+            self._ready.append(self._queued[parent][0])
+
+
+class BulkImport:
+    """
+    The state of a bulk import: reads the records ahead into an :class:`ImportGraph`, schedules retries and collects the report.
+
+    Up to ``window`` records are read ahead. Records failing with one of the :data:`RETRYABLE_ERRORS` are retried up to ``max_attempts`` times
+    with an exponential backoff starting at ``backoff`` seconds.
+    Records which failed because their parent was added after them wait for their parent instead.
+    With ``skip_existing`` already existing entries don't count as failure.
+
+    >>> records = [ChangeRecord('', LDAPChangeType.Add, DN(dn)) for dn in ('ou=people,dc=freeiam,dc=org', 'cn=max,ou=people,dc=freeiam,dc=org')]
+    >>> bulk = BulkImport(records)
+    >>> record, attempt = bulk.next()
+    >>> bulk.next()
+    >>> bulk.complete(record, attempt, None)
+    >>> record, attempt = bulk.next()
+    >>> bulk.complete(record, attempt, None)
+    >>> bulk.finished, bulk.report.applied
+    (True, 2)
+    """
+
+    __slots__ = (
+        '_delayed',
+        '_ready',
+        '_sequence',
+        '_source',
+        '_started',
+        'backoff',
+        'graph',
+        'max_attempts',
+        'max_backoff',
+        'report',
+        'skip_existing',
+        'window',
+    )
+
+    def __init__(
+        self,
+        records: Iterable[ChangeRecord | Result],
+        *,
+        window: int = 10_000,
+        max_attempts: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        skip_existing: bool = False,
+    ) -> None:
+        if window <= 0:
+            msg = 'The window must be positive'
+            raise ValueError(msg)
+        self.window = window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.skip_existing = skip_existing
+        self.graph = ImportGraph()
+        self.report = ImportReport()
+        self._source = iter(records)
+        self._ready: deque[tuple[ChangeRecord, int]] = deque()
+        self._delayed: list[tuple[float, int, ChangeRecord, int]] = []
+        self._sequence = itertools.count()
+        self._started = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        """Whether all records are done."""
+        self._read_ahead()
+        return not self.graph
+
+    @property
+    def delay(self) -> float | None:
+        """Get the seconds until the next retry is due."""
+        return max(self._delayed[0][0] - time.monotonic(), 0) if self._delayed else None
+
+    def next(self) -> tuple[ChangeRecord, int] | None:
+        """Get the next record which can be applied, together with the number of the attempt."""
+        self._read_ahead()
+        while self._delayed and self._delayed[0][0] <= time.monotonic():
+            _due, _, retry, attempt = heapq.heappop(self._delayed)
+            self._ready.append((retry, attempt))
+        if self._ready:
+            return self._ready.popleft()
+        record = self.graph.pop()
+        return None if record is None else (record, 1)
+
+    def complete(self, record: ChangeRecord, attempt: int, error: Exception | None) -> None:
+        """Handle the outcome of applying a record."""
+        if error is None or (self.skip_existing and record.type == LDAPChangeType.Add and isinstance(error, errors.AlreadyExists)):
+            self.report.applied += error is None
+            self.report.existing += error is not None
+            self.graph.done(record)
+        elif (isinstance(error, errors.NoSuchObject) and self.graph.wait(record)) or (
+            isinstance(error, errors.NotAllowedOnNonleaf) and self.graph.wait_children(record)
+        ):
+            return
+        elif isinstance(error, RETRYABLE_ERRORS) and attempt < self.max_attempts:
+            self.report.retries += 1
+            due = time.monotonic() + min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+            heapq.heappush(self._delayed, (due, next(self._sequence), record, attempt + 1))
+        else:
+            self.report.failed.append((record, error))
+            if record.type == LDAPChangeType.Add:
+                self.report.skipped.extend(self.graph.fail(record))
+            else:
+                self.graph.done(record)
+        self.report.duration = time.monotonic() - self._started
+
+    def _read_ahead(self) -> None:
+        while len(self.graph) < self.window and (record := next(self._source, None)) is not None:
+            self.graph.add(as_change_record(record))
@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Change records of the OpenLDAP accesslog overlay and of retro changelogs."""
+
+import itertools
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Literal, TypeAlias, cast
+
+from freeiam.ldap._wrapper import Result
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.ldif import ChangeRecord, Modification, parse_modlist, unfold
+
+
+__all__ = (
+    'ACCESSLOG',
+    'CHANGELOGS',
+    'RETRO_CHANGELOG',
+    'Changelog',
+    'ChangelogKind',
+    'decode_accesslog',
+    'decode_changelog',
+)
+
+ChangelogKind: TypeAlias = Literal['accesslog', 'changelog']
+
+_CHANGE_TYPES = {
+    'add': LDAPChangeType.Add,
+    'delete': LDAPChangeType.Delete,
+    'modify': LDAPChangeType.Modify,
+    'modrdn': LDAPChangeType.ModifyDN,
+    'moddn': LDAPChangeType.ModifyDN,
+}
+_ACCESSLOG_OPERATIONS = {b'+': Mod.Add, b'-': Mod.Delete, b'=': Mod.Replace, b'#': Mod.Increment}
+
+
+def _values(attrs: Attributes, attr: str) -> list[bytes]:
+    try:
+        return attrs[attr]
+    except KeyError:
+        return []
+
+
+def _value(attrs: Attributes, attr: str) -> str | None:
+    values = _values(attrs, attr)
+    return values[0].decode('UTF-8') if values else None
+
+
+def _parse_req_mods(values: list[bytes]) -> list[Modification]:
+    """
+    Parse the ``reqMod`` values of the accesslog overlay, which have the form ``attr:<op> value``.
+
+    >>> _parse_req_mods([b'cn:= foo', b'mail:+ a@freeiam.org', b'mail:+ b@freeiam.org', b'description:-'])
+    [(<Mod.Replace: 2>, 'cn', [b'foo']), (<Mod.Add: 0>, 'mail', [b'a@freeiam.org', b'b@freeiam.org']), (<Mod.Delete: 1>, 'description', None)]
+    """
+    mods = []
+    for value in values:
+        attr, _, operation = value.partition(b':')
+        if (mod := _ACCESSLOG_OPERATIONS.get(operation[:1])) is not None:
+            mods.append((mod, attr.decode('UTF-8'), operation[2:] if len(operation) > 1 else None))
+    modlist: list[Modification] = []
+    for (mod, _attr, has_values), group in itertools.groupby(mods, key=lambda change: (change[0], change[1].lower(), change[2] is not None)):
+        changes = list(group)
+        if has_values:
+            modlist.append((mod, changes[0][1], [cast('bytes', value) for _, _, value in changes]))
+        else:
+            modlist.extend((mod, attr, None) for _, attr, _ in changes)
+    return modlist
+
+
+def decode_accesslog(result: Result) -> ChangeRecord | None:
+    """Get the change record of an entry of the OpenLDAP accesslog overlay, ``None`` if it isn't a write operation."""
+    attrs = result.attr or Attributes()
+    checkpoint = _value(attrs, 'reqStart')
+    change_type = _CHANGE_TYPES.get((_value(attrs, 'reqType') or '').lower())
+    dn = _value(attrs, 'reqDN')
+    if checkpoint is None or change_type is None or dn is None:
+        return None
+    new_superior = _value(attrs, 'reqNewSuperior')
+    return ChangeRecord(
+        checkpoint,
+        change_type,
+        DN(dn),
+        _parse_req_mods(_values(attrs, 'reqMod')),
+        _value(attrs, 'reqNewRDN'),
+        (_value(attrs, 'reqDeleteOldRDN') or '').upper() == 'TRUE',
+        DN(new_superior) if new_superior else None,
+        checkpoint,
+        _value(attrs, 'reqAuthzID'),
+    )
+
+
+def decode_changelog(result: Result) -> ChangeRecord | None:
+    """Get the change record of an entry of a retro changelog (``cn=changelog``)."""
+    attrs = result.attr or Attributes()
+    checkpoint = _value(attrs, 'changeNumber')
+    change_type = _CHANGE_TYPES.get((_value(attrs, 'changeType') or '').lower())
+    dn = _value(attrs, 'targetDN')
+    if checkpoint is None or change_type is None or dn is None:
+        return None
+    new_superior = _value(attrs, 'newSuperior')
+    changes = _values(attrs, 'changes')
+    return ChangeRecord(
+        checkpoint,
+        change_type,
+        DN(dn),
+        parse_modlist(unfold(changes[0]), change_type) if changes else [],
+        _value(attrs, 'newRDN'),
+        (_value(attrs, 'deleteOldRDN') or '').upper() == 'TRUE',
+        DN(new_superior) if new_superior else None,
+        _value(attrs, 'changeTime'),
+        _value(attrs, 'changeInitiatorsName'),
+    )
+
+
+@dataclass(frozen=True)
+class Changelog:
+    """How to read the records of a kind of changelog."""
+
+    key_attr: str
+    """The attribute giving the position of a record."""
+
+    filter_expr: str
+    """The filter matching the records of write operations."""
+
+    attrs: list[str]
+    """The attributes of a record."""
+
+    decode: Callable[[Result], ChangeRecord | None]
+    """Get the change record of a search result."""
+
+    order: Callable[[str], Any]
+    """Get the sort key of a checkpoint."""
+
+
+ACCESSLOG = Changelog(
+    'reqStart',
+    '(&(objectClass=auditWriteObject)(reqResult=0))',
+    ['reqStart', 'reqType', 'reqDN', 'reqMod', 'reqNewRDN', 'reqDeleteOldRDN', 'reqNewSuperior', 'reqAuthzID'],
+    decode_accesslog,
+    str,
+)
+"""The accesslog overlay of OpenLDAP (``cn=accesslog``)."""
+
+RETRO_CHANGELOG = Changelog(
+    'changeNumber',
+    '(objectClass=changeLogEntry)',
+    ['changeNumber', 'targetDN', 'changeType', 'changes', 'newRDN', 'deleteOldRDN', 'newSuperior', 'changeTime', 'changeInitiatorsName'],
+    decode_changelog,
+    int,
+)
+"""A retro changelog (``cn=changelog``) e.g. of 389 Directory Server."""
+
+CHANGELOGS: dict[ChangelogKind, Changelog] = {'accesslog': ACCESSLOG, 'changelog': RETRO_CHANGELOG}
@@ -25,17 +25,23 @@ from ldap.controls.simple import (
     ManageDSAITControl,
     ProxyAuthzControl,
     RelaxRulesControl,
+    ValueLessRequestControl,
 )
 
 # from ldap.controls.libldap import SimplePagedResultsControl
 from ldap.controls.sss import SSSRequestControl
 from ldap.controls.vlv import VLVRequestControl, VLVResponseControl
+from ldap.syncrepl import SyncRequestControl, SyncStateControl
 
 from freeiam.ldap._wrapper import Controls
 from freeiam.ldap.constants import LDAPChangeType
 from freeiam.ldap.dn import DN
 
 
+TREE_DELETE_OID = '1.2.840.113556.1.4.805'
+ENTRY_CONTROL_REQUESTS = frozenset({DereferenceControl.controlType, PersistentSearchControl.controlType, SyncRequestControl.controlType})
+"""The request controls whose response controls are attached to the individual search entries."""
+
 __all__ = (
     'Controls',
     'assertion',
@@ -53,6 +59,8 @@ __all__ = (
     'server_side_sorting',
     'session_tracking',
     'simple_paged_results',
+    'sync_request',
+    'tree_delete',
     'virtual_list_view',
 )
 
@@ -154,6 +162,15 @@ def persistent_search(
 persistent_search.response = EntryChangeNotificationControl
 
 
+@_control
+def sync_request(cookie: str | None = None, mode: str = 'refreshOnly', *, reload_hint: bool = False, criticality: bool = True) -> SyncRequestControl:
+    """SyncRequest control (RFC 4533)."""
+    return SyncRequestControl(criticality, cookie, mode, reload_hint)
+
+
+sync_request.response = SyncStateControl
+
+
 def pre_read(attrs: list[str], *, criticality: bool = False) -> PreReadControl:
     """PreRead control."""
     return PreReadControl(criticality, attrs)
@@ -179,6 +196,11 @@ def relax_rules(*, criticality: bool = False) -> RelaxRulesControl:
     return RelaxRulesControl(criticality)
 
 
+def tree_delete(*, criticality: bool = False) -> ValueLessRequestControl:
+    """Tree Delete control (e.g. supported by Active Directory)."""
+    return ValueLessRequestControl(TREE_DELETE_OID, criticality)
+
+
 def proxy_authorization(authz_id: str | DN, *, criticality: bool = False) -> ProxyAuthzControl:
     """ProxyAuthz control."""
     authz_id = f'dn:{authz_id}' if isinstance(authz_id, DN) else authz_id
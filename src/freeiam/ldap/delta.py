@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Incremental delta exports via ``modifyTimestamp`` watermarks."""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from freeiam.ldap._files import write_atomic
+from freeiam.ldap._wrapper import Result
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.dn import DN
+
+
+__all__ = ('Delta', 'FileWatermarkStore', 'Watermark', 'WatermarkStore')
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """The state of the last delta export of a base and filter."""
+
+    timestamp: float
+    """The (client) time in seconds since the epoch up to which the changes have been exported."""
+
+    dns: frozenset[DN] | None = None
+    """The DNs of the exported entries, used to detect deletions."""
+
+
+@dataclass(frozen=True)
+class Delta:
+    """The result of a delta export."""
+
+    changed: list[Result] = field(default_factory=list)
+    """The entries added or modified since the last export (including the overlap)."""
+
+    deleted: set[DN] = field(default_factory=set)
+    """The DNs of the entries deleted (or not matching the filter anymore) since the last export."""
+
+    watermark: Watermark | None = None
+    """The new watermark."""
+
+    full: bool = False
+    """Whether this was a full export, because there was no watermark yet."""
+
+
+class WatermarkStore:
+    """
+    Stores the watermarks of delta exports in memory, per base, scope and filter.
+
+    >>> store = WatermarkStore()
+    >>> store.set('dc=freeiam,dc=org', Scope.SUBTREE, '(objectClass=person)', Watermark(1735689600.0))
+    >>> store.get('dc=freeiam,dc=org', Scope.SUBTREE, '(objectClass=person)')
+    Watermark(timestamp=1735689600.0, dns=None)
+    """
+
+    __slots__ = ('_watermarks',)
+
+    def __init__(self) -> None:
+        self._watermarks: dict[str, Watermark] = {}
+
+    @staticmethod
+    def key(base: DN | str, scope: Scope, filter_expr: str) -> str:
+        """Get the key of a base, scope and filter."""
+        return f'{int(scope)}:{DN.normalize(base)}:{filter_expr}'
+
+    def get(self, base: DN | str, scope: Scope, filter_expr: str) -> Watermark | None:
+        """Get the watermark of the last export."""
+        return self._watermarks.get(self.key(base, scope, filter_expr))
+
+    def set(self, base: DN | str, scope: Scope, filter_expr: str, watermark: Watermark | None) -> None:
+        """Store the watermark, ``None`` forgets it so that the next export is a full export."""
+        key = self.key(base, scope, filter_expr)
+        if watermark is None:
+            self._watermarks.pop(key, None)
+        else:
+            self._watermarks[key] = watermark
+
+
+class FileWatermarkStore(WatermarkStore):
+    """Stores the watermarks of delta exports in a JSON file, which is replaced atomically."""
+
+    __slots__ = ('path',)
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        super().__init__()
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text('UTF-8'))
+        except FileNotFoundError:
+            data = {}
+        for key, value in data.items():
+            dns = value.get('dns')
+            self._watermarks[key] = Watermark(value['timestamp'], None if dns is None else frozenset(DN(dn) for dn in dns))
+
+    def set(self, base: DN | str, scope: Scope, filter_expr: str, watermark: Watermark | None) -> None:
+        """Store the watermark and write the file."""
+        super().set(base, scope, filter_expr, watermark)
+        data = {
+            key: {'timestamp': value.timestamp, 'dns': None if value.dns is None else sorted(map(str, value.dns))}
+            for key, value in self._watermarks.items()
+        }
+        write_atomic(self.path, json.dumps(data))
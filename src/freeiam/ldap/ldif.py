@@ -0,0 +1,502 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Streaming LDIF (:rfc:`2849`) writer and reader."""
+
+import base64
+import binascii
+import gzip
+import mmap
+import os
+import re
+from collections.abc import AsyncIterable, Collection, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Self, TypeAlias
+from urllib.parse import unquote, urlparse
+
+from freeiam.ldap._wrapper import Result
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.schema import Schema
+
+
+__all__ = (
+    'BINARY_SYNTAXES',
+    'ChangeRecord',
+    'LDIFReader',
+    'LDIFWriter',
+    'Modification',
+    'needs_base64',
+    'parse_modlist',
+    'unfold',
+)
+
+Modification: TypeAlias = tuple[Mod, str, list[bytes] | None]
+
+BINARY_SYNTAXES = frozenset({
+    '1.3.6.1.4.1.1466.115.121.1.4',  # Audio
+    '1.3.6.1.4.1.1466.115.121.1.5',  # Binary
+    '1.3.6.1.4.1.1466.115.121.1.8',  # Certificate
+    '1.3.6.1.4.1.1466.115.121.1.9',  # Certificate List
+    '1.3.6.1.4.1.1466.115.121.1.10',  # Certificate Pair
+    '1.3.6.1.4.1.1466.115.121.1.23',  # Fax
+    '1.3.6.1.4.1.1466.115.121.1.28',  # JPEG
+    '1.3.6.1.4.1.1466.115.121.1.40',  # Octet String
+    '1.3.6.1.4.1.1466.115.121.1.49',  # Supported Algorithm
+})
+"""The OIDs of syntaxes whose values are always base64 encoded."""
+
+_CHANGE_TYPES = {
+    b'add': LDAPChangeType.Add,
+    b'delete': LDAPChangeType.Delete,
+    b'modify': LDAPChangeType.Modify,
+    b'modrdn': LDAPChangeType.ModifyDN,
+    b'moddn': LDAPChangeType.ModifyDN,
+}
+_CHANGE_TYPE_NAMES = {LDAPChangeType.Add: 'add', LDAPChangeType.Delete: 'delete', LDAPChangeType.Modify: 'modify', LDAPChangeType.ModifyDN: 'modrdn'}
+_OPERATIONS = {b'add': Mod.Add, b'delete': Mod.Delete, b'replace': Mod.Replace, b'increment': Mod.Increment}
+_OPERATION_NAMES = {Mod.Add: 'add', Mod.Delete: 'delete', Mod.Replace: 'replace', Mod.Increment: 'increment'}
+_UNSAFE = re.compile(rb'(^[\x00\n\r :<])|[\x00\n\r\x80-\xff]|( $)')
+
+
+@dataclass(frozen=True)
+class ChangeRecord:
+    """A change of an entry, e.g. a write operation recorded in a changelog or an LDIF record."""
+
+    checkpoint: str
+    """The position of the record, e.g. ``reqStart``, ``changeNumber`` or the offset in an LDIF file."""
+
+    type: LDAPChangeType
+    """The type of the change."""
+
+    dn: DN
+    """The DN of the changed entry (before a ``ModifyDN`` change)."""
+
+    modlist: list[Modification] = field(default_factory=list)
+    """The modifications, for added entries an ``Add`` modification per attribute. ``None`` values delete or replace all values."""
+
+    new_rdn: str | None = None
+    """The new RDN of a ``ModifyDN`` change."""
+
+    delete_old_rdn: bool = False
+    """Whether the old RDN values are deleted by a ``ModifyDN`` change."""
+
+    new_superior: DN | None = None
+    """The new superior of a ``ModifyDN`` change, if the entry is moved."""
+
+    time: str | None = None
+    """The time of the change (generalized time)."""
+
+    author: str | None = None
+    """The identity which performed the change, if recorded."""
+
+    @property
+    def attr(self) -> Attributes:
+        """The attributes of an added entry."""
+        attrs = Attributes()
+        for mod, attr, values in self.modlist:
+            if mod == Mod.Add and values:
+                attrs.setdefault(attr, []).extend(values)
+        return attrs
+
+    @property
+    def new_dn(self) -> DN | None:
+        """The DN after a ``ModifyDN`` change."""
+        if self.type != LDAPChangeType.ModifyDN or self.new_rdn is None:
+            return None
+        superior = self.new_superior if self.new_superior is not None else self.dn.parent
+        return DN(self.new_rdn) if superior is None else DN(self.new_rdn) + superior
+
+
+def needs_base64(value: bytes) -> bool:
+    r"""
+    Check if a value isn't a SAFE-STRING and must be base64 encoded.
+
+    >>> needs_base64(b'foo bar')
+    False
+    >>> needs_base64(b':foo'), needs_base64(b'foo '), needs_base64(b'f\xc3\xb6\xc3\xb6'), needs_base64(b'foo\nbar')
+    (True, True, True, True)
+    """
+    return _UNSAFE.search(value) is not None
+
+
+def unfold(ldif: bytes) -> list[bytes]:
+    r"""
+    Get the unfolded lines of LDIF.
+
+    >>> unfold(b'description: very long\n  text\ncn: foo\r\n')
+    [b'description: very long text', b'cn: foo', b'']
+    """
+    lines: list[bytes] = []
+    for line in ldif.rstrip(b'\x00').replace(b'\r\n', b'\n').split(b'\n'):
+        if line.startswith(b' ') and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+    return lines
+
+
+def _parse_line(line: bytes, url_schemes: Collection[str] = ()) -> tuple[bytes, bytes]:
+    """Get the name and the (decoded) value of an unfolded line. Values given as URL are only read for the given URL schemes."""
+    name, sep, value = line.partition(b':')
+    if not sep:
+        msg = f'Invalid LDIF line: {line[:80]!r}'
+        raise ValueError(msg)
+    if value.startswith(b':'):
+        try:
+            return name, base64.b64decode(value[1:].strip(), validate=True)
+        except binascii.Error as exc:
+            msg = f'Invalid base64 value of {name!r}'
+            raise ValueError(msg) from exc
+    if value.startswith(b'<'):
+        url = urlparse(value[1:].strip().decode('UTF-8'))
+        if url.scheme not in url_schemes:
+            msg = f'The URL value of {name!r} is not processed, the URL scheme {url.scheme!r} is not enabled'
+            raise ValueError(msg)
+        if url.scheme != 'file':
+            msg = f'Unsupported URL scheme of {name!r}: {url.scheme}'
+            raise ValueError(msg)
+        return name, Path(unquote(url.path)).read_bytes()
+    return name, value.lstrip(b' ')
+
+
+def _append(modlist: list[Modification], mod: Mod, attr: str, value: bytes | None) -> None:
+    """Append the value to the previous modification if it is of the same attribute and type."""
+    if modlist and modlist[-1][0] == mod and modlist[-1][1].lower() == attr.lower() and modlist[-1][2] is not None and value is not None:
+        modlist[-1][2].append(value)
+    else:
+        modlist.append((mod, attr, None if value is None else [value]))
+
+
+def parse_modlist(lines: Iterable[bytes], change_type: LDAPChangeType, *, url_schemes: Collection[str] = ()) -> list[Modification]:
+    r"""
+    Get the modifications of the (unfolded) attribute lines of an ``add`` or ``modify`` LDIF change record.
+
+    Values given as URL (``attr:< file:///path``) are only read for the ``url_schemes`` (only ``file`` is supported),
+    otherwise they are rejected with a :exc:`ValueError`.
+
+    >>> parse_modlist(unfold(b'replace: sn\nsn: Doe\n-\ndelete: description\n-\n'), LDAPChangeType.Modify)
+    [(<Mod.Replace: 2>, 'sn', [b'Doe']), (<Mod.Delete: 1>, 'description', None)]
+    >>> parse_modlist([b'cn: foo', b'userPassword:: c2VjcmV0'], LDAPChangeType.Add)
+    [(<Mod.Add: 0>, 'cn', [b'foo']), (<Mod.Add: 0>, 'userPassword', [b'secret'])]
+    """
+    modlist: list[Modification] = []
+    current: tuple[Mod, str] | None = None
+    values: list[bytes] = []
+    for line in lines:
+        if line == b'-':
+            if current is not None:
+                modlist.append((*current, values or None))
+            current, values = None, []
+            continue
+        if not line or line.startswith(b'#'):
+            continue
+        name, value = _parse_line(line, url_schemes)
+        if change_type == LDAPChangeType.Add:
+            _append(modlist, Mod.Add, name.decode('UTF-8'), value)
+        elif current is None:
+            if name.lower() not in _OPERATIONS:
+                msg = f'Invalid modify operation: {name!r}'
+                raise ValueError(msg)
+            current = (_OPERATIONS[name.lower()], value.decode('UTF-8').strip())
+        else:
+            values.append(value)
+    if current is not None:
+        modlist.append((*current, values or None))
+    return modlist
+
+
+def _open(path: str | os.PathLike[str], mode: str, compress: bool | None) -> IO[bytes]:
+    if compress is None:
+        compress = Path(path).suffix == '.gz'
+    return gzip.open(path, mode) if compress else Path(path).open(mode)  # type: ignore[return-value]
+
+
+class LDIFWriter:
+    """
+    Write entries and change records as LDIF, in chunks of ``chunk_size`` bytes.
+
+    Values are base64 encoded if they aren't safe strings, if the attribute has the ``binary`` option, is given in ``base64_attrs``,
+    or has a binary syntax (see :data:`BINARY_SYNTAXES`) in the ``schema`` (by default the schema set via :meth:`Attributes.set_schema`).
+
+    >>> import io
+    >>> fd = io.BytesIO()
+    >>> with LDIFWriter(fd, base64_attrs=['userPassword']) as writer:
+    ...     writer.write_entry('uid=max,dc=freeiam,dc=org', {'uid': [b'max'], 'userPassword': [b'secret']})
+    >>> print(fd.getvalue().decode(), end='')
+    dn: uid=max,dc=freeiam,dc=org
+    uid: max
+    userPassword:: c2VjcmV0
+    <BLANKLINE>
+    """
+
+    __slots__ = ('_binary', '_buffer', '_close', '_fd', '_size', 'base64_attrs', 'chunk_size', 'cols', 'records', 'schema')
+
+    def __init__(
+        self,
+        fd: IO[bytes],
+        *,
+        schema: Schema | None = None,
+        base64_attrs: Iterable[str] = (),
+        cols: int = 76,
+        chunk_size: int = 64 * 1024,
+    ) -> None:
+        if cols <= 1:
+            msg = 'The line length must be greater than one'
+            raise ValueError(msg)
+        self._fd = fd
+        self._close = False
+        self.schema = schema if schema is not None else Attributes.SCHEMA
+        self.base64_attrs = {attr.lower() for attr in base64_attrs}
+        self.cols = cols
+        self.chunk_size = chunk_size
+        self.records = 0
+        self._buffer: list[bytes] = []
+        self._size = 0
+        self._binary: dict[str, bool] = {}
+
+    @classmethod
+    def open(cls, path: str | os.PathLike[str], *, compress: bool | None = None, **kwargs: object) -> Self:
+        """Open a LDIF file for writing, gzip compressed if ``compress`` or if the file name ends with ``.gz``."""
+        writer = cls(_open(path, 'wb', compress), **kwargs)  # type: ignore[arg-type]
+        writer._close = True
+        return writer
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
+
+    def write_entry(self, dn: DN | str, attrs: Mapping[str, list[bytes]]) -> None:
+        """Write an entry as content record."""
+        self._line('dn', str(dn).encode('UTF-8'), base64_encode=False)
+        for attr, values in attrs.items():
+            for value in values:
+                self._line(attr, value)
+        self._record()
+
+    def write_result(self, result: Result) -> None:
+        """Write a search result as content record."""
+        if result.dn is not None and result.attr is not None:
+            self.write_entry(result.dn, result.attr)
+
+    def write_results(self, results: Iterable[Result]) -> int:
+        """Write search results (e.g. of :meth:`~freeiam.ldap.connection.Connection.search_iter`), returns the number of written records."""
+        records = self.records
+        for result in results:
+            self.write_result(result)
+        return self.records - records
+
+    async def awrite_results(self, results: AsyncIterable[Result]) -> int:
+        """Write search results of an asynchronous iterator, returns the number of written records."""
+        records = self.records
+        async for result in results:
+            self.write_result(result)
+        return self.records - records
+
+    def write_change(self, record: ChangeRecord) -> None:
+        """Write a change record."""
+        self._line('dn', str(record.dn).encode('UTF-8'), base64_encode=False)
+        self._line('changetype', _CHANGE_TYPE_NAMES[record.type].encode('ASCII'))
+        if record.type == LDAPChangeType.Add:
+            for attr, values in record.attr.items():
+                for value in values:
+                    self._line(attr, value)
+        elif record.type == LDAPChangeType.Modify:
+            for mod, attr, mod_values in record.modlist:
+                self._line(_OPERATION_NAMES[mod], attr.encode('UTF-8'))
+                for value in mod_values or ():
+                    self._line(attr, value)
+                self._emit(b'-\n')
+        elif record.type == LDAPChangeType.ModifyDN:
+            self._line('newrdn', (record.new_rdn or '').encode('UTF-8'), base64_encode=False)
+            self._line('deleteoldrdn', b'1' if record.delete_old_rdn else b'0')
+            if record.new_superior is not None:
+                self._line('newsuperior', str(record.new_superior).encode('UTF-8'), base64_encode=False)
+        self._record()
+
+    def flush(self) -> None:
+        """Write the buffered chunk."""
+        if self._buffer:
+            self._fd.write(b''.join(self._buffer))
+            self._buffer.clear()
+            self._size = 0
+        self._fd.flush()
+
+    def close(self) -> None:
+        """Flush and close the file if it was opened by :meth:`open`."""
+        self.flush()
+        if self._close:
+            self._fd.close()
+
+    def _is_binary(self, attr: str) -> bool:
+        key = attr.lower()
+        if key not in self._binary:
+            name, *options = key.split(';')
+            self._binary[key] = (
+                name in self.base64_attrs or 'binary' in options or (self.schema is not None and self.schema.get_syntax(name) in BINARY_SYNTAXES)
+            )
+        return self._binary[key]
+
+    def _line(self, attr: str, value: bytes, *, base64_encode: bool | None = None) -> None:
+        if base64_encode is None:
+            base64_encode = self._is_binary(attr)
+        if base64_encode or needs_base64(value):
+            line = attr.encode('UTF-8') + b':: ' + base64.b64encode(value)
+        else:
+            line = attr.encode('UTF-8') + b': ' + value
+        cols = self.cols
+        if len(line) > cols:
+            line = b'\n '.join([line[:cols], *(line[i : i + cols - 1] for i in range(cols, len(line), cols - 1))])
+        self._emit(line + b'\n')
+
+    def _record(self) -> None:
+        self._emit(b'\n')
+        self.records += 1
+
+    def _emit(self, data: bytes) -> None:
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= self.chunk_size:
+            self._fd.write(b''.join(self._buffer))
+            self._buffer.clear()
+            self._size = 0
+
+
+class LDIFReader:
+    r"""
+    Read the records of LDIF lazily from a file, a memory-mapped file or a buffer.
+
+    Content records are returned as change records of type ``Add``.
+    Values given as URL are only read for the ``process_url_schemes`` (e.g. ``['file']``), otherwise they are rejected,
+    because reading local files from untrusted LDIF would copy them into the directory.
+    The checkpoint of a record is its offset. :attr:`offset` is advanced after a record has been consumed
+    and can be given to resume reading after an interruption.
+
+    >>> reader = LDIFReader(b'version: 1\ndn: uid=max,dc=freeiam,dc=org\nuid: max\n\ndn: uid=max,dc=freeiam,dc=org\nchangetype: delete\n')
+    >>> [(record.checkpoint, record.type.name, str(record.dn)) for record in reader]
+    [('11', 'Add', 'uid=max,dc=freeiam,dc=org'), ('51', 'Delete', 'uid=max,dc=freeiam,dc=org')]
+    """
+
+    __slots__ = ('_close', '_source', 'offset', 'process_url_schemes')
+
+    def __init__(self, source: IO[bytes] | bytes | mmap.mmap, *, offset: int = 0, process_url_schemes: Collection[str] = ()) -> None:
+        self._source = source
+        self._close = False
+        self.offset = offset
+        self.process_url_schemes = process_url_schemes
+
+    @classmethod
+    def open(
+        cls,
+        path: str | os.PathLike[str],
+        *,
+        compress: bool | None = None,
+        memory_map: bool = False,
+        offset: int = 0,
+        process_url_schemes: Collection[str] = (),
+    ) -> Self:
+        """
+        Open a LDIF file for reading, gzip compressed if ``compress`` or if the file name ends with ``.gz``.
+
+        With ``memory_map`` the (uncompressed) file is memory-mapped instead of read via buffered I/O.
+        """
+        fd = _open(path, 'rb', compress)
+        if memory_map:
+            if isinstance(fd, gzip.GzipFile):
+                fd.close()
+                msg = 'Compressed files cannot be memory-mapped'
+                raise ValueError(msg)
+            try:
+                source: IO[bytes] | mmap.mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            finally:
+                fd.close()
+        else:
+            source = fd
+        reader = cls(source, offset=offset, process_url_schemes=process_url_schemes)
+        reader._close = True
+        return reader
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the file if it was opened by :meth:`open`."""
+        if self._close and not isinstance(self._source, bytes):
+            self._source.close()
+
+    def __iter__(self) -> Iterator[ChangeRecord]:
+        start = None
+        lines: list[bytes] = []
+        for offset, line in self._lines():
+            if line:
+                if start is None:
+                    if line.lower().startswith(b'version:'):
+                        continue
+                    start = offset
+                if line.startswith(b' ') and lines:
+                    lines[-1] += line[1:]
+                else:
+                    lines.append(line)
+                continue
+            if start is not None and (record := self._parse(start, lines)) is not None:
+                yield record
+            start, lines = None, []
+            self.offset = offset
+        if start is not None and (record := self._parse(start, lines)) is not None:
+            yield record
+        self.offset = len(self._source) if isinstance(self._source, bytes | mmap.mmap) else self._source.tell()
+
+    def _lines(self) -> Iterator[tuple[int, bytes]]:
+        """Get the lines and their offset, without line separators."""
+        source = self._source
+        offset = self.offset
+        if isinstance(source, bytes | mmap.mmap):
+            size = len(source)
+            while offset < size:
+                end = source.find(b'\n', offset)
+                end = size if end == -1 else end + 1
+                yield offset, source[offset:end].rstrip(b'\r\n')
+                offset = end
+            return
+        source.seek(offset)
+        for line in source:
+            yield offset, line.rstrip(b'\r\n')
+            offset += len(line)
+
+    def _parse(self, offset: int, lines: list[bytes]) -> ChangeRecord | None:
+        lines = [line for line in lines if not line.startswith(b'#')]
+        if not lines:
+            return None
+        name, dn = _parse_line(lines[0])
+        if name.lower() != b'dn':
+            msg = f'LDIF record at offset {offset} does not start with a DN'
+            raise ValueError(msg)
+        body = [line for line in lines[1:] if not line.lower().startswith(b'control:')]
+        change_type = LDAPChangeType.Add
+        if body and body[0].lower().startswith(b'changetype:'):
+            _, value = _parse_line(body.pop(0))
+            try:
+                change_type = _CHANGE_TYPES[value.strip().lower()]
+            except KeyError:
+                msg = f'Invalid changetype at offset {offset}: {value!r}'
+                raise ValueError(msg) from None
+        if change_type == LDAPChangeType.ModifyDN:
+            values = {key.lower(): value for key, value in map(_parse_line, body)}
+            new_superior = values.get(b'newsuperior')
+            return ChangeRecord(
+                str(offset),
+                change_type,
+                DN(dn.decode('UTF-8')),
+                new_rdn=values[b'newrdn'].decode('UTF-8') if b'newrdn' in values else None,
+                delete_old_rdn=values.get(b'deleteoldrdn', b'0').strip() == b'1',
+                new_superior=DN(new_superior.decode('UTF-8')) if new_superior else None,
+            )
+        modlist = parse_modlist(body, change_type, url_schemes=self.process_url_schemes) if change_type != LDAPChangeType.Delete else []
+        return ChangeRecord(str(offset), change_type, DN(dn.decode('UTF-8')), modlist)
@@ -0,0 +1,280 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Client side evaluation of LDAP filters."""
+
+from collections.abc import Callable
+from typing import Any, TypeAlias
+
+from freeiam import errors
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.dn import DN
+from freeiam.ldap.filter import (
+    AND,
+    NOT,
+    OR,
+    ApproximateMatch,
+    Container,
+    EqualityMatch,
+    Expression,
+    ExtensibleMatch,
+    Filter,
+    GreaterOrEqual,
+    LessOrEqual,
+    PresenceMatch,
+    SubstringMatch,
+)
+from freeiam.ldap.schema import Schema
+
+
+__all__ = ('Matcher',)
+
+Normalizer: TypeAlias = Callable[[bytes], Any]
+
+
+def _case_ignore(value: bytes) -> str:
+    return ' '.join(value.decode('UTF-8', 'replace').casefold().split())
+
+
+def _case_exact(value: bytes) -> str:
+    return ' '.join(value.decode('UTF-8', 'replace').split())
+
+
+def _distinguished_name(value: bytes) -> DN:
+    return DN(value.decode('UTF-8'))
+
+
+def _natural(value: bytes) -> tuple[int, Any]:
+    """Order numbers numerically and everything else case insensitive, if the matching rule is unknown."""
+    try:
+        return (0, int(value))
+    except ValueError:
+        return (1, _case_ignore(value))
+
+
+_RULES: dict[str, Normalizer] = {
+    'caseignorematch': _case_ignore,
+    'caseignoreorderingmatch': _case_ignore,
+    'caseignoresubstringsmatch': _case_ignore,
+    'caseignoreia5match': _case_ignore,
+    'caseignoreia5substringsmatch': _case_ignore,
+    'caseignorelistmatch': _case_ignore,
+    'caseexactmatch': _case_exact,
+    'caseexactorderingmatch': _case_exact,
+    'caseexactsubstringsmatch': _case_exact,
+    'caseexactia5match': _case_exact,
+    'caseexactia5substringsmatch': _case_exact,
+    'numericstringmatch': lambda value: value.replace(b' ', b''),
+    'numericstringorderingmatch': lambda value: value.replace(b' ', b''),
+    'numericstringsubstringsmatch': lambda value: value.replace(b' ', b''),
+    'telephonenumbermatch': lambda value: value.replace(b' ', b'').replace(b'-', b'').lower(),
+    'telephonenumbersubstringsmatch': lambda value: value.replace(b' ', b'').replace(b'-', b'').lower(),
+    'integermatch': int,
+    'integerorderingmatch': int,
+    'booleanmatch': bytes.upper,
+    'objectidentifiermatch': bytes.lower,
+    'octetstringmatch': bytes,
+    'octetstringorderingmatch': bytes,
+    'generalizedtimematch': bytes,
+    'generalizedtimeorderingmatch': bytes,
+    'uuidmatch': bytes.lower,
+    'uuidorderingmatch': bytes.lower,
+    'distinguishednamematch': _distinguished_name,
+    'uniquemembermatch': _distinguished_name,
+}
+
+_OIDS = {
+    '2.5.13.0': 'objectidentifiermatch',
+    '2.5.13.1': 'distinguishednamematch',
+    '2.5.13.2': 'caseignorematch',
+    '2.5.13.3': 'caseignoreorderingmatch',
+    '2.5.13.4': 'caseignoresubstringsmatch',
+    '2.5.13.5': 'caseexactmatch',
+    '2.5.13.6': 'caseexactorderingmatch',
+    '2.5.13.7': 'caseexactsubstringsmatch',
+    '2.5.13.8': 'numericstringmatch',
+    '2.5.13.9': 'numericstringorderingmatch',
+    '2.5.13.13': 'booleanmatch',
+    '2.5.13.14': 'integermatch',
+    '2.5.13.15': 'integerorderingmatch',
+    '2.5.13.17': 'octetstringmatch',
+    '2.5.13.23': 'uniquemembermatch',
+    '2.5.13.27': 'generalizedtimematch',
+    '2.5.13.28': 'generalizedtimeorderingmatch',
+    '1.3.6.1.4.1.1466.109.114.1': 'caseexactia5match',
+    '1.3.6.1.4.1.1466.109.114.2': 'caseignoreia5match',
+}
+
+# matching rules of common attributes, used if no schema is given
+_DEFAULT_RULES: dict[str, tuple[str | None, str | None, str | None]] = {
+    'member': ('distinguishedNameMatch', None, None),
+    'owner': ('distinguishedNameMatch', None, None),
+    'manager': ('distinguishedNameMatch', None, None),
+    'uniquemember': ('uniqueMemberMatch', None, None),
+    'entrydn': ('distinguishedNameMatch', None, None),
+    'uidnumber': ('integerMatch', 'integerOrderingMatch', None),
+    'gidnumber': ('integerMatch', 'integerOrderingMatch', None),
+    'entryuuid': ('UUIDMatch', 'UUIDOrderingMatch', None),
+    'createtimestamp': ('generalizedTimeMatch', 'generalizedTimeOrderingMatch', None),
+    'modifytimestamp': ('generalizedTimeMatch', 'generalizedTimeOrderingMatch', None),
+}
+
+
+class Matcher:
+    """
+    Evaluates LDAP filters against entries on the client side.
+
+    Values are compared by the matching rules of the attributes from the schema, or else case insensitive.
+    Filters are evaluated with the three valued logic of RFC 4511: comparisons which can't be evaluated
+    (e.g. unknown matching rules of extensible matches) are *Undefined*, which doesn't match, even when negated.
+
+    >>> matcher = Matcher()
+    >>> matcher.matches('(&(uid=MAX)(!(uidNumber>=1000)))', 'uid=max,dc=freeiam,dc=org', {'uid': [b'max'], 'uidNumber': [b'999']})
+    True
+    >>> matcher.matches('(cn=*mus*)', 'uid=max,dc=freeiam,dc=org', {'cn': [b'Max Mustermann']})
+    True
+    """
+
+    __slots__ = ('_rules', 'schema')
+
+    def __init__(self, schema: Schema | None = None) -> None:
+        self.schema = schema
+        self._rules: dict[str, tuple[Normalizer | None, Normalizer | None, Normalizer | None]] = {}
+
+    def equality(self, attr: str) -> Normalizer | None:
+        """Get the function normalizing values of the attribute for equality matches."""
+        return self._get_rules(attr)[0]
+
+    def ordering(self, attr: str) -> Normalizer | None:
+        """Get the function normalizing values of the attribute for ordering matches."""
+        return self._get_rules(attr)[1]
+
+    def substrings(self, attr: str) -> Normalizer | None:
+        """Get the function normalizing values of the attribute for substring matches."""
+        return self._get_rules(attr)[2]
+
+    @staticmethod
+    def get_rule(name: str | None) -> Normalizer | None:
+        """Get the normalizer of a matching rule given by name or OID."""
+        if not name:
+            return None
+        return _RULES.get(_OIDS.get(name, name.lower()))
+
+    def matches(self, filter_expr: Filter | str, dn: DN | str, attrs: dict[str, list[bytes]]) -> bool:
+        """Check whether the entry matches the filter."""
+        if not isinstance(filter_expr, Filter):
+            filter_expr = Filter(filter_expr)
+        attributes = attrs if isinstance(attrs, Attributes) else Attributes(attrs)
+        return self.evaluate(filter_expr.root or filter_expr.ast, DN.get(dn), attributes) is True
+
+    def evaluate(self, expression: Expression, dn: DN, attrs: Attributes) -> bool | None:  # noqa: PLR0911
+        """Evaluate a filter expression to ``True``, ``False`` or ``None`` (*Undefined*)."""
+        if isinstance(expression, AND):
+            results = [self.evaluate(expr, dn, attrs) for expr in expression.expressions]
+            return False if False in results else (None if None in results else True)
+        if isinstance(expression, OR):
+            results = [self.evaluate(expr, dn, attrs) for expr in expression.expressions]
+            return True if True in results else (None if None in results else False)
+        if isinstance(expression, NOT):
+            result = self.evaluate(expression.expressions[0], dn, attrs)
+            return None if result is None else not result
+        if isinstance(expression, Container):
+            expressions = expression.expressions
+            return self.evaluate(expressions[0], dn, attrs) if expressions else True
+        if isinstance(expression, PresenceMatch):
+            return bool(self._values(attrs, expression.attr))
+        if isinstance(expression, SubstringMatch):
+            return self._substrings(expression, attrs)
+        if isinstance(expression, ExtensibleMatch):
+            return self._extensible(expression, dn, attrs)
+        if isinstance(expression, EqualityMatch | ApproximateMatch):
+            return self._compare(self.equality(expression.attr) or _case_ignore, expression.value, self._values(attrs, expression.attr), _equals)
+        if isinstance(expression, GreaterOrEqual | LessOrEqual):
+            check = _greater_or_equal if isinstance(expression, GreaterOrEqual) else _less_or_equal
+            return self._compare(self.ordering(expression.attr) or _natural, expression.value, self._values(attrs, expression.attr), check)
+        return None  # pragma: no cover
+
+    def _get_rules(self, attr: str) -> tuple[Normalizer | None, Normalizer | None, Normalizer | None]:
+        key = attr.lower()
+        if key not in self._rules:
+            if self.schema is not None:
+                names = self.schema.get_matching_rules(attr)
+            else:
+                names = _DEFAULT_RULES.get(key, ('caseIgnoreMatch', None, 'caseIgnoreSubstringsMatch'))
+            self._rules[key] = (self.get_rule(names[0]), self.get_rule(names[1]), self.get_rule(names[2]))
+        return self._rules[key]
+
+    @staticmethod
+    def _values(attrs: Attributes, attr: str) -> list[bytes]:
+        try:
+            return attrs[attr]
+        except KeyError:
+            return []
+
+    @staticmethod
+    def _compare(normalize: Normalizer, assertion: str, values: list[bytes], check: Callable[[Any, Any], bool]) -> bool | None:
+        try:
+            expected = normalize(assertion.encode('UTF-8'))
+        except (ValueError, errors.InvalidDN):
+            return None
+        for value in values:
+            try:
+                if check(normalize(value), expected):
+                    return True
+            except (ValueError, TypeError, errors.InvalidDN):
+                continue
+        return False
+
+    def _substrings(self, expression: SubstringMatch, attrs: Attributes) -> bool | None:
+        normalize = self.substrings(expression.attr) or _case_ignore
+        raw_parts = expression.raw_value.split('*')
+        try:
+            initial, *middle, final = [normalize((Filter.unescape(part) if expression.is_escaped else part).encode('UTF-8')) for part in raw_parts]
+        except ValueError:
+            return None
+        for value in self._values(attrs, expression.attr):
+            try:
+                normalized = normalize(value)
+            except ValueError:
+                continue
+            if not normalized.startswith(initial) or not normalized.endswith(final) or len(normalized) < len(initial) + len(final):
+                continue
+            position = len(initial)
+            for part in middle:
+                position = normalized.find(part, position, len(normalized) - len(final))
+                if position == -1:
+                    break
+                position += len(part)
+            else:
+                return True
+        return False
+
+    def _extensible(self, expression: ExtensibleMatch, dn: DN, attrs: Attributes) -> bool | None:
+        if expression.matchingrule:
+            normalize = self.get_rule(expression.matchingrule)
+        elif expression.attr:
+            normalize = self.equality(expression.attr) or _case_ignore
+        else:
+            return None
+        if normalize is None:
+            return None
+        values = list(self._values(attrs, expression.attr)) if expression.attr else [value for attr_values in attrs.values() for value in attr_values]
+        if expression.dn:
+            values.extend(
+                value.encode('UTF-8')
+                for rdn in dn.rdns
+                for attr, value, _ in rdn
+                if not expression.attr or attr.lower() == expression.attr.lower()
+            )  # fmt: skip
+        return self._compare(normalize, expression.value, values, _equals)
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    return bool(value == expected)
+
+
+def _greater_or_equal(value: Any, expected: Any) -> bool:
+    return bool(value >= expected)
+
+
+def _less_or_equal(value: Any, expected: Any) -> bool:
+    return bool(value <= expected)
@@ -0,0 +1,217 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Transitive (nested) group membership."""
+
+from collections.abc import Iterable
+
+from freeiam.ldap._wrapper import Result
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.dn import DN
+
+
+__all__ = ('GroupGraph',)
+
+
+class GroupGraph:
+    """
+    A cached graph of nested group memberships.
+
+    The graph is built from the member attributes of the groups (see :meth:`freeiam.ldap.connection.Connection.refresh_groups`).
+    The transitive groups of an object are computed once and memoized until a group on the path changes,
+    so that membership checks are in-memory lookups. Cycles of nested groups are tolerated.
+
+    >>> graph = GroupGraph('dc=freeiam,dc=org')
+    >>> graph.update('cn=admins,dc=freeiam,dc=org', ['uid=max,dc=freeiam,dc=org'])
+    >>> graph.update('cn=staff,dc=freeiam,dc=org', ['cn=admins,dc=freeiam,dc=org'])
+    >>> graph.is_member('uid=max,dc=freeiam,dc=org', 'cn=staff,dc=freeiam,dc=org')
+    True
+    >>> sorted(map(str, graph.groups_of('uid=max,dc=freeiam,dc=org')))
+    ['cn=admins,dc=freeiam,dc=org', 'cn=staff,dc=freeiam,dc=org']
+    """
+
+    __slots__ = ('_closure', '_members', '_parents', 'base', 'filter_expr', 'member_attrs', 'scope', 'timestamp')
+
+    def __init__(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(|(objectClass=groupOfNames)(objectClass=groupOfUniqueNames))',
+        *,
+        member_attrs: Iterable[str] = ('member', 'uniqueMember'),
+    ) -> None:
+        self.base = base
+        self.scope = scope
+        self.filter_expr = filter_expr
+        self.member_attrs = list(member_attrs)
+        self.timestamp: str | None = None
+        """The highest ``modifyTimestamp`` of the known groups, used to refresh only changed groups."""
+        self._members: dict[DN, frozenset[DN]] = {}
+        self._parents: dict[DN, set[DN]] = {}
+        self._closure: dict[DN, frozenset[DN]] = {}
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self.base)!r}, groups={len(self._members)!r})'
+
+    def __contains__(self, group: DN | str) -> bool:
+        return DN.get(group) in self._members
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    @property
+    def groups(self) -> set[DN]:
+        """The DNs of all known groups."""
+        return set(self._members)
+
+    def update(self, group: DN | str, members: Iterable[DN | str]) -> None:
+        """Set the direct members of a group."""
+        group = DN.get(group)
+        new = frozenset(DN.get(member) for member in members)
+        old = self._members.get(group, frozenset())
+        if group in self._members and new == old:
+            return
+        self._invalidate(group)
+        for member in old - new:
+            self._parents[member].discard(group)
+            if not self._parents[member]:
+                del self._parents[member]
+        for member in new - old:
+            self._parents.setdefault(member, set()).add(group)
+        self._members[group] = new
+        self._invalidate(group)
+
+    def load(self, result: Result) -> None:
+        """Set the direct members of a group from a search result containing the member attributes and ``modifyTimestamp``."""
+        assert result.dn is not None  # noqa: S101
+        attributes = result.attr or Attributes()
+        members: list[DN] = []
+        for attr in self.member_attrs:
+            try:
+                values = attributes[attr]
+            except KeyError:
+                continue
+            members.extend(self.parse_member(value) for value in values)
+        self.update(result.dn, members)
+        try:
+            timestamp = attributes['modifyTimestamp'][0].decode('ASCII')
+        except (KeyError, IndexError):
+            return
+        self.timestamp = max(self.timestamp or timestamp, timestamp)
+
+    @staticmethod
+    def parse_member(value: bytes) -> DN:
+        """Get the DN of a member value, without the optional unique identifier of ``uniqueMember`` values."""
+        member = value.decode('UTF-8')
+        if member.endswith("'B") and "#'" in member:
+            member = member.rpartition("#'")[0]
+        return DN(member)
+
+    def remove(self, group: DN | str) -> None:
+        """Remove a group."""
+        group = DN.get(group)
+        if group not in self._members:
+            return
+        self.update(group, [])
+        del self._members[group]
+
+    def members(self, group: DN | str) -> frozenset[DN]:
+        """Get the direct members of a group."""
+        return self._members.get(DN.get(group), frozenset())
+
+    def groups_of(self, dn: DN | str) -> frozenset[DN]:
+        """Get all groups the object is a (transitive) member of."""
+        dn = DN.get(dn)
+        cached = self._closure.get(dn)
+        if cached is not None:
+            return cached
+        groups: set[DN] = set()
+        stack = list(self._parents.get(dn, ()))
+        while stack:
+            group = stack.pop()
+            if group in groups:
+                continue
+            groups.add(group)
+            if (known := self._closure.get(group)) is not None:
+                groups.update(known)
+                continue
+            stack.extend(self._parents.get(group, ()))
+        self._closure[dn] = result = frozenset(groups)
+        return result
+
+    def is_member(self, dn: DN | str, group: DN | str) -> bool:
+        """Check whether the object is a (transitive) member of the group."""
+        return DN.get(group) in self.groups_of(dn)
+
+    def members_of(self, group: DN | str) -> set[DN]:
+        """Get all (transitive) members of the group, including nested groups."""
+        members: set[DN] = set()
+        stack = list(self.members(group))
+        while stack:
+            member = stack.pop()
+            if member not in members:
+                members.add(member)
+                stack.extend(self._members.get(member, ()))
+        return members
+
+    def cycles(self) -> list[set[DN]]:
+        """Get the groups which are nested into each other (strongly connected components of the graph)."""
+        return [component for component in self._components() if len(component) > 1 or component <= self._members[next(iter(component))]]
+
+    def clear(self) -> None:
+        """Forget all groups."""
+        self._members.clear()
+        self._parents.clear()
+        self._closure.clear()
+        self.timestamp = None
+
+    def _invalidate(self, group: DN) -> None:
+        """Forget the memoized groups of all (transitive) members of the group."""
+        self._closure.pop(group, None)
+        for member in self.members_of(group):
+            self._closure.pop(member, None)
+
+    def _components(self) -> list[set[DN]]:
+        """Tarjan's algorithm (iterative) over the groups."""
+        index: dict[DN, int] = {}
+        lowlink: dict[DN, int] = {}
+        stack: list[DN] = []
+        on_stack: set[DN] = set()
+        components = []
+        for root in self._members:
+            if root in index:
+                continue
+            work = [(root, iter(self._members[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in self._members:
+                        continue
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self._members[child])))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        components.append(self._pop_component(node, stack, on_stack))
+        return components
+
+    @staticmethod
+    def _pop_component(node: DN, stack: list[DN], on_stack: set[DN]) -> set[DN]:
+        component = set()
+        while True:
+            member = stack.pop()
+            on_stack.discard(member)
+            component.add(member)
+            if member == node:
+                return component
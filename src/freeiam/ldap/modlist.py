@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Schema aware computation of minimal modification lists."""
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from freeiam import errors
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import Mod
+from freeiam.ldap.ldif import Modification
+from freeiam.ldap.matching import Matcher
+from freeiam.ldap.schema import Schema
+
+
+__all__ = ('modify_modlist',)
+
+
+def modify_modlist(
+    old: dict[str, list[bytes]],
+    new: dict[str, list[bytes]],
+    *,
+    schema: Schema | None = None,
+    ignore_missing: bool = False,
+) -> list[Modification]:
+    """
+    Get the minimal modification list changing the attributes ``old`` into ``new``.
+
+    Attribute names are compared case insensitive and with resolved aliases.
+    Values are compared by the equality matching rule of the attribute from the ``schema`` (defaults to :attr:`Attributes.SCHEMA`),
+    so that e.g. changing only the case of a ``caseIgnoreMatch`` value is no modification.
+    Without a schema values are compared exactly.
+    Of multi-valued attributes with an equality matching rule only the removed and added values are sent,
+    if that is smaller than replacing all values.
+    Attributes missing in ``new`` are deleted, unless ``ignore_missing`` is given.
+    An empty list means nothing has changed.
+
+    >>> modify_modlist({'cn': [b'Max']}, {'CN': [b'Max'], 'sn': [b'Mustermann']})
+    [(<Mod.Add: 0>, 'sn', [b'Mustermann'])]
+    >>> modify_modlist({'cn': [b'Max'], 'description': [b'foo']}, {'cn': [b'Moritz']})
+    [(<Mod.Replace: 2>, 'cn', [b'Moritz']), (<Mod.Delete: 1>, 'description', None)]
+    """
+    schema = schema or Attributes.SCHEMA
+    old_attrs = {_key(attr): (attr, values) for attr, values in old.items()}
+    modlist: list[Modification] = []
+    for attr, values in new.items():
+        _name, old_values = old_attrs.pop(_key(attr), (attr, []))
+        modlist.extend(_diff(attr, old_values, values, schema))
+    if not ignore_missing:
+        modlist.extend((Mod.Delete, attr, None) for attr, values in old_attrs.values() if values)
+    return modlist
+
+
+def _key(attr: str) -> str:
+    return Attributes.ALIASES.get(attr, attr).lower()
+
+
+def _diff(attr: str, old: list[bytes], new: list[bytes], schema: Schema | None) -> list[Modification]:
+    if not new:
+        return [(Mod.Delete, attr, None)] if old else []
+    if not old:
+        return [(Mod.Add, attr, list(new))]
+    equality = Matcher.get_rule(schema.get_matching_rules(attr.split(';', 1)[0])[0]) if schema is not None else None
+    old_values = _normalized(old, equality)
+    new_values = _normalized(new, equality)
+    if old_values.keys() == new_values.keys():
+        return []
+    removed = [value for key, value in old_values.items() if key not in new_values]
+    added = [value for key, value in new_values.items() if key not in old_values]
+    if equality is None or len(removed) + len(added) >= len(new_values):
+        return [(Mod.Replace, attr, list(new))]
+    modlist: list[Modification] = []
+    if removed:
+        modlist.append((Mod.Delete, attr, removed))
+    if added:
+        modlist.append((Mod.Add, attr, added))
+    return modlist
+
+
+def _normalized(values: Iterable[bytes], normalize: Callable[[bytes], Any] | None) -> dict[Any, bytes]:
+    """Map the normalized values to the original values, values which can't be normalized are compared exactly."""
+    normalized: dict[Any, bytes] = {}
+    for value in values:
+        key: Any = value
+        if normalize is not None:
+            try:
+                key = normalize(value)
+            except (ValueError, TypeError, errors.InvalidDN):
+                key = value
+        normalized.setdefault(key, value)
+    return normalized
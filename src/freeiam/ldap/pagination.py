@@ -0,0 +1,305 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""LDAP search pagination."""
+
+import logging
+import math
+import time
+import typing
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from freeiam.ldap._wrapper import Controls, Result
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.dn import DN
+
+
+if typing.TYPE_CHECKING:
+    from freeiam.ldap.connection import Sorting
+
+
+__all__ = ('AdaptivePageSize', 'TypeAhead', 'VLVCursor')
+
+log = logging.getLogger(__name__)
+
+
+class AdaptivePageSize:
+    """
+    A page size which adapts itself to the measured server responses.
+
+    The page size grows while pages are received faster than ``target_latency`` and smaller than ``target_bytes``,
+    and shrinks when pages take longer, get larger or the server rejects the page size with a limit error.
+
+    >>> page_size = AdaptivePageSize(100, minimum=10, maximum=1000)
+    >>> page_size.record(entries=100, latency=0.1, size=10_000)
+    200
+    >>> page_size.record(entries=200, latency=4.0, size=20_000)
+    100
+    >>> page_size.limit_exceeded()
+    True
+    >>> int(page_size), page_size.maximum
+    (50, 99)
+    """
+
+    __slots__ = ('factor', 'maximum', 'minimum', 'size', 'target_bytes', 'target_latency')
+
+    def __init__(
+        self,
+        initial: int = 100,
+        *,
+        minimum: int = 10,
+        maximum: int = 5000,
+        target_latency: float = 1.0,
+        target_bytes: int = 1024 * 1024,
+        factor: float = 2.0,
+    ) -> None:
+        if not 0 < minimum <= maximum:
+            msg = 'The page size bounds must fulfill 0 < minimum <= maximum'
+            raise ValueError(msg)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.target_bytes = target_bytes
+        self.factor = factor
+        self.size = self._bound(initial)
+
+    def __int__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.size!r}, minimum={self.minimum!r}, maximum={self.maximum!r})'
+
+    def record(self, entries: int, latency: float | None, size: int) -> int:
+        """Record the measured latency (in seconds) and size (in bytes) of a received page and get the new page size."""
+        if entries < self.size:
+            return self.size  # the last page doesn't tell anything
+
+        if (latency is not None and latency > self.target_latency) or size > self.target_bytes:
+            ratio = min(self.target_latency / latency if latency else 1.0, self.target_bytes / size if size else 1.0)
+            self.resize(int(self.size * max(ratio, 1 / self.factor)))
+        elif (latency is None or latency * self.factor <= self.target_latency) and size * self.factor <= self.target_bytes:
+            self.resize(int(self.size * self.factor))
+        return self.size
+
+    def limit_exceeded(self) -> bool:
+        """Shrink the page size after the server rejected it due to a size or administrative limit. Returns whether a retry makes sense."""
+        if self.size <= self.minimum:
+            return False
+        self.maximum = max(self.minimum, self.size - 1)
+        self.resize(int(self.size / self.factor))
+        return True
+
+    def resize(self, size: int) -> None:
+        """Set the page size within the configured bounds."""
+        size = self._bound(size)
+        if size != self.size:
+            log.debug('Adapting page size from %d to %d', self.size, size)
+        self.size = size
+
+    def _bound(self, size: int) -> int:
+        return max(self.minimum, min(self.maximum, size))
+
+    @staticmethod
+    def estimate_size(results: Iterable[Result]) -> int:
+        """Estimate the number of bytes of the received search results."""
+        return sum(len(str(result.dn)) + sum(len(attr) + sum(map(len, values)) for attr, values in (result.attr or {}).items()) for result in results)
+
+
+class VLVCursor:
+    """
+    A cursor into the sorted result list of a Virtual List View search.
+
+    Keeps the sorting, the server side ``context_id`` and the content count between requests,
+    so that any page can be fetched on demand via :meth:`freeiam.ldap.connection.Connection.search_vlv_page`.
+    Recently fetched pages are cached, the cache is cleared when the content count changes.
+
+    >>> cursor = VLVCursor('dc=freeiam,dc=org', filter_expr='(uid=*)', sorting=['uid'], page_size=25)
+    >>> cursor.offset(3)
+    51
+    >>> cursor.content_count = 60
+    >>> cursor.last_page
+    3
+    """
+
+    __slots__ = ('_pages', 'attrs', 'base', 'cache_size', 'content_count', 'context_id', 'controls', 'filter_expr', 'page_size', 'scope', 'sorting')
+
+    def __init__(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        sorting: 'Sorting',
+        page_size: int = 100,
+        cache_size: int = 16,
+        controls: Controls | None = None,
+    ) -> None:
+        self.base = base
+        self.scope = scope
+        self.filter_expr = filter_expr
+        self.attrs = attrs
+        self.sorting = sorting
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.controls = controls
+        self.context_id: bytes | None = None
+        self.content_count: int | None = None
+        self._pages: OrderedDict[int, list[Result]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self.base)!r}, {self.filter_expr!r}, content_count={self.content_count!r})'
+
+    @property
+    def last_page(self) -> int | None:
+        """The number of the last page, if the content count is known."""
+        if self.content_count is None:
+            return None
+        return math.ceil(self.content_count / self.page_size)
+
+    def offset(self, page: int) -> int:
+        """Get the (one based) VLV offset of the first entry of the page."""
+        return (page - 1) * self.page_size + 1
+
+    def update(self, context_id: bytes | None, content_count: int) -> None:
+        """Update the state from a VLV response."""
+        if self.content_count is not None and content_count != self.content_count:
+            self._pages.clear()  # the result list changed
+        self.context_id = context_id
+        self.content_count = content_count
+
+    def get_cached(self, page: int) -> list[Result] | None:
+        """Get the page from the cache."""
+        results = self._pages.get(page)
+        if results is not None:
+            self._pages.move_to_end(page)
+        return results
+
+    def cache(self, page: int, results: list[Result]) -> None:
+        """Cache the page, evicting the least recently used page."""
+        if self.cache_size <= 0:
+            return
+        self._pages[page] = results
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.cache_size:
+            self._pages.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Forget the cached pages and the server side context."""
+        self._pages.clear()
+        self.context_id = None
+        self.content_count = None
+
+
+class TypeAhead:
+    """
+    The state of type-ahead lookups via Virtual List View assertion value seeks.
+
+    Keeps the ``context_id`` between keystrokes and caches the results per typed prefix (case insensitive).
+    A complete result of a shorter prefix is filtered on the client side instead of asking the server again.
+    Cached results expire after ``cache_ttl`` seconds, so that added and removed entries show up,
+    :meth:`clear` drops them immediately, e.g. after modifying entries.
+    See :meth:`freeiam.ldap.connection.Connection.search_type_ahead`.
+
+    >>> type_ahead = TypeAhead('dc=freeiam,dc=org', 'uid', size=5)
+    >>> type_ahead.sorting
+    [('uid', 'caseIgnoreOrderingMatch', False)]
+    """
+
+    __slots__ = (
+        '_prefixes',
+        'attribute',
+        'attrs',
+        'base',
+        'cache_size',
+        'cache_ttl',
+        'context_id',
+        'controls',
+        'filter_expr',
+        'ordering_rule',
+        'scope',
+        'size',
+    )
+
+    def __init__(
+        self,
+        base: DN | str,
+        attribute: str,
+        *,
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        size: int = 10,
+        ordering_rule: str | None = 'caseIgnoreOrderingMatch',
+        cache_size: int = 64,
+        cache_ttl: float = 60.0,
+        controls: Controls | None = None,
+    ) -> None:
+        self.base = base
+        self.attribute = attribute
+        self.scope = scope
+        self.filter_expr = filter_expr
+        self.attrs = attrs if attrs is None or attribute in attrs else [*attrs, attribute]
+        self.size = size
+        self.ordering_rule = ordering_rule
+        self.cache_size = cache_size
+        self.controls = controls
+        self.context_id: bytes | None = None
+        self.cache_ttl = cache_ttl
+        self._prefixes: OrderedDict[str, tuple[float, list[Result], bool]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self.base)!r}, {self.attribute!r})'
+
+    @property
+    def sorting(self) -> 'Sorting':
+        """The server side sorting by the attribute."""
+        return [(self.attribute, self.ordering_rule, False)]
+
+    def matches(self, result: Result, prefix: str) -> bool:
+        """Whether a value of the attribute starts with the prefix."""
+        prefix = prefix.casefold()
+        try:
+            values = result.attr[self.attribute] if result.attr is not None else []
+        except KeyError:
+            return False
+        return any(value.decode('UTF-8', 'replace').casefold().startswith(prefix) for value in values)
+
+    def get_cached(self, prefix: str) -> list[Result] | None:
+        """Get the results for the prefix from the cache, or by filtering the complete results of a shorter prefix."""
+        key = prefix.casefold()
+        now = time.monotonic()
+        for expired in [cached for cached, (expires, _results, _complete) in self._prefixes.items() if expires <= now]:
+            del self._prefixes[expired]
+        cached = self._prefixes.get(key)
+        if cached is not None:
+            self._prefixes.move_to_end(key)
+            return cached[1]
+        for length in range(len(key) - 1, -1, -1):
+            cached = self._prefixes.get(key[:length])
+            if cached is not None and cached[2]:
+                results = [result for result in cached[1] if self.matches(result, prefix)]
+                self._store(key, cached[0], results, complete=True)
+                return results
+        return None
+
+    def cache(self, prefix: str, results: list[Result], *, complete: bool) -> None:
+        """Cache the results for the prefix. Complete results contain all entries matching the prefix."""
+        self._store(prefix.casefold(), time.monotonic() + self.cache_ttl, results, complete=complete)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._prefixes.clear()
+
+    def _store(self, key: str, expires: float, results: list[Result], *, complete: bool) -> None:
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return
+        self._prefixes[key] = (expires, results, complete)
+        self._prefixes.move_to_end(key)
+        while len(self._prefixes) > self.cache_size:
+            self._prefixes.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Forget the cached results and the server side context."""
+        self._prefixes.clear()
+        self.context_id = None
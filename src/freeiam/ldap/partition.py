@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Partitioning of LDAP searches."""
+
+import itertools
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import ldap.filter
+
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.dn import DN
+
+
+__all__ = ('Partition', 'range_filters', 'uuid_bounds')
+
+
+@dataclass(frozen=True)
+class Partition:
+    """A part of a search, disjoint to the other parts of the same search."""
+
+    base: DN | str
+    """The search base."""
+
+    scope: Scope = Scope.SUBTREE
+    """The search scope."""
+
+    filter_expr: str = '(objectClass=*)'
+    """The search filter."""
+
+    optional: bool = False
+    """Whether the base may vanish during the search (e.g. a child found by a previous search), so that the partition is empty then."""
+
+    def narrow(self, filter_expr: str) -> 'Partition':
+        """
+        Get the partition with an additional filter.
+
+        >>> Partition('dc=freeiam,dc=org').narrow('(uid>=m)')
+        Partition(base='dc=freeiam,dc=org', scope=<Scope.Subtree: 2>, filter_expr='(&(objectClass=*)(uid>=m))', optional=False)
+        """
+        return Partition(self.base, self.scope, f'(&{self.filter_expr}{filter_expr})', self.optional)
+
+
+def range_filters(attr: str, bounds: Sequence[str]) -> list[str]:
+    """
+    Get filters for disjoint value ranges of a single valued attribute, split at the given ascending bounds.
+
+    The first range contains the entries without the attribute.
+
+    >>> range_filters('uid', ['h', 'p'])
+    ['(!(uid>=h))', '(&(uid>=h)(!(uid>=p)))', '(uid>=p)']
+    >>> range_filters('uid', [])
+    ['(objectClass=*)']
+    """
+    if not bounds:
+        return ['(objectClass=*)']
+    escaped = [ldap.filter.escape_filter_chars(bound) for bound in bounds]
+    filters = [f'(!({attr}>={escaped[0]}))']
+    filters.extend(f'(&({attr}>={lower})(!({attr}>={upper})))' for lower, upper in itertools.pairwise(escaped))
+    filters.append(f'({attr}>={escaped[-1]})')
+    return filters
+
+
+def uuid_bounds(partitions: int) -> list[str]:
+    """
+    Get bounds splitting the UUID space (e.g. of ``entryUUID``) into evenly sized partitions.
+
+    >>> uuid_bounds(4)
+    ['40000000-0000-0000-0000-000000000000', '80000000-0000-0000-0000-000000000000', 'c0000000-0000-0000-0000-000000000000']
+    """
+    space = 1 << 32
+    return [f'{space * i // partitions:08x}-0000-0000-0000-000000000000' for i in range(1, partitions)]
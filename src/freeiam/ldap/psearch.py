@@ -0,0 +1,213 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Persistent Search change events and their fan-out to many subscribers."""
+
+import asyncio
+import contextlib
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator
+from dataclasses import dataclass
+from enum import IntEnum
+from types import TracebackType
+from typing import Self
+
+from ldap.controls.psearch import EntryChangeNotificationControl
+
+from freeiam import errors
+from freeiam.ldap._wrapper import _Response
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import ResponseType
+from freeiam.ldap.dn import DN
+
+
+__all__ = ('ChangeEvent', 'ChangeFeed', 'ChangeType', 'Subscription', 'decode_changes')
+
+
+class ChangeType(IntEnum):
+    """The type of a change event, the changes have the values of :class:`~freeiam.ldap.constants.LDAPChangeType`."""
+
+    Present = 0
+    """The entry is part of the current content, which is sent at the start of a (re)synchronization."""
+
+    Add = 1
+    """The entry was added."""
+
+    Delete = 2
+    """The entry was deleted."""
+
+    Modify = 4
+    """The entry was modified."""
+
+    ModifyDN = 8
+    """The entry was renamed or moved, ``previous_dn`` is its old DN."""
+
+    Resync = 16
+    """
+    The stream was interrupted and is resynchronized.
+
+    Changes during the interruption are lost, the following ``Present`` events are the current content.
+    Entries which aren't reported again have been deleted meanwhile.
+    """
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """A change of an entry reported by a persistent search."""
+
+    type: ChangeType
+    """The type of the change."""
+
+    dn: DN | None = None
+    """The DN of the entry."""
+
+    attr: Attributes | None = None
+    """The attributes of the entry after the change."""
+
+    previous_dn: DN | None = None
+    """The DN before a ``ModifyDN`` change."""
+
+    change_number: int | None = None
+    """The change number of the server, if supported."""
+
+
+def decode_changes(response: _Response) -> list[ChangeEvent]:
+    """Get the change events of a response of a persistent search."""
+    if response.type != ResponseType.SearchEntry:
+        return []
+    events = []
+    for dn, attrs in response.data or []:
+        ctrl = next((ctrl for ctrl in (response.entry_ctrls or {}).get(dn, []) if isinstance(ctrl, EntryChangeNotificationControl)), None)
+        if ctrl is None:
+            events.append(ChangeEvent(ChangeType.Present, DN(dn), Attributes(attrs)))
+            continue
+        previous_dn = DN(ctrl.previousDN) if ctrl.previousDN else None
+        events.append(ChangeEvent(ChangeType(ctrl.changeType), DN(dn), Attributes(attrs), previous_dn, ctrl.changeNumber))
+    return events
+
+
+class ChangeFeed:
+    """
+    Fans the events of one persistent search out to many subscribers.
+
+    Each subscriber gets every event received after it subscribed, in its own queue of at most ``maxsize`` events.
+    Events are only read from the server while a subscriber waits for one. The read runs in a task shared by the waiting subscribers,
+    so cancelling a waiting subscriber (e.g. via :func:`asyncio.timeout`) doesn't interrupt the persistent search of the others.
+    A subscriber falling behind by more than ``maxsize`` events gets :class:`~freeiam.errors.SubscriberOverflow`,
+    the other subscribers are not slowed down by it.
+
+    >>> async def example(conn):
+    ...     feed = ChangeFeed(conn.watch('dc=freeiam,dc=org'), maxsize=100)
+    ...     async with feed.subscribe() as changes:
+    ...         async for event in changes:
+    ...             print(event.type, event.dn)
+    """
+
+    __slots__ = ('_error', '_reader', '_source', '_subscribers', 'closed', 'maxsize')
+
+    def __init__(self, source: AsyncIterator[ChangeEvent], maxsize: int = 1000) -> None:
+        if maxsize < 1:
+            msg = 'maxsize must be positive'
+            raise ValueError(msg)
+        self.maxsize = maxsize
+        self.closed = False
+        self._source = source
+        self._subscribers: list[Subscription] = []
+        self._reader: asyncio.Task[None] | None = None
+        self._error: BaseException | None = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> 'Subscription':
+        """Subscribe to the events from now on."""
+        subscription = Subscription(self)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: 'Subscription') -> None:
+        """Stop delivering events to the subscriber."""
+        with contextlib.suppress(ValueError):
+            self._subscribers.remove(subscription)
+
+    async def aclose(self) -> None:
+        """Stop the persistent search, the subscribers receive the remaining queued events. No subscriber must be waiting for an event."""
+        self.closed = True
+        if self._reader is not None and not self._reader.done():
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+        if isinstance(self._source, AsyncGenerator):
+            await self._source.aclose()
+
+    async def _receive(self, subscription: 'Subscription') -> None:
+        """Wait until the next event has been read from the server, unless another subscriber did meanwhile."""
+        if subscription._events or self.closed:
+            return
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        # a cancelled subscriber must not cancel the read, which would end the persistent search for all subscribers
+        await asyncio.shield(self._reader)
+
+    async def _read(self) -> None:
+        """Read the next event from the server and deliver it to all subscribers."""
+        try:
+            event = await anext(self._source)
+        except StopAsyncIteration:
+            self.closed = True
+            return
+        except Exception as exc:  # noqa: BLE001  # raised to the subscribers
+            self.closed = True
+            self._error = exc
+            return
+        for subscriber in list(self._subscribers):
+            subscriber._push(event, self.maxsize)
+
+
+class Subscription:
+    """The events of a :class:`ChangeFeed` for one subscriber."""
+
+    __slots__ = ('_events', '_feed', 'overflowed')
+
+    def __init__(self, feed: ChangeFeed) -> None:
+        self._feed = feed
+        self._events: deque[ChangeEvent] = deque()
+        self.overflowed = False
+        """Whether events have been dropped because the queue was full."""
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __aiter__(self) -> Self:
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        while not self._events:
+            if self.overflowed:
+                msg = f'More than {self._feed.maxsize} events have not been consumed'
+                raise errors.SubscriberOverflow(msg)
+            if self._feed.closed or self not in self._feed._subscribers:
+                if self._feed._error is not None:
+                    raise self._feed._error
+                raise StopAsyncIteration
+            await self._feed._receive(self)
+        return self._events.popleft()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, etype: type[BaseException] | None, exc: BaseException | None, etraceback: TracebackType | None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unsubscribe."""
+        self._feed.unsubscribe(self)
+
+    def _push(self, event: ChangeEvent, maxsize: int) -> None:
+        if self.overflowed:
+            return
+        if len(self._events) >= maxsize:
+            self.overflowed = True
+            self._events.clear()
+            self._feed.unsubscribe(self)
+            return
+        self._events.append(event)
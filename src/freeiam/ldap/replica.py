@@ -0,0 +1,256 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Local read replica of a subtree."""
+
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from freeiam import errors
+from freeiam.ldap._wrapper import Result, _Response
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import ResponseType, Scope
+from freeiam.ldap.dn import DN
+from freeiam.ldap.filter import AND, OR, Container, EqualityMatch, Expression, Filter, Operator
+from freeiam.ldap.matching import Matcher
+from freeiam.ldap.schema import Schema
+from freeiam.ldap.syncrepl import CookieStore, SyncEvent, SyncEventType
+
+
+__all__ = ('LocalReplica',)
+
+
+class LocalReplica:
+    """
+    An in-memory copy of a subtree, answering reads locally.
+
+    The replica is kept current via syncrepl (see :meth:`freeiam.ldap.connection.Connection.refresh_replica`).
+    Entries are indexed by DN and by the equality normalized values of the ``indexes`` attributes,
+    filters are evaluated on the client side by a :class:`~freeiam.ldap.matching.Matcher`.
+    With ``max_staleness`` reads fail with :class:`~freeiam.errors.StaleReplica`
+    if the replica hasn't been synchronized within the given number of seconds, unless it is kept current persistently.
+
+    >>> replica = LocalReplica('dc=freeiam,dc=org', indexes=['uid'])
+    >>> replica.put('uid=max,dc=freeiam,dc=org', {'uid': [b'max'], 'objectClass': [b'person']})
+    >>> [str(result.dn) for result in replica.search(filter_expr='(&(objectClass=person)(uid=MAX))')]
+    ['uid=max,dc=freeiam,dc=org']
+    """
+
+    __slots__ = (
+        '_entries',
+        '_indexes',
+        '_persist',
+        '_present',
+        '_uuids',
+        'attrs',
+        'base',
+        'cookie_store',
+        'filter_expr',
+        'matcher',
+        'max_staleness',
+        'persisting',
+        'scope',
+        'synchronized',
+    )
+
+    def __init__(
+        self,
+        base: DN | str,
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        indexes: Iterable[str] = ('objectClass',),
+        max_staleness: float | None = None,
+        schema: Schema | None = None,
+        cookie_store: CookieStore | None = None,
+    ) -> None:
+        self.base = DN.get(base)
+        self.scope = scope
+        self.filter_expr = filter_expr
+        self.attrs = attrs
+        self.max_staleness = max_staleness
+        self.matcher = Matcher(schema)
+        self.cookie_store = cookie_store if cookie_store is not None else CookieStore()
+        self.synchronized: float | None = None
+        """The (monotonic) time of the last completed synchronization."""
+        self.persisting = False
+        """Whether the replica is currently kept current by a persistent synchronization."""
+        self._entries: dict[DN, tuple[str | None, Attributes]] = {}
+        self._uuids: dict[str, DN] = {}
+        self._indexes: dict[str, dict[Any, set[DN]]] = {attr.lower(): {} for attr in indexes}
+        self._present: set[str] | None = None
+        self._persist = False
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self.base)!r}, entries={len(self._entries)!r})'
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, dn: DN | str) -> bool:
+        return DN.get(dn) in self._entries
+
+    @property
+    def stale(self) -> bool:
+        """Whether the last synchronization is longer ago than ``max_staleness``."""
+        if self.max_staleness is None or self.persisting:
+            return False
+        return self.synchronized is None or time.monotonic() - self.synchronized > self.max_staleness
+
+    def get(self, dn: DN | str, attrs: list[str] | None = None) -> Result:
+        """Get an entry, raises :class:`~freeiam.errors.NoSuchObject` if it doesn't exist."""
+        self._check_staleness()
+        dn = DN.get(dn)
+        try:
+            _uuid, attributes = self._entries[dn]
+        except KeyError:
+            error = errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'ctrls': []})
+            error.base_dn = dn
+            error.scope = Scope.BASE
+            error.attrs = attrs
+            raise error from None
+        return self._result(dn, attributes, attrs)
+
+    def search(
+        self,
+        base: DN | str | None = None,
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: Filter | str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+    ) -> list[Result]:
+        """Search the entries, using the indexes of equality matches to find the candidates."""
+        self._check_staleness()
+        base = self.base if base is None else DN.get(base)
+        fil = filter_expr if isinstance(filter_expr, Filter) else Filter(filter_expr)
+        root = fil.root or fil.ast
+        candidates = self._candidates(root)
+        if scope == Scope.BASE:
+            candidates = {base} & (self._entries.keys() if candidates is None else candidates)
+        results = []
+        for dn in self._entries if candidates is None else candidates:
+            if dn not in self._entries or not self._in_scope(dn, base, scope):
+                continue
+            attributes = self._entries[dn][1]
+            if self.matcher.evaluate(root, dn, attributes) is True:
+                results.append(self._result(dn, attributes, attrs))
+        return results
+
+    def put(self, dn: DN | str, attrs: dict[str, list[bytes]], uuid: str | None = None) -> None:
+        """Add or replace an entry. An entry with the same ``entryUUID`` but a different DN is removed (renamed)."""
+        dn = DN.get(dn)
+        if uuid is not None and (old := self._uuids.get(uuid)) is not None and old != dn:
+            self.remove(old)
+        self.remove(dn)
+        attributes = attrs if isinstance(attrs, Attributes) else Attributes(attrs)
+        self._entries[dn] = (uuid, attributes)
+        if uuid is not None:
+            self._uuids[uuid] = dn
+        for attr, index in self._indexes.items():
+            for key in self._index_keys(attr, attributes):
+                index.setdefault(key, set()).add(dn)
+
+    def remove(self, dn: DN | str) -> None:
+        """Remove an entry."""
+        dn = DN.get(dn)
+        entry = self._entries.pop(dn, None)
+        if entry is None:
+            return
+        uuid, attributes = entry
+        if uuid is not None:
+            self._uuids.pop(uuid, None)
+        for attr, index in self._indexes.items():
+            for key in self._index_keys(attr, attributes):
+                index[key].discard(dn)
+                if not index[key]:
+                    del index[key]
+
+    def clear(self) -> None:
+        """Remove all entries and forget the synchronization state."""
+        self._entries.clear()
+        self._uuids.clear()
+        for index in self._indexes.values():
+            index.clear()
+        self.cookie_store.set(None)
+        self.synchronized = None
+
+    def begin_refresh(self, persist: bool = False) -> None:
+        """Start tracking the entries reported as present during a refresh."""
+        self._present = set()
+        self._persist = persist
+
+    def end_refresh(self) -> None:
+        """Stop the synchronization. A persistent synchronization counts as complete until now."""
+        if self.persisting:
+            self.synchronized = time.monotonic()
+        self.persisting = False
+        self._present = None
+
+    def apply(self, event: SyncEvent) -> None:
+        """Apply a synchronization event."""
+        if event.type in {SyncEventType.Add, SyncEventType.Modify}:
+            assert event.dn is not None  # noqa: S101
+            self.put(event.dn, event.attr or Attributes(), event.uuid)
+        elif event.type == SyncEventType.Delete:
+            dn = event.dn if event.uuid is None else self._uuids.get(event.uuid, event.dn)
+            if dn is not None:
+                self.remove(dn)
+        elif event.type == SyncEventType.PresentDone and self._present is not None:
+            for uuid in set(self._uuids) - self._present:
+                self.remove(self._uuids[uuid])
+            self._present = set()
+        elif event.type == SyncEventType.RefreshDone:
+            self.synchronized = time.monotonic()
+            self.persisting = self._persist
+            self._present = None
+        if event.type in {SyncEventType.Add, SyncEventType.Modify, SyncEventType.Present} and self._present is not None and event.uuid:
+            self._present.add(event.uuid)
+
+    def _check_staleness(self) -> None:
+        if self.stale:
+            msg = f'The replica of {self.base} is not synchronized within {self.max_staleness} seconds'
+            raise errors.StaleReplica(msg)
+
+    def _index_keys(self, attr: str, attributes: Attributes) -> set[Any]:
+        normalize = self.matcher.equality(attr)
+        keys = set()
+        for value in self.matcher._values(attributes, attr):
+            try:
+                keys.add(normalize(value) if normalize else value)
+            except (ValueError, errors.InvalidDN):
+                continue
+        return keys
+
+    def _candidates(self, expression: Expression) -> set[DN] | None:
+        """Get the entries which can match the filter according to the indexes, ``None`` if the indexes don't restrict them."""
+        if isinstance(expression, AND):
+            restricted = [found for expr in expression.expressions if (found := self._candidates(expr)) is not None]
+            return set.intersection(*restricted) if restricted else None
+        if isinstance(expression, OR):
+            alternatives = [self._candidates(expr) for expr in expression.expressions]
+            return None if not alternatives or None in alternatives else set().union(*alternatives)  # type: ignore[arg-type]
+        if isinstance(expression, Container) and not isinstance(expression, Operator) and len(expression.expressions) == 1:
+            return self._candidates(expression.expressions[0])
+        if isinstance(expression, EqualityMatch) and (index := self._indexes.get(expression.attr.lower())) is not None:
+            normalize = self.matcher.equality(expression.attr)
+            try:
+                key = normalize(expression.value.encode('UTF-8')) if normalize else expression.value.encode('UTF-8')
+            except (ValueError, errors.InvalidDN):
+                return None
+            return set(index.get(key, ()))
+        return None
+
+    @staticmethod
+    def _in_scope(dn: DN, base: DN, scope: Scope) -> bool:
+        if scope == Scope.BASE:
+            return dn == base
+        if scope == Scope.ONELEVEL:
+            return len(dn) == len(base) + 1 and dn.endswith(base)
+        return dn.endswith(base)
+
+    @staticmethod
+    def _result(dn: DN, attributes: Attributes, attrs: list[str] | None) -> Result:
+        if attrs is not None and '*' not in attrs and '+' not in attrs:
+            wanted = {attr.lower() for attr in attrs}
+            attributes = Attributes({key: values for key, values in attributes.items() if key.lower() in wanted})
+        return Result.from_response(dn, attributes, None, _Response(ResponseType.SearchEntry, [(str(dn), attributes)], None, None))
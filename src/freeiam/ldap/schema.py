@@ -12,10 +12,13 @@ from ldap.schema.subentry import SubSchema
 class Schema:
     """LDAP Schemata."""
 
-    __slots__ = ('_schema',)
+    __slots__ = ('_attribute_types', '_matching_rules', '_schema', '_syntaxes')
 
     def __init__(self, schema: SubSchema):
         self._schema = schema
+        self._matching_rules: dict[str, tuple[str | None, str | None, str | None]] = {}
+        self._syntaxes: dict[str, str | None] = {}
+        self._attribute_types: dict[str, AttributeType] | None = None
 
     def get_object_class(self, name: str) -> ObjectClass | None:
         """Get object class by name."""
@@ -53,3 +56,34 @@ class Schema:
             for alias in attr.names[1:]
             if len(attr.names) > 1
         }  # fmt: skip
+
+    def get_matching_rules(self, name: str) -> tuple[str | None, str | None, str | None]:
+        """Get the equality, ordering and substrings matching rule of an attribute (case insensitive), inherited from its superior types."""
+        key = name.lower()
+        if key not in self._matching_rules:
+            equality = ordering = substr = None
+            for attr in self._superior_types(key):
+                equality = equality or attr.equality
+                ordering = ordering or attr.ordering
+                substr = substr or attr.substr
+            self._matching_rules[key] = (equality, ordering, substr)
+        return self._matching_rules[key]
+
+    def get_syntax(self, name: str) -> str | None:
+        """Get the syntax OID of an attribute (case insensitive, without length), inherited from its superior types."""
+        key = name.lower()
+        if key not in self._syntaxes:
+            syntax = next((attr.syntax for attr in self._superior_types(key) if attr.syntax), None)
+            self._syntaxes[key] = syntax.split('{', 1)[0] if syntax else None
+        return self._syntaxes[key]
+
+    def _superior_types(self, name: str) -> Generator[AttributeType, None, None]:
+        """Get the attribute type of the lower case name followed by its superior types."""
+        if self._attribute_types is None:
+            self._attribute_types = {alias.lower(): attr for attr in self.get_attributes() for alias in attr.names}
+        attr = self._attribute_types.get(name)
+        seen = set()
+        while attr is not None and attr.oid not in seen:
+            seen.add(attr.oid)
+            yield attr
+            attr = self._attribute_types.get(attr.sup[0].lower()) if attr.sup else None
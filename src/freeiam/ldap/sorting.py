@@ -0,0 +1,235 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Client side sorting of LDAP search results."""
+
+import heapq
+import itertools
+import pickle  # noqa: S403
+import tempfile
+import typing
+from collections import deque
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from typing import IO, Any, Self
+
+from freeiam.ldap._wrapper import Result, _Response
+from freeiam.ldap.constants import ResponseType
+
+
+if typing.TYPE_CHECKING:
+    from freeiam.ldap.connection import Sorting
+
+
+__all__ = ('ExternalSort', 'SortedMerge', 'parse_sorting', 'result_key')
+
+_NORMALIZERS: dict[str, Callable[[bytes], Any]] = {
+    'caseignoreorderingmatch': lambda value: value.decode('UTF-8', 'replace').casefold(),
+    'caseexactorderingmatch': lambda value: value.decode('UTF-8', 'replace'),
+    'caseignoreia5orderingmatch': lambda value: value.decode('ASCII', 'replace').casefold(),
+    'caseexactia5orderingmatch': lambda value: value.decode('ASCII', 'replace'),
+    'numericstringorderingmatch': lambda value: value.replace(b' ', b''),
+    'integerorderingmatch': int,
+    'generalizedtimeorderingmatch': bytes,
+    'octetstringorderingmatch': bytes,
+    'uuidorderingmatch': lambda value: value.lower(),
+}
+
+
+def parse_sorting(sorting: 'Sorting') -> list[tuple[str, str | None, bool]]:
+    """
+    Get the sort keys as ``(attribute, ordering rule, reverse)`` tuples.
+
+    >>> parse_sorting(['-uid:caseExactOrderingMatch', 'cn', ('sn', None, True)])
+    [('uid', 'caseExactOrderingMatch', True), ('cn', None, False), ('sn', None, True)]
+    """
+    keys = []
+    for rule in sorting:
+        if not isinstance(rule, str):
+            keys.append(rule)
+            continue
+        reverse = rule.startswith('-')
+        attr, _, ordering_rule = rule.removeprefix('-').partition(':')
+        keys.append((attr, ordering_rule or None, reverse))
+    return keys
+
+
+class _Reversed:
+    """Inverts the ordering of a sort key value."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __lt__(self, other: '_Reversed') -> bool:
+        return bool(other.value < self.value)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Reversed) and bool(self.value == other.value)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+def result_key(sorting: 'Sorting') -> Callable[[Result], tuple[Any, ...]]:
+    """
+    Get a key function ordering search results like Server Side Sorting.
+
+    Values are compared by the emulated ordering rule, case insensitive if no rule is given.
+    Multi valued attributes are compared by their lowest (or for reverse order their highest) value.
+    Entries without the attribute are ordered after all others (or for reverse order before all others).
+
+    >>> from freeiam.ldap.attr import Attributes
+    >>> results = [Result(None, Attributes({'uid': [uid]}), None, None) for uid in (b'b', b'A', b'c')]
+    >>> [result.attr['uid'][0] for result in sorted(results, key=result_key(['-uid']))]
+    [b'c', b'b', b'A']
+    """
+    keys = [
+        (attr, _NORMALIZERS.get((ordering_rule or 'caseIgnoreOrderingMatch').lower(), bytes), reverse)
+        for attr, ordering_rule, reverse in parse_sorting(sorting)
+    ]
+
+    def key(result: Result) -> tuple[Any, ...]:
+        values: list[Any] = []
+        for attr, normalize, reverse in keys:
+            try:
+                found = [normalize(value) for value in result.attr[attr]] if result.attr is not None else []
+            except KeyError:
+                found = []
+            value = (0, max(found) if reverse else min(found)) if found else (1,)
+            values.append(_Reversed(value) if reverse else value)
+        return tuple(values)
+
+    return key
+
+
+class SortedMerge:
+    """
+    A k-way merge of sorted streams of search results, e.g. of several concurrent searches sorted by Server Side Sorting.
+
+    Results can be pushed in any interleaving of the streams.
+    A result is only released when every unfinished stream has a buffered result, so the merged output is sorted as a whole.
+
+    >>> merge = SortedMerge(int, ['a', 'b'])
+    >>> merge.push('a', 1)
+    >>> merge.push('a', 4)
+    >>> merge.pop()
+    []
+    >>> merge.push('b', 2)
+    >>> merge.pop()
+    [1, 2]
+    >>> merge.finish('b')
+    >>> merge.pop()
+    [4]
+    """
+
+    __slots__ = ('_buffers', '_counter', '_heap', '_key', '_unfinished', '_waiting')
+
+    def __init__(self, key: Callable[[Any], Any], streams: Iterable[Hashable]) -> None:
+        self._key = key
+        self._buffers: dict[Hashable, deque[Any]] = {stream: deque() for stream in streams}
+        self._unfinished = set(self._buffers)
+        self._waiting = set(self._buffers)
+        self._heap: list[tuple[Any, int, Hashable]] = []
+        self._counter = itertools.count()
+
+    def push(self, stream: Hashable, item: Any) -> None:
+        """Add the next item of the stream."""
+        buffer = self._buffers[stream]
+        buffer.append(item)
+        if len(buffer) == 1:
+            self._push_head(stream)
+
+    def finish(self, stream: Hashable) -> None:
+        """Mark the stream as exhausted."""
+        self._unfinished.discard(stream)
+        self._waiting.discard(stream)
+
+    def pop(self) -> list[Any]:
+        """Release all items which are known to be next in order."""
+        items = []
+        while self._heap and not self._waiting:
+            _key, _counter, stream = heapq.heappop(self._heap)
+            buffer = self._buffers[stream]
+            items.append(buffer.popleft())
+            if buffer:
+                self._push_head(stream)
+            elif stream in self._unfinished:
+                self._waiting.add(stream)
+        return items
+
+    def _push_head(self, stream: Hashable) -> None:
+        self._waiting.discard(stream)
+        heapq.heappush(self._heap, (self._key(self._buffers[stream][0]), next(self._counter), stream))
+
+
+class ExternalSort:
+    """
+    Sort search results of any size with bounded memory usage (external merge sort).
+
+    Results are collected in runs of at most ``run_size`` entries, every full run is sorted and spilled to a temporary file.
+    Iterating merges the spilled runs and the remaining run in sort order.
+    Spilled results keep their DN and attributes, but not their response controls.
+
+    >>> from freeiam.ldap.attr import Attributes
+    >>> with ExternalSort(['uid'], run_size=2) as sorter:
+    ...     for uid in (b'd', b'b', b'C', b'a', b'e'):
+    ...         sorter.add(Result(None, Attributes({'uid': [uid]}), None, None))
+    ...     [result.attr['uid'][0] for result in sorter]
+    [b'a', b'b', b'C', b'd', b'e']
+    """
+
+    __slots__ = ('_key', '_run', '_runs', 'directory', 'run_size')
+
+    def __init__(self, sorting: 'Sorting', *, run_size: int = 10_000, directory: str | None = None) -> None:
+        if run_size <= 0:
+            msg = 'The run size must be positive'
+            raise ValueError(msg)
+        self.run_size = run_size
+        self.directory = directory
+        self._key = result_key(sorting)
+        self._run: list[Result] = []
+        self._runs: list[IO[bytes]] = []
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def add(self, result: Result) -> None:
+        """Add a result, spilling the current run to disk when it is full."""
+        self._run.append(result)
+        if len(self._run) >= self.run_size:
+            self._spill()
+
+    def __iter__(self) -> Iterator[Result]:
+        self._run.sort(key=self._key)
+        if not self._runs:
+            return iter(self._run)
+        for run in self._runs:
+            run.seek(0)
+        return heapq.merge(*map(self._read, self._runs), self._run, key=self._key)
+
+    def close(self) -> None:
+        """Remove the spilled runs."""
+        for run in self._runs:
+            run.close()
+        self._runs.clear()
+        self._run.clear()
+
+    def _spill(self) -> None:
+        self._run.sort(key=self._key)
+        run = tempfile.TemporaryFile(dir=self.directory)  # noqa: SIM115
+        self._runs.append(run)
+        for result in self._run:
+            pickle.dump((str(result.dn) if result.dn is not None else None, result.attr, result._response.msgid if result._response else None), run)
+        self._run = []
+
+    @staticmethod
+    def _read(run: IO[bytes]) -> Iterator[Result]:
+        while True:
+            try:
+                dn, attrs, msgid = pickle.load(run)  # noqa: S301
+            except EOFError:
+                return
+            yield Result.from_response(dn, attrs, None, _Response(ResponseType.SearchEntry, [(dn, attrs)], msgid, None))
@@ -3,13 +3,19 @@
 """LDAP Connection."""
 
 import contextlib
+import copy
+import itertools
 import logging
 import math
+import os
+import select
 import time
-from collections.abc import Callable, Generator, Sequence
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Sequence
 from types import TracebackType
 from typing import Any, Literal, Self, TypeAlias, cast, overload
 
+import ldap.filter
 import ldap.ldapobject
 import ldap.modlist
 import ldap.sasl
@@ -18,9 +24,12 @@ from ldap.schema import SCHEMA_ATTRS
 from freeiam import errors
 from freeiam.ldap._wrapper import Page, Result, _Response
 from freeiam.ldap.attr import Attributes
+from freeiam.ldap.bulk import BulkImport, ImportReport
+from freeiam.ldap.changelog import CHANGELOGS, ChangelogKind
 from freeiam.ldap.constants import (
     AnyOption,
     AnyOptionValue,
+    LDAPChangeType,
     Option,
     OptionValue,
     ResponseType,
@@ -31,10 +40,34 @@ from freeiam.ldap.constants import (
     TLSRequireCert,
     Version,
 )
-from freeiam.ldap.controls import Controls, server_side_sorting, simple_paged_results, transaction, virtual_list_view
+from freeiam.ldap.controls import (
+    ENTRY_CONTROL_REQUESTS,
+    TREE_DELETE_OID,
+    Controls,
+    dereference,
+    persistent_search,
+    server_side_sorting,
+    simple_paged_results,
+    sync_request,
+    transaction,
+    tree_delete,
+    virtual_list_view,
+)
+from freeiam.ldap.delta import Delta, Watermark, WatermarkStore
 from freeiam.ldap.dn import DN
 from freeiam.ldap.extended_operations import ExtendedRequest, ExtendedResponse, refresh_ttl, transaction_commit, transaction_start
+from freeiam.ldap.filter import Filter
+from freeiam.ldap.ldif import ChangeRecord, LDIFWriter
+from freeiam.ldap.matching import Matcher, Normalizer
+from freeiam.ldap.membership import GroupGraph
+from freeiam.ldap.modlist import modify_modlist
+from freeiam.ldap.pagination import AdaptivePageSize, TypeAhead, VLVCursor
+from freeiam.ldap.partition import Partition, range_filters, uuid_bounds
+from freeiam.ldap.psearch import ChangeEvent, ChangeType, decode_changes
+from freeiam.ldap.replica import LocalReplica
 from freeiam.ldap.schema import Schema
+from freeiam.ldap.sorting import ExternalSort, SortedMerge, result_key
+from freeiam.ldap.syncrepl import SYNC_REFRESH_REQUIRED, CookieStore, SyncEvent, SyncMode, decode_response
 
 
 __all__ = ('Connection',)
@@ -56,6 +89,8 @@ class Connection:
     :ivar bool automatic_reconnect: Whether automatic reconnection is enabled.
     :ivar int max_connection_attempts: number of connection attempt on connection loss.
     :ivar float retry_delay: The retry delay (in seconds) between the reconnection attempts.
+    :ivar float negative_cache_ttl: The time (in seconds) a ``NoSuchObject`` outcome of :meth:`get` is cached. ``0`` disables the cache.
+    :ivar int negative_cache_size: The maximum number of cached ``NoSuchObject`` outcomes, the oldest are evicted first.
     """
 
     __slots__ = (
@@ -63,12 +98,16 @@ class Connection:
         '__reconnects_counter',
         '__schema',
         '_conn',
+        '_entry_control_msgids',
         '_hide_parent_exception',
         '_last_auth_state',
+        '_negative_cache',
         '_options',
         '_start_tls',
         'automatic_reconnect',
         'max_connection_attempts',
+        'negative_cache_size',
+        'negative_cache_ttl',
         'retry_delay',
         'timeout',
         'uri',
@@ -102,6 +141,8 @@ class Connection:
         automatic_reconnect: bool = True,
         max_connection_attempts: int = 10,
         retry_delay: float = 0.0,
+        negative_cache_ttl: float = 0.0,
+        negative_cache_size: int = 10_000,
         _hide_parent_exception: bool = True,
         _conn: LDAPObject | None = None,
     ) -> None:
@@ -111,6 +152,10 @@ class Connection:
         self.automatic_reconnect = automatic_reconnect
         self.max_connection_attempts = max_connection_attempts
         self.retry_delay = retry_delay
+        self.negative_cache_ttl = negative_cache_ttl
+        self.negative_cache_size = negative_cache_size
+        self._negative_cache: dict[DN, tuple[float, str | None]] = {}
+        self._entry_control_msgids: set[int] = set()
         self._start_tls = start_tls
         self.__reconnects_counter = 0
         self.__schema: dict[DN | str | None, Schema] = {}
@@ -383,6 +428,16 @@ class Connection:
         for option, value in self._options:
             self.set_option(option, value, append=False)
 
+    def _clone(self) -> 'Connection':
+        """Clone the connection like :func:`copy.copy`, but authenticate asynchronously."""
+        state = self.__getstate__()
+        auth_state = state.pop('_last_auth_state', None)
+        clone = self.__class__.__new__(self.__class__)
+        clone.__setstate__({**state, '_last_auth_state': None})
+        if auth_state:
+            clone.bind(*auth_state[1:])
+        return clone
+
     def _restore_auth_state(self) -> None:
         if self._last_auth_state:
             with errors.LdapError.wrap(self._hide_parent_exception):
@@ -438,25 +493,413 @@ class Connection:
         controls: Controls | None = None,
     ) -> Result:
         """Get a LDAP object."""
-        for obj in self.search(base=dn, scope=Scope.BASE, filter_expr=filter_expr, attrs=attrs, unique=unique, controls=controls):
-            return obj
+        use_cache = self.negative_cache_ttl > 0 and controls is None
+        if use_cache and (cached_error := self._get_cached_no_such_object(DN.get(dn))):
+            raise cached_error
+        try:
+            for obj in self.search(base=dn, scope=Scope.BASE, filter_expr=filter_expr, attrs=attrs, unique=unique, controls=controls):
+                return obj
+        except errors.NoSuchObject as no_object_error:
+            if use_cache:
+                self._cache_no_such_object(DN.get(dn), no_object_error)
+            raise
         return None  # type: ignore[return-value] # pragma: no cover; impossible
         # obj, = [_ for _ in self.search_iter(base=dn, scope=Scope.BASE, filter_expr=filter_expr, attrs=attrs, unique=unique, controls=controls)]  # noqa: E501
         # return obj[0]
         # # GC calls gen.aclose() causing unnecessary .cancel() to be called:
         # # return next(self.search_iter(base=dn, scope=Scope.BASE, filter_expr=filter_expr, attrs=attrs, unique=unique, controls=controls))
 
+    def get_many(
+        self,
+        dns: Iterable[DN | str],
+        attrs: list[str] | None = None,
+        filter_expr: str = '(objectClass=*)',
+        *,
+        concurrency: int = 10,
+        chunk_size: int | None = None,
+        controls: Controls | None = None,
+    ) -> Generator[tuple[DN, Result | errors.LdapError], None]:
+        """
+        Get many LDAP objects by pipelining BASE scope searches.
+
+        Up to ``concurrency`` searches are outstanding at the same time.
+        With ``chunk_size`` the objects are searched via ``(|(entryDN=...)...)`` filters below their naming context,
+        each containing up to ``chunk_size`` DNs of the same naming context.
+        Yields the DN together with the result or the error in the order of the given DNs:
+        a slow lookup delays yielding the following results, but not their requests, which stay pipelined.
+        Objects which don't exist or don't match the filter yield a :class:`~freeiam.errors.NoSuchObject` error.
+        """
+        entries = [DN.get(dn) for dn in dns]
+        cached: dict[DN, errors.NoSuchObject] = {}
+        if self.negative_cache_ttl > 0 and controls is None:
+            cached = {dn: error for dn in entries if (error := self._get_cached_no_such_object(dn))}
+        missing = [dn for dn in entries if dn not in cached]
+        chunk_size = chunk_size or 1
+        groups = [missing]
+        if chunk_size > 1:
+            try:
+                naming_contexts = [DN.get(context) for context in self.get_naming_contexts()]
+            except errors.LdapError:
+                naming_contexts = []
+            groups = list(self._group_by_naming_context(missing, naming_contexts).values())
+        chunks = [group[i : i + chunk_size] for group in groups for i in range(0, len(group), chunk_size)]
+        received: dict[DN, deque[Result | errors.LdapError]] = {}
+        with contextlib.closing(self._search_many(chunks, attrs, filter_expr, concurrency, controls)) as results:
+            for dn in entries:
+                if dn in cached:
+                    yield dn, cached[dn]
+                    continue
+                while not received.get(dn):  # the chunks of other naming contexts might have been searched before
+                    found, result = next(results)
+                    received.setdefault(found, deque()).append(result)
+                yield dn, received[dn].popleft()
+
+    @staticmethod
+    def _group_by_naming_context(dns: list[DN], naming_contexts: list[DN]) -> dict[DN, list[DN]]:
+        """
+        Group the DNs by their naming context, or by their last RDN if they aren't below any of the naming contexts.
+
+        >>> groups = Connection._group_by_naming_context(
+        ...     [DN('uid=a,dc=freeiam,dc=org'), DN('cn=b,cn=config'), DN('uid=c,dc=freeiam,dc=org')], [DN('dc=freeiam,dc=org')]
+        ... )
+        >>> {str(context): [str(dn) for dn in dns] for context, dns in groups.items()}
+        {'dc=freeiam,dc=org': ['uid=a,dc=freeiam,dc=org', 'uid=c,dc=freeiam,dc=org'], 'cn=config': ['cn=b,cn=config']}
+        """
+        contexts = sorted(naming_contexts, key=len, reverse=True)
+        groups: dict[DN, list[DN]] = {}
+        for dn in dns:
+            context = next((context for context in contexts if dn.endswith(context)), dn[-1:] if len(dn) else dn)
+            groups.setdefault(context, []).append(dn)
+        return groups
+
+    def _search_many(
+        self, chunks: list[list[DN]], attrs: list[str] | None, filter_expr: str, concurrency: int, controls: Controls | None
+    ) -> Generator[tuple[DN, Result | errors.LdapError], None]:
+        """Pipeline a search for each chunk of DNs and yield each DN with its result in order."""
+        conn = self.conn
+
+        def request(chunk: list[DN]) -> tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]:
+            base, scope, filterstr = chunk[0], Scope.BASE, filter_expr
+            if len(chunk) > 1:
+                for dn in chunk[1:]:
+                    while not dn.endswith(base):
+                        base = base.parent or DN.get('')
+                entry_dns = ''.join(f'(entryDN={ldap.filter.escape_filter_chars(str(dn))})' for dn in chunk)
+                scope, filterstr = Scope.SUBTREE, f'(&{filter_expr}(|{entry_dns}))'
+            kwargs = {'filterstr': filterstr, 'attrlist': attrs, **Controls.expand(controls), 'timeout': self.timeout}
+            return conn.search_ext, (str(base), scope), kwargs
+
+        remaining = iter(chunks)
+        with contextlib.closing(self._execute_many(conn, map(request, chunks), concurrency)) as responses:
+            for response in responses:
+                chunk = next(remaining)
+                if isinstance(response, errors.LdapError):
+                    if isinstance(response, errors.NoSuchObject) and len(chunk) == 1:
+                        response.base_dn, response.filter, response.scope, response.attrs = chunk[0], filter_expr, Scope.BASE, attrs
+                        if self.negative_cache_ttl > 0 and controls is None:
+                            self._cache_no_such_object(chunk[0], response)
+                    for dn in chunk:
+                        yield dn, response
+                    continue
+                Result.set_controls(response, controls)
+                assert response.data is not None  # noqa: S101
+                results = [Result.from_response(dn, attributes, controls, response) for dn, attributes in response.data]
+                found = {result.dn: result for result in results}
+                for dn in chunk:
+                    yield dn, found.get(dn) or self._no_such_object(dn, filter_expr, attrs)
+
+    @staticmethod
+    def _no_such_object(dn: DN, filter_expr: str, attrs: list[str] | None) -> errors.NoSuchObject:
+        """Create an error for an object which was not part of the search results."""
+        error = errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'ctrls': []})
+        error.base_dn = dn
+        error.filter = filter_expr
+        error.scope = Scope.BASE
+        error.attrs = attrs
+        return error
+
+    def _get_cached_no_such_object(self, dn: DN) -> errors.NoSuchObject | None:
+        """Get the cached NoSuchObject error for the DN, if the DN or one of its parents is known to not exist."""
+        if not self._negative_cache:
+            return None
+        now = time.monotonic()
+        for parent in dn.walk():
+            cached = self._negative_cache.get(parent)
+            if cached is None:
+                continue
+            expires, matched = cached
+            if expires < now:
+                del self._negative_cache[parent]
+                continue
+            error = errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'matched': matched or '', 'ctrls': []})
+            error.base_dn = dn
+            return error
+        return None
+
+    def _cache_no_such_object(self, dn: DN, error: errors.NoSuchObject) -> None:
+        """
+        Remember that the DN does not exist. Everything below the matched DN is missing as well.
+
+        The cache is ordered by insertion, so expired outcomes are removed from its start and it's bounded by ``negative_cache_size``.
+        """
+        missing = dn
+        if error.matched:
+            matched = DN.get(error.matched)
+            if dn.endswith(matched) and len(dn) > len(matched):
+                missing = dn[len(dn) - len(matched) - 1 :]
+        cache = self._negative_cache
+        now = time.monotonic()
+        cache.pop(missing, None)
+        while cache and (len(cache) >= self.negative_cache_size or next(iter(cache.values()))[0] < now):
+            del cache[next(iter(cache))]
+        cache[missing] = (now + self.negative_cache_ttl, error.matched)
+
+    def _invalidate_negative_cache(self, dn: DN | str) -> None:
+        """Forget cached NoSuchObject outcomes for the created DN and its parents."""
+        if not self._negative_cache:
+            return
+        for parent in DN.get(dn).walk():
+            self._negative_cache.pop(parent, None)
+
     def get_attr(
         self, dn: DN | str, attr: str, filter_expr: str = '(objectClass=*)', *, unique: bool = False, controls: Controls | None = None
     ) -> list[bytes]:
-        """Get attribute of an LDAP object."""
+        """Get attribute of an LDAP object. Values returned via range retrieval are fetched completely."""
+        return list(self.iter_attr(dn, attr, filter_expr, unique=unique, controls=controls))
+
+    def iter_attr(
+        self, dn: DN | str, attr: str, filter_expr: str = '(objectClass=*)', *, unique: bool = False, controls: Controls | None = None
+    ) -> Generator[bytes, None]:
+        """
+        Iterate over the values of an attribute of an LDAP object.
+
+        Huge multi valued attributes returned via range retrieval (``member;range=0-1499``) are fetched range by range,
+        when the values of the previous range are consumed.
+        """
         attributes = (self.get(dn, attrs=[attr], filter_expr=filter_expr, unique=unique, controls=controls)).attr
         assert attributes is not None  # noqa: S101
+        ranged = attributes.get_range(attr)
+        if ranged is None:
+            try:
+                values = attributes[attr]
+            except KeyError:
+                self.get_schema()
+                values = attributes[attr]
+            for value in values:
+                yield value
+            return
+
+        for value in self._iter_ranges(dn, attr, ranged, filter_expr, controls):
+            yield value
+
+    def _iter_ranges(
+        self, dn: DN | str, attr: str, ranged: tuple[list[bytes], int | None] | None, filter_expr: str, controls: Controls | None
+    ) -> Generator[bytes, None]:
+        """Yield the values of the given range and fetch the following ranges."""
+        while ranged is not None:
+            values, start = ranged
+            yield from values
+            if start is None:
+                return
+            attributes = (self.get(dn, attrs=[f'{attr};range={start}-*'], filter_expr=filter_expr, controls=controls)).attr
+            assert attributes is not None  # noqa: S101
+            ranged = attributes.get_range(attr)
+
+    def resolve_ranges(self, result: Result, *, controls: Controls | None = None) -> Result:
+        """Fetch the remaining values of all attributes of a result, which were returned via range retrieval, and merge them in."""
+        if result.attr is None or result.dn is None:
+            return result
+        for attr in result.attr.ranged():
+            ranges = self._iter_ranges(result.dn, attr, result.attr.get_range(attr), '(objectClass=*)', controls)
+            values = list(ranges)
+            for name in [name for name in result.attr if name.lower().startswith(f'{attr.lower()};') and ';range=' in name.lower()]:
+                del result.attr[name]
+            result.attr[attr] = values
+        return result
+
+    def refresh_groups(self, graph: GroupGraph, *, controls: Controls | None = None) -> GroupGraph:
+        """
+        Load the groups into the membership graph.
+
+        After the first load only the groups modified since the last refresh are fetched (via ``modifyTimestamp``),
+        and the groups which don't exist anymore are removed.
+        """
+        filter_expr = graph.filter_expr
+        incremental = graph.timestamp is not None
+        if incremental:
+            filter_expr = f'(&{filter_expr}(modifyTimestamp>={graph.timestamp}))'
+        for result in self.search_iter(graph.base, graph.scope, filter_expr, [*graph.member_attrs, 'modifyTimestamp'], controls=controls):
+            graph.load(result)
+        if incremental:
+            existing = set(self.search_dn(graph.base, graph.scope, graph.filter_expr, controls=controls))
+            for group in graph.groups - existing:
+                graph.remove(group)
+        return graph
+
+    def refresh_replica(self, replica: LocalReplica, *, persist: bool = False, controls: Controls | None = None) -> LocalReplica:
+        """
+        Synchronize the local replica via syncrepl.
+
+        Only the changes since the last refresh are fetched. With ``persist`` this keeps the replica current until the iteration is stopped
+        (e.g. by cancelling the task), in the meantime the replica doesn't become stale.
+        """
+        replica.begin_refresh(persist)
         try:
-            return attributes[attr]
-        except KeyError:
-            self.get_schema()
-            return attributes[attr]
+            with contextlib.closing(
+                self.syncrepl(
+                    replica.base,
+                    replica.scope,
+                    replica.filter_expr,
+                    replica.attrs,
+                    mode='refreshAndPersist' if persist else 'refreshOnly',
+                    cookie_store=replica.cookie_store,
+                    controls=controls,
+                )
+            ) as events:
+                for event in events:
+                    replica.apply(event)
+        finally:
+            replica.end_refresh()
+        return replica
+
+    def export_delta(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        store: WatermarkStore,
+        overlap: int = 300,
+        detect_deletions: bool = True,
+        delta_attr: str = 'modifyTimestamp',
+        controls: Controls | None = None,
+    ) -> Delta:
+        """
+        Export the entries changed since the last export.
+
+        Without a watermark of a previous export in the ``store`` all entries are exported.
+        Otherwise only the entries whose ``delta_attr`` is in the time span since the watermark are fetched.
+        The time span starts ``overlap`` seconds before the watermark, so that changes aren't missed due to clock skew
+        between the client and the servers, entries changed within the overlap are exported twice.
+        Deletions are detected by comparing the DNs of all matching entries (a DN-only search) with the DNs of the last export.
+        The new watermark is stored after the export succeeded.
+        """
+        previous = store.get(base, scope, filter_expr)
+        until = int(time.time())
+        search_filter = filter_expr
+        if previous is not None:
+            since = min(max(int(previous.timestamp) - overlap, 0), until)
+            search_filter = f'(&{filter_expr}{Filter.time_span_filter(since, until, delta_attr)})'
+        changed = list(self.search_iter(base, scope, search_filter, attrs, controls=controls))
+        dns = None
+        deleted: set[DN] = set()
+        if detect_deletions:
+            if previous is None:
+                dns = frozenset(result.dn for result in changed if result.dn is not None)
+            else:
+                dns = frozenset(list(self.search_dn(base, scope, filter_expr, controls=controls)))
+                deleted = set(previous.dns or ()) - dns
+        watermark = Watermark(until, dns)
+        store.set(base, scope, filter_expr, watermark)
+        return Delta(changed, deleted, watermark, full=previous is None)
+
+    def read_changelog(
+        self,
+        base: DN | str = 'cn=accesslog',
+        *,
+        kind: ChangelogKind = 'accesslog',
+        target: DN | str | None = None,
+        checkpoint_store: CookieStore | None = None,
+        batch_size: int = 100,
+        poll_interval: float | None = None,
+        controls: Controls | None = None,
+    ) -> Generator[ChangeRecord, None]:
+        """
+        Read the change records of the accesslog overlay (``cn=accesslog``) or a retro changelog (``cn=changelog``).
+
+        The records are read in batches of ``batch_size`` after the checkpoint (``reqStart`` or ``changeNumber``) of the ``checkpoint_store``.
+        The checkpoint is advanced after a record has been consumed, so that an interrupted consumer resumes after the last processed record.
+        Records are only fetched when the consumer asks for them, so at most one batch is kept in memory (backpressure).
+        The batches are sorted by the checkpoint attribute via Server Side Sorting, so that a batch contains the next records.
+        Servers not supporting the sorting are read completely after the checkpoint and sorted on the client side instead.
+        With ``target`` only the changes of entries below this DN are yielded.
+        Without ``poll_interval`` the iteration stops when all records have been read,
+        otherwise the changelog is polled for new records every ``poll_interval`` seconds.
+        """
+        changelog = CHANGELOGS[kind]
+        store = checkpoint_store if checkpoint_store is not None else CookieStore()
+        target_dn = DN.get(target) if target is not None else None
+        size = batch_size
+        sorted_batches = True
+        while True:
+            checkpoint = store.get()
+            filter_expr = changelog.filter_expr
+            if checkpoint is not None:
+                filter_expr = f'(&{filter_expr}({changelog.key_attr}>={ldap.filter.escape_filter_chars(checkpoint)}))'
+            records = []
+            exceeded = False
+            # without sorting the server may return any subset, the checkpoint would skip the records not returned
+            sizelimit, sorting = (size, cast('Sorting', [changelog.key_attr])) if sorted_batches else (None, None)
+            try:
+                for result in self.search_iter(
+                    base, Scope.ONELEVEL, filter_expr, changelog.attrs, sizelimit=sizelimit, sorting=sorting, controls=copy.copy(controls)
+                ):
+                    record = changelog.decode(result)
+                    if record is not None and record.checkpoint != checkpoint:
+                        records.append(record)
+            except errors.SizelimitExceeded:
+                exceeded = True
+            except (errors.UnavailableCriticalExtension, errors.UnwillingToPerform, errors.InappropriateMatching) as exc:
+                if not sorted_batches:
+                    raise
+                log.debug('Sorting the changelog failed, reading all records: %s', exc)
+                sorted_batches = False
+                continue
+            records.sort(key=lambda record: changelog.order(record.checkpoint))
+            if exceeded and not records:
+                size *= 2  # all returned records have been consumed already
+                continue
+            size = batch_size
+            for record in records:
+                if target_dn is None or record.dn.endswith(target_dn):
+                    yield record
+                store.set(record.checkpoint)
+            if exceeded:
+                continue
+            if poll_interval is None:
+                return
+            time.sleep(poll_interval)
+
+    def export_ldif(
+        self,
+        path: str | os.PathLike[str],
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        page_size: int | None = 1000,
+        compress: bool | None = None,
+        base64_attrs: Iterable[str] = (),
+        controls: Controls | None = None,
+    ) -> int:
+        """
+        Stream the matching entries into a LDIF file, returns the number of exported entries.
+
+        The entries are written while they are received (paginated with ``page_size``), so the export isn't held in memory.
+        The file is gzip compressed if ``compress`` or if the file name ends with ``.gz``.
+        Values of attributes with a binary syntax in the schema are base64 encoded, see :class:`~freeiam.ldap.ldif.LDIFWriter`.
+        """
+        schema = self.get_schema()
+        if page_size:
+            results = self.search_paged(base, scope, filter_expr, attrs, page_size, controls=controls)
+        else:
+            results = self.search_iter(base, scope, filter_expr, attrs, controls=controls)
+        with LDIFWriter.open(path, compress=compress, schema=schema, base64_attrs=base64_attrs) as writer:
+            for result in results:
+                writer.write_result(result)
+        return writer.records
 
     def search_iter(
         self,
@@ -466,16 +909,24 @@ class Connection:
         attrs: list[str] | None = None,
         *,
         unique: bool = False,
-        sizelimit: bool | None = None,
+        sizelimit: int | None = None,
         sorting: Sorting | None = None,
+        deref: dict[str, list[str]] | None = None,
         controls: Controls | None = None,
         _attrsonly: bool = False,
     ) -> Generator[Result, None]:
-        """Search iterative for DN and Attributes of LDAP objects."""
+        """
+        Search iterative for DN and Attributes of LDAP objects.
+
+        With ``deref`` the entries referenced by the given DN valued attributes are returned together with the requested attributes
+        via the Dereference control, e.g. ``deref={'member': ['uid', 'mail']}``, see :attr:`Result.dereferenced`.
+        """
         conn = self.conn
         all_results = []
         if sorting:
             controls = Controls.set_server(controls, server_side_sorting(*sorting, criticality=True))
+        if deref:
+            controls = Controls.set_server(controls, dereference(deref, criticality=True))
         # sizelimit = 1 if unique else sizelimit
         try:
             for response in self._execute_iter(
@@ -523,16 +974,19 @@ class Connection:
         attrs: list[str] | None = None,
         *,
         unique: bool = False,
-        sizelimit: bool | None = None,
+        sizelimit: int | None = None,
         sorting: Sorting | None = None,
+        deref: dict[str, list[str]] | None = None,
         controls: Controls | None = None,
         _attrsonly: bool = False,
     ) -> list[Result]:
-        """Search for DN and Attributes of LDAP objects."""
+        """Search for DN and Attributes of LDAP objects. See :meth:`search_iter` for ``deref``."""
         conn = self.conn
         all_results = []
         if sorting:
             controls = Controls.set_server(controls, server_side_sorting(*sorting))
+        if deref:
+            controls = Controls.set_server(controls, dereference(deref, criticality=True))
         try:
             response = self._execute(
                 conn,
@@ -560,6 +1014,67 @@ class Connection:
             raise
         return results
 
+    def count(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        *,
+        vlv: bool | None = None,
+        sorting: Sorting | None = None,
+        controls: Controls | None = None,
+    ) -> int:
+        """
+        Count the matching LDAP objects without receiving their attributes.
+
+        By default the count is probed via the ``contentCount`` of a Virtual List View search (sorted by ``sorting``, default ``cn``),
+        which transfers a single entry only. The server still sorts all matching entries for it,
+        so pass an indexed sort key (e.g. one with a sorted VLV index) as ``sorting`` for large result sets.
+        If the server doesn't support it or the sorting exceeds a server limit, the DNs are streamed and counted without building results.
+        ``vlv=True`` requires the Virtual List View, ``vlv=False`` always streams.
+        """
+        if vlv is not False:
+            try:
+                return self._count_vlv(base, scope, filter_expr, sorting or ['cn'], copy.copy(controls))
+            except (
+                errors.UnavailableCriticalExtension,
+                errors.UnwillingToPerform,
+                errors.InappropriateMatching,
+                errors.VLVError,
+                errors.AdminlimitExceeded,
+                errors.SizelimitExceeded,
+                errors.ResultsTooLarge,
+            ) as exc:
+                if vlv:
+                    raise
+                log.debug('Counting via Virtual List View failed, counting all entries: %s', exc)
+
+        conn = self.conn
+        count = 0
+        try:
+            for response in self._execute_iter(
+                conn, conn.search_ext, str(base), scope, filterstr=filter_expr, attrlist=['1.1'], attrsonly=1, **self._search_kwargs(None, controls)
+            ):
+                if response.type == ResponseType.SearchEntry:
+                    count += len(response.data or ())
+        except errors.NoSuchObject as no_object_error:
+            no_object_error.base_dn = DN.get(base)
+            no_object_error.filter = filter_expr
+            no_object_error.scope = scope
+            raise
+        return count
+
+    def _count_vlv(self, base: DN | str, scope: Scope, filter_expr: str, sorting: Sorting, controls: Controls | None) -> int:
+        """Get the number of matching objects from the ``contentCount`` of a Virtual List View search."""
+        controls = Controls.set_server(controls, server_side_sorting(*sorting, criticality=True))
+        probe = virtual_list_view(before_count=0, after_count=0, offset=1, content_count=0, criticality=True)
+        controls = Controls.set_server(controls, probe)
+        self.search(base, scope, filter_expr, ['1.1'], controls=controls)
+        vlv = cast('ldap.controls.vlv.VLVResponseControl | None', controls.get(virtual_list_view.response()))
+        if vlv is None:
+            raise errors.UnavailableCriticalExtension({'desc': 'Unavailable critical extension', 'info': 'No Virtual List View response control'})
+        return int(vlv.contentCount)
+
     def search_dn(
         self,
         base: DN | str = '',
@@ -567,7 +1082,7 @@ class Connection:
         filter_expr: str = '(objectClass=*)',
         *,
         unique: bool = False,
-        sizelimit: bool | None = None,
+        sizelimit: int | None = None,
         sorting: Sorting | None = None,
         controls: Controls | None = None,
     ) -> Generator[DN, None]:
@@ -589,25 +1104,31 @@ class Connection:
         filter_expr: str = '(objectClass=*)',
         attrs: list[str] | None = None,
         *,
-        page_size: int = 100,
+        page_size: int | AdaptivePageSize = 100,
         sorting: Sorting,
         unique: bool = False,
-        sizelimit: bool | None = None,
+        sizelimit: int | None = None,
         controls: Controls | None = None,
     ) -> Generator[Result, None]:
-        """Search paginated using Virtual List View control."""
+        """
+        Search paginated using Virtual List View control.
+
+        The ``page_size`` can be a :class:`~freeiam.ldap.pagination.AdaptivePageSize`,
+        which adapts the size of each page to the latency and size of the previous pages and to server limits.
+        """
         controls = Controls.set_server(controls, server_side_sorting(*sorting))
+        adaptive = page_size if isinstance(page_size, AdaptivePageSize) else None
 
         res_vlv = virtual_list_view.response()
         context_id = None
         length = None
-        last_page = None
         page = 1
+        offset = 0
         while True:
-            offset = ((page or 1) - 1) * page_size
+            size = int(page_size)
             pagination = virtual_list_view(
                 before_count=0,
-                after_count=page_size - 1,
+                after_count=size - 1,
                 offset=offset + 1,
                 content_count=0,
                 greater_than_or_equal=None,
@@ -615,35 +1136,110 @@ class Connection:
                 criticality=True,
             )
             controls = Controls.set_server(controls, pagination)
-            if length is not None and offset > length:
+            if length is not None and offset >= length:
                 break  # end reached
 
-            vlv: ldap.controls.vlv.VLVResponseControl | None = None
-            current = None
-            for entry_number, result in enumerate(
-                self.search(base, scope, filter_expr, attrs, unique=unique, sizelimit=sizelimit, controls=controls), 1
-            ):
-                if last_page is None:
-                    vlv = cast('ldap.controls.vlv.VLVResponseControl', controls.get(res_vlv))
-                    length = vlv.contentCount
-                    last_page = math.ceil(length / (page_size or length))
+            started = time.monotonic()
+            try:
+                results = self.search(base, scope, filter_expr, attrs, unique=unique, sizelimit=sizelimit, controls=controls)
+            except (errors.AdminlimitExceeded, errors.SizelimitExceeded):
+                if adaptive is None or sizelimit or not adaptive.limit_exceeded():
+                    raise
+                continue  # retry with smaller page size
+            if not results:  # no search results
+                break
+            if adaptive is not None:
+                adaptive.record(len(results), time.monotonic() - started, AdaptivePageSize.estimate_size(results))
+
+            vlv = cast('ldap.controls.vlv.VLVResponseControl', controls.get(res_vlv))
+            context_id = vlv.context_id
+            length = vlv.contentCount
+            last_page = page + math.ceil(max(length - offset - len(results), 0) / int(page_size))
+            for entry_number, result in enumerate(results, 1):
                 result.page = Page(
                     page=page,
                     entry=entry_number,
-                    page_size=page_size,
+                    page_size=size,
                     results=length,
                     last_page=last_page,
                 )
-                current = result
                 yield result
 
-            if current is None:  # no search results
-                break
-
             page += 1
-            vlv = cast('ldap.controls.vlv.VLVResponseControl', controls.get(res_vlv))
-            context_id = vlv.context_id
-            length = vlv.contentCount
+            offset += len(results)
+
+    def search_vlv_page(self, cursor: VLVCursor, page: int) -> list[Result]:
+        """Get any page of a Virtual List View cursor, without walking the previous pages. Recently fetched pages are served from the cache."""
+        if page < 1:
+            msg = 'Pages start at 1'
+            raise ValueError(msg)
+        results = cursor.get_cached(page)
+        if results is not None:
+            return results
+        if cursor.last_page is not None and page > cursor.last_page:
+            return []  # the server would respond with an offset range error
+
+        results = self.search_vlv_window(cursor, cursor.offset(page), 0, cursor.page_size - 1)
+        for entry_number, result in enumerate(results, 1):
+            result.page = Page(
+                page=page,
+                entry=entry_number,
+                page_size=cursor.page_size,
+                results=cursor.content_count,
+                last_page=cursor.last_page,
+            )
+        cursor.cache(page, results)
+        return results
+
+    def search_vlv_window(self, cursor: VLVCursor, offset: int, before: int = 0, after: int | None = None) -> list[Result]:
+        """Get the entries around the (one based) offset of a Virtual List View cursor."""
+        controls = Controls.set_server(cursor.controls, server_side_sorting(*cursor.sorting))
+        pagination = virtual_list_view(
+            before_count=before,
+            after_count=cursor.page_size - 1 if after is None else after,
+            offset=offset,
+            content_count=cursor.content_count or 0,
+            greater_than_or_equal=None,
+            context_id=cursor.context_id,
+            criticality=True,
+        )
+        controls = Controls.set_server(controls, pagination)
+        results = self.search(cursor.base, cursor.scope, cursor.filter_expr, cursor.attrs, controls=controls)
+        vlv = cast('ldap.controls.vlv.VLVResponseControl', controls.get(virtual_list_view.response()))
+        cursor.update(vlv.context_id, vlv.contentCount)
+        return results
+
+    def search_type_ahead(self, type_ahead: TypeAhead, prefix: str) -> list[Result]:
+        """
+        Search the entries whose attribute starts with the typed prefix, e.g. for autocompletion.
+
+        Positions a Virtual List View window at the first entry whose sort key is greater or equal to the prefix,
+        instead of doing a substring search. Returns up to ``type_ahead.size`` matching entries.
+        """
+        results = type_ahead.get_cached(prefix)
+        if results is not None:
+            return results
+
+        controls = Controls.set_server(type_ahead.controls, server_side_sorting(*type_ahead.sorting))
+        pagination = virtual_list_view(
+            before_count=0,
+            after_count=type_ahead.size - 1,
+            offset=None if prefix else 1,
+            content_count=None if prefix else 0,
+            greater_than_or_equal=prefix or None,
+            context_id=type_ahead.context_id,
+            criticality=True,
+        )
+        controls = Controls.set_server(controls, pagination)
+        window = self.search(type_ahead.base, type_ahead.scope, type_ahead.filter_expr, type_ahead.attrs, controls=controls)
+        vlv = cast('ldap.controls.vlv.VLVResponseControl', controls.get(virtual_list_view.response()))
+        type_ahead.context_id = vlv.context_id
+
+        results = list(itertools.takewhile(lambda result: type_ahead.matches(result, prefix), window))
+        # all entries with this prefix are known, if the window reached the end of the list or the first non matching entry
+        complete = len(window) < type_ahead.size or len(results) < len(window)
+        type_ahead.cache(prefix, results, complete=complete)
+        return results
 
     def search_paged(
         self,
@@ -651,25 +1247,43 @@ class Connection:
         scope: Scope = Scope.SUBTREE,
         filter_expr: str = '(objectClass=*)',
         attrs: list[str] | None = None,
-        page_size: int = 100,
+        page_size: int | AdaptivePageSize = 100,
         *,
         unique: bool = False,
-        sizelimit: bool | None = None,
+        sizelimit: int | None = None,
         sorting: Sorting | None = None,
         controls: Controls | None = None,
+        prefetch: int = 0,
     ) -> Generator[Result, None]:
-        """Search paginated using SimplePagedResults control."""
-        pagination = simple_paged_results(size=page_size, cookie='', criticality=True)
+        """
+        Search paginated using SimplePagedResults control.
+
+        With ``prefetch`` the request for the next page is sent as soon as the cookie of the current page arrived,
+        so that the server prepares the next page while the caller consumes the current one.
+        Up to ``prefetch`` received pages are buffered.
+
+        The ``page_size`` can be a :class:`~freeiam.ldap.pagination.AdaptivePageSize`,
+        which adapts the size of each page to the latency and size of the previous pages and to server limits.
+        """
+        pagination = simple_paged_results(size=int(page_size), cookie='', criticality=True)
         controls = Controls.append_server(controls, pagination)
         if sorting:
             controls = Controls.set_server(controls, server_side_sorting(*sorting))
         page = 0
+        if prefetch > 0 or isinstance(page_size, AdaptivePageSize):
+            for size, results in self._search_pages(base, scope, filter_expr, attrs, page_size, prefetch, pagination, unique, sizelimit, controls):
+                page += 1
+                for entry_number, result in enumerate(results, 1):
+                    result.page = Page(page=page, entry=entry_number, page_size=size)
+                    yield result
+            return
+
         while True:
             current = None
             page += 1
             entry_number = 0
             for result in self.search_iter(base, scope, filter_expr, attrs, unique=unique, sizelimit=sizelimit, controls=controls):
-                entry_number += 1  # noqa: SIM113
+                entry_number += 1
                 result.page = Page(page=page, entry=entry_number, page_size=page_size)
                 current = result
                 yield result
@@ -684,6 +1298,563 @@ class Connection:
             if not pagination.cookie:
                 break
 
+    def _search_pages(
+        self,
+        base: DN | str,
+        scope: Scope,
+        filter_expr: str,
+        attrs: list[str] | None,
+        page_size: int | AdaptivePageSize,
+        prefetch: int,
+        pagination: 'ldap.controls.pagedresults.SimplePagedResultsControl',
+        unique: bool,
+        sizelimit: int | None,
+        controls: Controls,
+    ) -> Generator[tuple[int, list[Result]], None]:
+        """Search the complete pages of a SimplePagedResults search, while requesting the next page ahead of time."""
+        conn = self.conn
+        adaptive = page_size if isinstance(page_size, AdaptivePageSize) else None
+        pages: deque[tuple[int, list[Result]]] = deque()
+        msgid: int | None = None
+        started = 0.0
+        done = False
+        try:
+            while True:
+                if msgid is None and not done and len(pages) < max(prefetch, 1):
+                    pagination.size = int(page_size)
+                    started = time.monotonic()
+                    msgid = self._retry(
+                        self.request, conn.search_ext, str(base), scope, filter_expr, attrs, 0, **self._search_kwargs(sizelimit, controls)
+                    )
+                if msgid is not None:
+                    # only block if there is nothing left to consume, otherwise just collect an already received page
+                    try:
+                        response = self.get_result(conn, msgid, _all=1, timeout=0) if pages else self._result(conn, msgid)
+                    except (errors.AdminlimitExceeded, errors.SizelimitExceeded):
+                        if adaptive is None or sizelimit or not adaptive.limit_exceeded():
+                            raise
+                        msgid = None
+                        continue  # request the page again with a smaller page size
+                    if response.type is not None:
+                        msgid = None
+                        results = self._search_results(response, unique, controls)
+                        if adaptive is not None:
+                            latency = None if pages else time.monotonic() - started
+                            adaptive.record(len(results), latency, AdaptivePageSize.estimate_size(results))
+                        control = cast('ldap.controls.pagedresults.SimplePagedResultsControl | None', controls.get(pagination))
+                        pagination.cookie = control.cookie if control else b''
+                        done = not results or not pagination.cookie
+                        if results:
+                            pages.append((pagination.size, results))
+                        continue
+                if not pages:
+                    break
+                yield pages.popleft()
+        except errors.NoSuchObject as no_object_error:
+            no_object_error.base_dn = DN.get(base)
+            no_object_error.filter = filter_expr
+            no_object_error.scope = scope
+            no_object_error.attrs = attrs
+            raise
+        finally:
+            if msgid is not None:
+                with contextlib.suppress(errors.LdapError):
+                    self.abandon(msgid)
+
+    def _search_kwargs(self, sizelimit: int | None, controls: Controls | None) -> dict[str, Any]:
+        """Get the keyword arguments of a search request."""
+        return {**Controls.expand(controls), 'timeout': self.timeout, 'sizelimit': sizelimit or OptionValue.NoLimit}
+
+    @classmethod
+    def _search_results(cls, response: _Response, unique: bool, controls: Controls | None) -> list[Result]:
+        """Get the results of a complete search response."""
+        Result.set_controls(response, controls)
+        assert response.data is not None  # noqa: S101
+        results = [Result.from_response(dn, attributes, controls, response) for dn, attributes in response.data]
+        if unique and len(results) > 1:
+            raise errors.NotUnique(results)
+        return results
+
+    def search_keyset(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        key_attr: str,
+        page_size: int = 100,
+        ordering_rule: str | None = None,
+        start: str | None = None,
+        start_dns: Iterable[DN | str] = (),
+        controls: Controls | None = None,
+    ) -> Generator[Result, None]:
+        """
+        Search paginated by the value of a key attribute, without any server side paging state.
+
+        Every page is a new search for ``(&(filter)(key_attr>=last key))``, sorted by the key attribute via Server Side Sorting
+        and limited via the sizelimit to ``page_size`` entries. Entries without the key attribute are not found.
+        The key attribute must be single valued: ``(key_attr>=last key)`` matches an entry if any of its values does,
+        so entries with multiple values would be found again on later pages. :class:`ValueError` is raised for them.
+        Keys are compared by the ``ordering_rule``, or else the ordering (or equality) matching rule of the schema.
+        To resume an interrupted search, pass the last processed key as ``start``
+        and the DNs with this key which were already processed as ``start_dns``.
+        """
+        if attrs is not None and key_attr not in attrs:
+            attrs = [*attrs, key_attr]
+        sorting: Sorting = [(key_attr, ordering_rule, False)]
+        if ordering_rule:
+            normalize = Matcher.get_rule(ordering_rule)
+        else:
+            matcher = Matcher(self.get_schema())
+            normalize = matcher.ordering(key_attr) or matcher.equality(key_attr)
+        last_key = start
+        last_normalized = None if start is None else self._normalized_key(normalize, start.encode('UTF-8'))
+        seen = {DN.get(dn) for dn in start_dns}  # the DNs with the last key
+        size = page_size
+        while True:
+            if last_key is None:
+                filterstr = f'(&{filter_expr}({key_attr}=*))'
+            else:
+                filterstr = f'(&{filter_expr}({key_attr}>={ldap.filter.escape_filter_chars(last_key)}))'
+            found = 0
+            try:
+                for result in self.search_iter(base, scope, filterstr, attrs, sizelimit=size, sorting=sorting, controls=controls):
+                    if result.dn in seen:
+                        continue
+                    assert result.attr is not None  # noqa: S101
+                    values = self._key_values(result.attr, key_attr)
+                    if len(values) != 1:
+                        msg = f'The key attribute {key_attr} of {result.dn} is not single valued'
+                        raise ValueError(msg)
+                    normalized = self._normalized_key(normalize, values[0])
+                    if last_key is None or normalized != last_normalized:
+                        last_key, last_normalized = values[0].decode('UTF-8'), normalized
+                        seen.clear()
+                    assert result.dn is not None  # noqa: S101
+                    seen.add(result.dn)
+                    found += 1
+                    yield result
+            except errors.SizelimitExceeded:
+                size = page_size if found else size * 2  # more than one page of entries share the same key
+                continue
+            break
+
+    @staticmethod
+    def _key_values(attrs: Attributes, key_attr: str) -> list[bytes]:
+        """
+        Get the values of the key attribute, whose name may differ in case or be an alias.
+
+        >>> Connection._key_values(Attributes({'CN': [b'Max']}), 'cn')
+        [b'Max']
+        """
+        aliases = {alias.lower(): name.lower() for alias, name in Attributes.ALIASES.items()}
+        key = aliases.get(key_attr.lower(), key_attr.lower())
+        return [value for name, values in attrs.items() if aliases.get(name.lower(), name.lower()) == key for value in values]
+
+    @staticmethod
+    def _normalized_key(normalize: Normalizer | None, value: bytes) -> Any:
+        """Normalize a key value, values which can't be normalized are compared exactly."""
+        if normalize is None:
+            return value
+        try:
+            return normalize(value)
+        except (ValueError, TypeError, errors.InvalidDN):
+            return value
+
+    def search_parallel(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        partition_by: str | None = None,
+        bounds: Sequence[str] | None = None,
+        partitions: int = 4,
+        connections: int = 1,
+        concurrency: int = 4,
+        controls: Controls | None = None,
+    ) -> Generator[Result, None]:
+        """
+        Search in disjoint partitions concurrently and yield the results in the order they arrive.
+
+        Without ``partition_by`` a subtree search is split at the children of the base, found via a ONELEVEL search.
+        Children which are deleted before their partition is searched are skipped.
+        With ``partition_by`` the search is split into value ranges of that single valued attribute at the given ``bounds``.
+        For ``entryUUID`` the bounds default to ``partitions`` evenly sized ranges.
+        The partitions are distributed over ``connections`` connections, the additional connections are cloned from this one.
+        Up to ``concurrency`` searches are outstanding at the same time.
+        """
+        if partition_by is None:
+            parts = [Partition(base, scope, filter_expr)]
+            if scope == Scope.SUBTREE:
+                parts = [Partition(base, Scope.BASE, filter_expr)]
+                parts.extend([Partition(child, Scope.SUBTREE, filter_expr, optional=True) for child in self.search_dn(base, Scope.ONELEVEL)])
+        else:
+            if bounds is None and partition_by.lower() == 'entryuuid':
+                bounds = uuid_bounds(partitions)
+            if bounds is None:
+                msg = 'Partitioning by value ranges requires bounds'
+                raise ValueError(msg)
+            parts = [Partition(base, scope, filter_expr).narrow(range_filter) for range_filter in range_filters(partition_by, bounds)]
+
+        for _index, result in self._search_partitions(parts, attrs, connections=connections, concurrency=concurrency, controls=controls):
+            if result is not None:
+                yield result
+
+    def search_many(
+        self,
+        bases: Iterable[DN | str],
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        sort_key: Sorting | None = None,
+        connections: int = 1,
+        concurrency: int | None = None,
+        controls: Controls | None = None,
+    ) -> Generator[Result, None]:
+        """
+        Search the same filter below several bases concurrently and yield the merged results.
+
+        Without ``sort_key`` the results are yielded in the order they arrive.
+        With ``sort_key`` every search is sorted via Server Side Sorting and the results are merged in sort order (k-way merge).
+        By default all searches are outstanding at the same time.
+        """
+        parts = [Partition(base, scope, filter_expr) for base in bases]
+        concurrency = len(parts) if concurrency is None else concurrency
+        if not sort_key:
+            for _index, result in self._search_partitions(parts, attrs, connections=connections, concurrency=concurrency, controls=controls):
+                if result is not None:
+                    yield result
+            return
+
+        merge = SortedMerge(result_key(sort_key), range(len(parts)))
+        controls = Controls.set_server(controls, server_side_sorting(*sort_key, criticality=True))
+        for index, result in self._search_partitions(parts, attrs, connections=connections, concurrency=concurrency, controls=controls):
+            if result is None:
+                merge.finish(index)
+            else:
+                merge.push(index, result)
+            yield from merge.pop()
+
+    def search_sorted(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        sorting: Sorting,
+        client_side: bool | None = None,
+        run_size: int = 10_000,
+        controls: Controls | None = None,
+    ) -> Generator[Result, None]:
+        """
+        Search sorted, either by Server Side Sorting or on the client side.
+
+        By default Server Side Sorting is tried first and the search falls back to sorting on the client side,
+        if the server rejects sorting (e.g. because it is not supported or the result set is too large).
+        ``client_side=True`` always sorts on the client side, ``client_side=False`` never.
+        Client side sorting uses an external merge sort, which keeps at most ``run_size`` entries in memory
+        and spills sorted runs to temporary files.
+        """
+        if not client_side:
+            yielded = False
+            try:
+                for result in self.search_iter(base, scope, filter_expr, attrs, sorting=sorting, controls=copy.copy(controls)):
+                    yielded = True
+                    yield result
+            except (errors.UnavailableCriticalExtension, errors.UnwillingToPerform, errors.AdminlimitExceeded, errors.ResultsTooLarge) as exc:
+                if client_side is False or yielded:
+                    raise
+                log.debug('Server side sorting failed, sorting on the client side: %s', exc)
+            else:
+                return
+
+        with ExternalSort(sorting, run_size=run_size) as sorter:
+            for result in self.search_iter(base, scope, filter_expr, attrs, controls=controls):
+                sorter.add(result)
+            for result in sorter:
+                yield result
+
+    def _search_partitions(
+        self, partitions: Sequence[Partition], attrs: list[str] | None, *, connections: int, concurrency: int, controls: Controls | None
+    ) -> Generator[tuple[int, Result | None], None]:
+        """
+        Search the partitions multiplexed over one or more connections.
+
+        Yields the index of the partition together with its results in the order they arrive, and ``None`` when the partition is done.
+        """
+        conns = [self, *[self._clone() for _ in range(min(connections, len(partitions)) - 1)]]
+        assign = itertools.cycle(conns)
+        queue = deque(enumerate(partitions))
+        active: dict[tuple[Connection, int], tuple[int, Partition]] = {}
+        try:
+            while queue or active:
+                while queue and len(active) < max(concurrency, 1):
+                    connection, (index, partition) = next(assign), queue.popleft()
+                    args = (str(partition.base), partition.scope, partition.filter_expr, attrs, 0)
+                    msgid = connection._retry(connection.request, connection.conn.search_ext, *args, **connection._search_kwargs(None, controls))
+                    active[(connection, msgid)] = (index, partition)
+
+                responses = self._receive_partitions(active, attrs)
+                for index, response in responses:
+                    if response is None:  # the base of the partition vanished
+                        yield index, None
+                        continue
+                    Result.set_controls(response, controls)
+                    if response.type == ResponseType.SearchResult:
+                        yield index, None
+                    elif response.type == ResponseType.SearchEntry:
+                        for dn, attributes in response.data or []:
+                            yield index, Result.from_response(dn, attributes, controls, response)
+
+                if active and not responses:
+                    self._wait_readable(list({connection.fileno for connection, _msgid in active}))
+        finally:
+            for connection, msgid in active:  # noqa: PLE1141
+                with contextlib.suppress(errors.LdapError):
+                    connection.request(connection.conn.abandon_ext, msgid)  # type: ignore[arg-type]
+            for connection in conns[1:]:
+                with contextlib.suppress(errors.LdapError):
+                    connection.unbind()
+                connection.disconnect()
+
+    @classmethod
+    def _receive_partitions(
+        cls, active: dict[tuple['Connection', int], tuple[int, Partition]], attrs: list[str] | None
+    ) -> list[tuple[int, _Response | None]]:
+        """
+        Receive the already available responses of the active partition searches without blocking. Finished searches are removed.
+
+        The response is ``None`` if the base of an optional partition doesn't exist (anymore).
+        """
+        responses: list[tuple[int, _Response | None]] = []
+        for (connection, msgid), (index, partition) in list(active.items()):
+            while (connection, msgid) in active:
+                try:
+                    response = connection.get_result(connection.conn, msgid, _all=0, timeout=0)
+                except errors.NoSuchObject as no_object_error:
+                    del active[(connection, msgid)]
+                    if partition.optional:
+                        responses.append((index, None))
+                        break
+                    no_object_error.base_dn = DN.get(partition.base)
+                    no_object_error.filter = partition.filter_expr
+                    no_object_error.scope = partition.scope
+                    no_object_error.attrs = attrs
+                    raise
+                if response.type is None:
+                    break
+                if response.type == ResponseType.SearchResult:
+                    del active[(connection, msgid)]
+                responses.append((index, response))
+        return responses
+
+    def bulk_import(
+        self,
+        records: Iterable[ChangeRecord | Result],
+        *,
+        connections: int = 1,
+        concurrency: int = 16,
+        window: int = 10_000,
+        max_attempts: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        skip_existing: bool = False,
+        controls: Controls | None = None,
+    ) -> ImportReport:
+        """
+        Import records (e.g. of a :class:`~freeiam.ldap.ldif.LDIFReader`) concurrently, respecting the parent to child dependencies.
+
+        Up to ``window`` records are read ahead, parents don't have to precede their children, see :class:`~freeiam.ldap.bulk.BulkImport`
+        for the retries of failed records. The records of descendants of entries which couldn't be added are skipped.
+        The ready records are distributed over ``connections`` connections, the additional connections are cloned from this one.
+        Up to ``concurrency`` operations are outstanding at the same time.
+        With ``skip_existing`` already existing entries (e.g. of an interrupted import) don't count as failure.
+        Cached NoSuchObject outcomes of added and renamed entries are forgotten.
+        """
+        bulk = BulkImport(records, window=window, max_attempts=max_attempts, backoff=backoff, max_backoff=max_backoff, skip_existing=skip_existing)
+        conns = [self, *[self._clone() for _ in range(connections - 1)]]
+        assign = itertools.cycle(conns)
+        active: dict[tuple[Connection, int], tuple[ChangeRecord, int]] = {}
+        try:
+            while not bulk.finished:
+                while len(active) < max(concurrency, 1) and (ready := bulk.next()) is not None:
+                    connection = next(assign)
+                    operation, args, kwargs = connection._import_request(ready[0], controls)
+                    msgid = connection._retry(connection.request, operation, *args, **kwargs)
+                    active[(connection, msgid)] = ready
+
+                completed = self._receive_imports(active)
+                for record, attempt, error in completed:
+                    if error is None and record.type == LDAPChangeType.Add:
+                        self._invalidate_negative_cache(record.dn)
+                    elif error is None and record.new_dn is not None:
+                        self._invalidate_negative_cache(record.new_dn)
+                    bulk.complete(record, attempt, error)
+                if active and not completed:
+                    self._wait_readable(list({connection.fileno for connection, _msgid in active}))
+                elif not active and (delay := bulk.delay) is not None:
+                    time.sleep(delay)
+        finally:
+            for connection, msgid in active:  # noqa: PLE1141
+                with contextlib.suppress(errors.LdapError):
+                    connection.request(connection.conn.abandon_ext, msgid)  # type: ignore[arg-type]
+            for connection in conns[1:]:
+                with contextlib.suppress(errors.LdapError):
+                    connection.unbind()
+                connection.disconnect()
+        return bulk.report
+
+    def _import_request(self, record: ChangeRecord, controls: Controls | None) -> tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]:
+        """Get the operation of a record of an import."""
+        conn = self.conn
+        dn = str(record.dn)
+        if record.type == LDAPChangeType.Add:
+            return conn.add_ext, (dn, list(record.attr.items())), Controls.expand(controls)
+        if record.type == LDAPChangeType.Delete:
+            return conn.delete_ext, (dn,), Controls.expand(controls)
+        if record.type == LDAPChangeType.ModifyDN:
+            new_superior = str(record.new_superior) if record.new_superior is not None else None
+            return conn.rename, (dn, record.new_rdn, new_superior, int(record.delete_old_rdn)), Controls.expand(controls)
+        return conn.modify_ext, (dn, [(int(mod), attr, values) for mod, attr, values in record.modlist]), Controls.expand(controls)
+
+    @classmethod
+    def _receive_imports(
+        cls, active: dict[tuple['Connection', int], tuple[ChangeRecord, int]]
+    ) -> list[tuple[ChangeRecord, int, errors.LdapError | None]]:
+        """Receive the already available results of the active import operations without blocking. Finished operations are removed."""
+        completed = []
+        for (connection, msgid), (record, attempt) in list(active.items()):
+            error = None
+            try:
+                response = connection.get_result(connection.conn, msgid, _all=1, timeout=0)
+            except errors.LdapError as exc:
+                error = exc
+            else:
+                if response.type is None:
+                    continue
+            del active[(connection, msgid)]
+            completed.append((record, attempt, error))
+        return completed
+
+    def syncrepl(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        mode: SyncMode = 'refreshOnly',
+        cookie_store: CookieStore | None = None,
+        reload_hint: bool = False,
+        controls: Controls | None = None,
+    ) -> Generator[SyncEvent, None]:
+        """
+        Synchronize the content of a subtree via the Content Synchronization Operation (syncrepl, RFC 4533).
+
+        Yields the changes since the state of the cookie of the ``cookie_store``, or the whole content if there is no cookie yet.
+        In ``refreshOnly`` mode the iteration ends after the refresh,
+        in ``refreshAndPersist`` mode further changes are yielded as they happen.
+
+        A new cookie is stored after all events preceding it have been consumed.
+        After a connection loss the synchronization is resumed with the stored cookie,
+        if the server requires a full refresh (``e-syncRefreshRequired``) it is restarted without cookie.
+        """
+        store = cookie_store if cookie_store is not None else CookieStore()
+        attempts = self.max_connection_attempts
+        reconnect = False
+        while True:
+            try:
+                if reconnect:
+                    self.reconnect()
+                ctrls = Controls.set_server(copy.copy(controls), sync_request(store.get(), mode, reload_hint=reload_hint, criticality=True))
+                conn = self.conn
+                for response in self._execute_iter(
+                    conn, conn.search_ext, str(base), scope, filterstr=filter_expr, attrlist=attrs, **Controls.expand(ctrls), timeout=self.timeout
+                ):
+                    attempts = self.max_connection_attempts
+                    events, cookie = decode_response(response)
+                    try:
+                        yield from events
+                    except GeneratorExit:
+                        with contextlib.suppress(errors.LdapError):
+                            assert response.msgid is not None  # noqa: S101
+                            self.abandon(response.msgid)
+                        raise
+                    if cookie is not None:
+                        store.set(cookie)
+            except (errors.ServerDown, errors.ConnectError):
+                attempts -= 1
+                if not attempts:
+                    raise
+                log.warning('Connection lost during synchronization, resuming')
+                reconnect = True
+                time.sleep(self.retry_delay)
+                continue
+            except errors.LdapError as exc:
+                if exc.result != SYNC_REFRESH_REQUIRED:
+                    raise
+                log.info('Synchronization requires a full refresh')
+                store.set(None)
+                continue
+            return
+
+    def watch(
+        self,
+        base: DN | str = '',
+        scope: Scope = Scope.SUBTREE,
+        filter_expr: str = '(objectClass=*)',
+        attrs: list[str] | None = None,
+        *,
+        change_types: list[LDAPChangeType] | None = None,
+        changes_only: bool = True,
+        controls: Controls | None = None,
+    ) -> Generator[ChangeEvent, None]:
+        """
+        Watch for changes via a persistent search.
+
+        Yields the changes of the ``change_types`` (default: all) as they happen,
+        without ``changes_only`` the current content is yielded first as ``Present`` events.
+        After a connection loss the persistent search is restarted and resynchronized:
+        a ``Resync`` event is yielded followed by the current content.
+        To deliver the changes to many consumers over a single persistent search use :class:`~freeiam.ldap.psearch.ChangeFeed`.
+        """
+        types = list(change_types or LDAPChangeType)
+        attempts = self.max_connection_attempts
+        reconnect = False
+        while True:
+            try:
+                if reconnect:
+                    self.reconnect()
+                    yield ChangeEvent(ChangeType.Resync)
+                psearch = persistent_search(types, changes_only and not reconnect, return_entry_change_control=True, criticality=True)
+                ctrls = Controls.set_server(copy.copy(controls), psearch)
+                conn = self.conn
+                for response in self._execute_iter(
+                    conn, conn.search_ext, str(base), scope, filterstr=filter_expr, attrlist=attrs, **Controls.expand(ctrls), timeout=self.timeout
+                ):
+                    attempts = self.max_connection_attempts
+                    try:
+                        yield from decode_changes(response)
+                    except GeneratorExit:
+                        with contextlib.suppress(errors.LdapError):
+                            assert response.msgid is not None  # noqa: S101
+                            self.abandon(response.msgid)
+                        raise
+            except (errors.ServerDown, errors.ConnectError):
+                attempts -= 1
+                if not attempts:
+                    raise
+                log.warning('Connection lost during persistent search, resynchronizing')
+                reconnect = True
+                time.sleep(self.retry_delay)
+                continue
+            return
+
     def add(
         self,
         dn: DN | str,
@@ -705,19 +1876,39 @@ class Connection:
         """Create a LDAP object from addlist."""
         conn = self.conn
         response = self._execute(conn, conn.add_ext, str(dn), al, **Controls.expand(controls))
+        self._invalidate_negative_cache(dn)
         return Result.from_response(dn, None, controls, response)
 
     def modify(
         self,
         dn: DN | str,
         oldattr: dict[str, list[bytes]] | Attributes,
-        newattr: dict[str, list[bytes]] | Attributes,
+        newattr: dict[str, list[bytes]] | Attributes | None = None,
         *,
         controls: Controls | None = None,
     ) -> Result:
-        """Modify a LDAP object."""
-        ml = ldap.modlist.modifyModlist(oldattr, newattr)
-        return self.modify_ml(dn, ml, controls=controls)
+        """
+        Modify a LDAP object.
+
+        Only the differences are sent, computed by :func:`~freeiam.ldap.modlist.modify_modlist` with the equality matching rules of the schema
+        of the server (see :meth:`get_schema`).
+        Without ``newattr`` the changes recorded by the tracking :class:`~freeiam.ldap.attr.Attributes` are sent (see :meth:`Attributes.track()
+        <freeiam.ldap.attr.Attributes.track>`) and discarded afterwards.
+        If nothing changed no request is sent at all.
+        """
+        if newattr is not None:
+            ml = modify_modlist(oldattr, newattr, schema=self.get_schema())
+        elif isinstance(oldattr, Attributes) and oldattr.tracking:
+            ml = oldattr.changes
+        else:
+            msg = 'Either the new attributes or tracking attributes are required'
+            raise ValueError(msg)
+        if not ml:
+            return Result(DN.get(dn), None, None, _Response(None, None, None, None))
+        result = self.modify_ml(dn, cast('LDAPModList', ml), controls=controls)
+        if newattr is None:
+            cast('Attributes', oldattr).track()
+        return result
 
     def modify_ml(
         self,
@@ -739,6 +1930,8 @@ class Connection:
         """
         Get changed DN.
 
+        The RDN changes if its value is replaced or if it is deleted and another value is added, additional values don't change it.
+
         >>> Connection._compute_changed_dn('cn=foo,dc=bar', [(ldap.MOD_REPLACE, 'cn', b'foo')])
         'cn=foo,dc=bar'
         >>> Connection._compute_changed_dn('cn=foo,dc=bar', [(ldap.MOD_REPLACE, 'cn', b'bar')])
@@ -748,11 +1941,24 @@ class Connection:
         """
         rdn = dn.rdns[0]
         dn_vals = {x[0].lower(): x[1] for x in rdn}
-        new_vals = {
-            key.lower(): val.decode('UTF-8') if isinstance(val, bytes) else val[0].decode('UTF-8')
-            for op, key, val in ml
-            if key.lower() in dn_vals and val and op != ldap.MOD_DELETE
-        }
+        new_vals: dict[str, str] = {}
+        added: dict[str, str] = {}
+        deleted: set[str] = set()
+        for op, key, val in ml:
+            attr = key.lower()
+            if attr not in dn_vals:
+                continue
+            values = [val] if isinstance(val, bytes) else list(val or [])
+            decoded = [value.decode('UTF-8') for value in values]
+            if op == ldap.MOD_REPLACE and decoded:
+                new_vals[attr] = decoded[0]
+            elif op == ldap.MOD_ADD and decoded:
+                added.setdefault(attr, decoded[0])
+            elif op == ldap.MOD_DELETE and (not decoded or dn_vals[attr].lower() in {value.lower() for value in decoded}):
+                deleted.add(attr)  # the RDN value is replaced by an added value
+        for attr in deleted - new_vals.keys():
+            if attr in added:
+                new_vals[attr] = added[attr]
         new_rdn_ava = [(x, new_vals.get(x.lower(), dn_vals[x.lower()]), ldap.AVA_STRING) for x in [y[0] for y in rdn]]
         new_rdn = DN(
             ldap.dn.dn2str(
@@ -789,6 +1995,7 @@ class Connection:
         conn = self.conn
         newdn = DN.get(newdn)
         response = self._execute(conn, conn.rename, str(dn), str(newdn[0]), str(newdn.parent), int(delete_old), **Controls.expand(controls))
+        self._invalidate_negative_cache(newdn)
         return Result.from_response(newdn, None, controls, response)
 
     def modrdn(
@@ -808,13 +2015,46 @@ class Connection:
         response = self._execute(conn, conn.delete_ext, str(dn), **Controls.expand(controls))
         return Result.from_response(dn, None, controls, response)
 
-    def delete_recursive(self, dn: DN | str, *, controls: Controls | None = None) -> Result:
-        """Delete a LDAP object recursively."""
+    def delete_recursive(
+        self,
+        dn: DN | str,
+        *,
+        concurrency: int = 10,
+        page_size: int = 500,
+        use_tree_delete: bool | None = None,
+        controls: Controls | None = None,
+    ) -> Result:
+        """
+        Delete a LDAP object recursively.
+
+        If the server supports the Tree Delete control, the subtree is deleted by a single request.
+        Otherwise the subtree is searched once, paged by ``page_size`` so that it may exceed the sizelimit of the server,
+        and deleted deepest level first, pipelining up to ``concurrency`` deletes per level.
+        """
         try:
             return self.delete(dn, controls=controls)
         except errors.NotAllowedOnNonleaf:
-            for child in self.search_dn(dn, Scope.ONELEVEL):
-                self.delete_recursive(child)
+            pass
+
+        if use_tree_delete is None:
+            use_tree_delete = TREE_DELETE_OID in self.get_supported_controls()
+        if use_tree_delete:
+            return self.delete(dn, controls=Controls.set_server(copy.copy(controls), tree_delete(criticality=True)))
+
+        levels: dict[int, list[DN]] = {}
+        search_controls = Controls(list(controls.server or []), controls.client) if controls else None  # don't page the deletes
+        for entry in self.search_paged(dn, Scope.SUBTREE, attrs=['1.1'], page_size=page_size, controls=search_controls):
+            assert entry.dn is not None  # noqa: S101
+            levels.setdefault(len(entry.dn), []).append(entry.dn)
+        root = len(DN.get(dn))
+        conn = self.conn
+        for depth in sorted(levels, reverse=True):
+            if depth == root:
+                continue
+            requests = [(conn.delete_ext, (str(entry),), Controls.expand(controls)) for entry in levels[depth]]
+            for response in self._execute_many(conn, requests, concurrency):
+                if isinstance(response, errors.LdapError) and not isinstance(response, errors.NoSuchObject):
+                    raise response
         return self.delete(dn, controls=controls)
 
     def compare(
@@ -839,26 +2079,45 @@ class Connection:
         raise RuntimeError()  # pragma: no cover; impossible
 
     def compare_dn(self, entry: DN | str, dn: DN | str) -> bool:
-        """Compare LDAP DN with existing entry."""
+        """
+        Compare LDAP DN with existing entry.
+
+        The compares of all RDN levels are pipelined. Evaluation stops at the first unequal value and the outstanding compares are abandoned.
+        """
         dn = DN.get(dn)
         entry = DN.get(entry)
 
-        for i, parent in enumerate(entry.walk()):
-            for attr, value, _ in dn.rdns[-i - 1]:
-                try:
-                    equal = self.compare(str(parent), attr, value.encode('UTF-8'))
-                    if not equal:  # pragma: no cover; https://github.com/nedbat/coveragepy/issues/2014
-                        return False
-                except errors.NoSuchObject:
+        compares = [(parent, attr, value) for i, parent in enumerate(entry.walk()) for attr, value, _ in dn.rdns[-i - 1]]
+        conn = self.conn
+        requests: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = [
+            (conn.compare_ext, (str(parent), attr, value.encode('UTF-8')), {}) for parent, attr, value in compares
+        ]
+        with contextlib.closing(self._execute_many(conn, requests, len(requests))) as responses:
+            for parent, attr, _value in compares:
+                response = next(responses)
+                if isinstance(response, errors.CompareFalse):
+                    return False
+                if isinstance(response, errors.NoSuchObject):
                     if attr == entry.rdns[-1][0][0]:
                         continue
-                    raise
+                    response.base_dn = parent
+                    raise response
+                if isinstance(response, errors.LdapError) and not isinstance(response, errors.CompareTrue):
+                    raise response
         return True
 
     def get_root_dse(self, attrs: list[str] | None = None, filter_expr: str = '(objectClass=*)') -> Result:
         """Get Root DSE (Directory Server Entry)."""
         return self.get('', attrs or ['*', '+'], filter_expr=filter_expr)
 
+    def get_supported_controls(self) -> list[str]:
+        """Return the OIDs of the supported controls of the Root DSE."""
+        try:
+            result = self.get_attr('', 'supportedControl')
+        except KeyError:
+            return []
+        return [x.decode('ASCII') for x in result]
+
     def get_naming_contexts(self) -> list[str]:
         """Return namingContexts of Root DSE."""
         result = self.get_attr('', 'namingContexts')
@@ -936,11 +2195,17 @@ class Connection:
 
     def __getstate__(self) -> dict[str, Any]:
         """Return state for pickle."""
-        return {slot: getattr(self, slot) for slot in set(self.__slots__) - {'_conn'} | {'connected'} if not slot.startswith('__')}
+        return {
+            slot: getattr(self, slot)
+            for slot in set(self.__slots__) - {'_conn', '_negative_cache', '_entry_control_msgids'} | {'connected'}
+            if not slot.startswith('__')
+        }
 
     def __setstate__(self, state: dict[str, Any]) -> None:
         """Set state for pickle."""
         self._conn = None
+        self._negative_cache = {}
+        self._entry_control_msgids = set()
         connected = state.pop('connected', None)
         for slot, value in state.items():
             setattr(self, slot, value)
@@ -954,14 +2219,43 @@ class Connection:
         msgid = self._retry(self.request, operation, *args, **kwargs)
         if msgid is None:  # abandon_ext, unbind_ext
             return _Response(None, None, msgid, [], None, None)
+        return self._result(conn, msgid)
+
+    def _result(self, conn: LDAPObject, msgid: int) -> _Response:
+        """Wait asynchronously for the complete result of the given msgid."""
         response: _Response | None = None
-        for resp in self._poll(conn, msgid, 1):
+        for resp in self._poll(conn, msgid, 1):  # type: ignore[arg-type]
             if response is not None:  # pragma: no cover
                 raise RuntimeError('Wrong method used! Use _execute_iter instead!')  # noqa: TRY003
             response = resp
         assert response is not None  # noqa: S101
         return response
 
+    def _execute_many(
+        self, conn: LDAPObject, requests: Iterable[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]], concurrency: int
+    ) -> Generator[_Response | errors.LdapError, None]:
+        """Pipeline the operations and yield their results or errors in order, keeping up to ``concurrency`` operations outstanding."""
+        requests = iter(requests)
+        pending: deque[int] = deque()
+        try:
+            while True:
+                for operation, args, kwargs in itertools.islice(requests, max(concurrency - len(pending), 1)):
+                    pending.append(self._retry(self.request, operation, *args, **kwargs))
+                if not pending:
+                    break
+                msgid = pending.popleft()
+                try:
+                    response: _Response | errors.LdapError = self._result(conn, msgid)
+                except (errors.ServerDown, errors.ConnectError):
+                    raise
+                except errors.LdapError as exc:
+                    response = exc
+                yield response
+        finally:
+            for msgid in pending:  # the consumer stopped early or the connection broke
+                with contextlib.suppress(errors.LdapError):
+                    self.abandon(msgid)
+
     def _execute_iter(self, conn: LDAPObject, operation: Callable[..., Any], *args: Any, **kwargs: Any) -> Generator[_Response, None]:
         """Execute the operation and yield the results asynchronously."""
         msgid = self._retry(self.request, operation, *args, **kwargs)
@@ -970,14 +2264,26 @@ class Connection:
         yield from self._poll(conn, msgid, 0)
 
     def get_result(self, conn: LDAPObject, msgid: int = ResponseType.Any, _all: int = 0, timeout: int = 0) -> _Response:
-        """Get the LDAP result for the given msgid."""
+        """
+        Get the LDAP result for the given msgid.
+
+        The controls of the individual search entries are only decoded for requests with a control of
+        :data:`~freeiam.ldap.controls.ENTRY_CONTROL_REQUESTS` (e.g. Dereference).
+        """
         log.debug('result(%r, timeout=%r)', msgid, timeout, extra={'MSGID': msgid, 'ALL': _all, 'TIMEOUT': timeout, 'FUNC': 'result'})
+        add_ctrls = int(msgid in self._entry_control_msgids)
         try:
             with errors.LdapError.wrap(self._hide_parent_exception):
-                response = _Response(*conn.result4(msgid, all=_all, timeout=timeout, add_extop=1))  # type: ignore[arg-type]
+                # intermediate responses are only requested when receiving single messages, otherwise they would be mixed into the entries
+                response = _Response(
+                    *conn.result4(msgid, all=_all, timeout=timeout, add_ctrls=add_ctrls, add_intermediates=int(not _all), add_extop=1)  # type: ignore[arg-type]
+                )
         except (errors.LdapError, OSError) as exc:
+            self._entry_control_msgids.discard(msgid)
             log.debug('result(%r) -> raised %r', msgid, exc, extra={'MSGID': msgid, 'OPERATION': 'result', 'EXCEPTION': str(exc)})
             raise
+        if response.type is not None and response.type not in {ResponseType.SearchEntry, ResponseType.SearchReference, ResponseType.Intermediate}:
+            self._entry_control_msgids.discard(msgid)
         log.debug('result(%r) -> %s', msgid, repr(response)[:200], extra={'MSGID': msgid, 'OPERATION': 'result'})
         return response
 
@@ -994,6 +2300,8 @@ class Connection:
             log.debug('%s() -> %r', op, exc, extra={'OPERATION': op, 'EXCEPTION': str(exc)})
             raise
         log.debug('%s() -> %r', op, msgid, extra={'OPERATION': op, 'MSGID': msgid})
+        if msgid is not None and any(ctrl.controlType in ENTRY_CONTROL_REQUESTS for ctrl in kwargs.get('serverctrls') or ()):
+            self._entry_control_msgids.add(msgid)
         return msgid
 
     def _retry(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
@@ -1015,6 +2323,13 @@ class Connection:
                 time.sleep(self.retry_delay)
         raise RuntimeError()  # pragma: no cover; impossible
 
+    def _wait_readable(self, fds: list[int]) -> None:  # pragma: no cover
+        """Wait synchronously until one of the file descriptors is readable."""
+        # this method must only used by the synchronous variant of this class
+        readable, _, _ = select.select(fds, [], [], self.timeout if self.timeout > 0 else None)
+        if not readable:
+            raise TimeoutError
+
     def _poll(self, conn: LDAPObject, msgid: ResponseType = ResponseType.Any, _all: int = 0) -> Generator[_Response, None, None]:  # pragma: no cover
         """Wait synchronously for operation to succeed."""
         # this method must only used by the synchronous variant of this class
@@ -1029,7 +2344,7 @@ class Connection:
                 continue
 
             yield response
-            if rtype == ldap.RES_SEARCH_ENTRY:
+            if rtype in {ldap.RES_SEARCH_ENTRY, ldap.RES_SEARCH_REFERENCE, ldap.RES_INTERMEDIATE}:
                 continue
             if rtype == ldap.RES_SEARCH_RESULT:
                 break
@@ -0,0 +1,167 @@
+# SPDX-FileCopyrightText: 2025 Florian Best
+# SPDX-License-Identifier: MIT OR Apache-2.0
+"""Content Synchronization Operation (syncrepl, RFC 4533)."""
+
+import os
+import typing
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from typing import Literal, TypeAlias
+
+from ldap.syncrepl import SyncDoneControl, SyncInfoMessage, SyncStateControl
+
+from freeiam.ldap._files import write_atomic
+from freeiam.ldap._wrapper import _Response
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import ResponseType
+from freeiam.ldap.dn import DN
+
+
+__all__ = ('SYNC_REFRESH_REQUIRED', 'CookieStore', 'FileCookieStore', 'SyncEvent', 'SyncEventType', 'SyncMode', 'decode_response')
+
+SyncMode: TypeAlias = Literal['refreshOnly', 'refreshAndPersist']
+
+SYNC_REFRESH_REQUIRED = 4096
+"""The result code (``e-syncRefreshRequired``) of a server requiring the client to start the synchronization from scratch."""
+
+
+class SyncEventType(IntEnum):
+    """The type of a synchronization event."""
+
+    Present = 0
+    """The entry is unchanged (it is still present)."""
+
+    Add = 1
+    """The entry was added."""
+
+    Modify = 2
+    """The entry was modified or renamed."""
+
+    Delete = 3
+    """The entry was deleted or doesn't match the search anymore."""
+
+    PresentDone = 4
+    """
+    The present phase is done.
+
+    All entries which have not been reported as present, added or modified since the start of the refresh have to be deleted.
+    """
+
+    RefreshDone = 5
+    """The refresh is complete. In ``refreshAndPersist`` mode the changes are reported as they happen from now on."""
+
+
+@dataclass(frozen=True)
+class SyncEvent:
+    """A change of the synchronized content."""
+
+    type: SyncEventType
+    """The type of the change."""
+
+    uuid: str | None = None
+    """The ``entryUUID`` of the entry."""
+
+    dn: DN | None = None
+    """The DN of the entry, unknown for entries reported as present or deleted by a set of UUIDs."""
+
+    attr: Attributes | None = None
+    """The attributes of an added or modified entry."""
+
+
+class CookieStore:
+    """
+    Stores the synchronization cookie in memory.
+
+    Subclasses can persist the cookie to resume the synchronization incrementally, e.g. after a restart.
+
+    >>> store = CookieStore()
+    >>> store.set('rid=000,csn=20250101000000.000000Z#000000#000#000000')
+    >>> store.get()
+    'rid=000,csn=20250101000000.000000Z#000000#000#000000'
+    """
+
+    __slots__ = ('_cookie',)
+
+    def __init__(self, cookie: str | None = None) -> None:
+        self._cookie = cookie
+
+    def get(self) -> str | None:
+        """Get the last stored cookie."""
+        return self._cookie
+
+    def set(self, cookie: str | None) -> None:
+        """Store the cookie, ``None`` forgets it."""
+        self._cookie = cookie
+
+
+class FileCookieStore(CookieStore):
+    """Stores the synchronization cookie in a file, which is replaced atomically."""
+
+    __slots__ = ('path',)
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        try:
+            cookie = self.path.read_text('UTF-8') or None
+        except FileNotFoundError:
+            cookie = None
+        super().__init__(cookie)
+
+    def set(self, cookie: str | None) -> None:
+        """Store the cookie, ``None`` removes the file."""
+        super().set(cookie)
+        if cookie is None:
+            self.path.unlink(missing_ok=True)
+            return
+        write_atomic(self.path, cookie)
+
+
+def decode_response(response: _Response) -> tuple[list[SyncEvent], str | None]:
+    """Get the synchronization events and the new cookie of a response of a synchronization search."""
+    if response.type == ResponseType.SearchEntry:
+        return _decode_entries(response)
+    if response.type == ResponseType.Intermediate and response.name == SyncInfoMessage.responseName and response.value:
+        return _decode_info(SyncInfoMessage(response.value))
+    if response.type == ResponseType.SearchResult:
+        for ctrl in response.ctrls or []:
+            if isinstance(ctrl, SyncDoneControl):
+                events = [] if ctrl.refreshDeletes else [SyncEvent(SyncEventType.PresentDone)]
+                return [*events, SyncEvent(SyncEventType.RefreshDone)], ctrl.cookie
+        return [SyncEvent(SyncEventType.RefreshDone)], None
+    return [], None
+
+
+def _decode_entries(response: _Response) -> tuple[list[SyncEvent], str | None]:
+    events = []
+    cookie = None
+    for dn, attrs in response.data or []:
+        for ctrl in (response.entry_ctrls or {}).get(dn, []):
+            if not isinstance(ctrl, SyncStateControl):
+                continue
+            event_type = SyncEventType[typing.cast('str', ctrl.state).capitalize()]
+            attr = Attributes(attrs) if event_type in {SyncEventType.Add, SyncEventType.Modify} else None
+            events.append(SyncEvent(event_type, ctrl.entryUUID, DN(dn), attr))
+            cookie = ctrl.cookie or cookie
+            break
+    return events, cookie
+
+
+def _decode_info(message: SyncInfoMessage) -> tuple[list[SyncEvent], str | None]:
+    if message.newcookie is not None:
+        return [], message.newcookie
+    events = []
+    if message.refreshPresent is not None:
+        info = message.refreshPresent
+        events.append(SyncEvent(SyncEventType.PresentDone))
+    elif message.refreshDelete is not None:
+        info = message.refreshDelete
+    elif message.syncIdSet is not None:
+        info = message.syncIdSet
+        event_type = SyncEventType.Delete if info['refreshDeletes'] else SyncEventType.Present
+        events.extend(SyncEvent(event_type, uuid) for uuid in info['syncUUIDs'])
+    else:  # pragma: no cover
+        return [], None
+    if info.get('refreshDone'):
+        events.append(SyncEvent(SyncEventType.RefreshDone))
+    return events, info.get('cookie')
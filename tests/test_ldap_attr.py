@@ -0,0 +1,72 @@
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import Mod
+
+
+def test_get_range():
+    attrs = Attributes({'cn': [b'x'], 'member;range=0-1499': [b'a', b'b'], 'memberOf;binary;range=10-*': [b'c']})
+    assert attrs.get_range('member') == ([b'a', b'b'], 1500)
+    assert attrs.get_range('MEMBER') == ([b'a', b'b'], 1500)
+    assert attrs.get_range('memberof') == ([b'c'], None)
+    assert attrs.get_range('cn') is None
+    assert attrs.get_range('uid') is None
+    assert attrs.ranged() == ['member', 'memberOf']
+    assert Attributes({'member': []}).ranged() == []
+
+
+def test_track():
+    attrs = Attributes({'cn': [b'Max'], 'member': [b'a', b'b'], 'mail': [b'max@freeiam.org']})
+    attrs['sn'] = [b'Mustermann']
+    attrs.add_values('member', [b'c'])
+    assert not attrs.tracking
+    assert attrs.changes == []
+
+    attrs.track()
+    attrs.add_values('MEMBER', [b'd'])
+    attrs.add_values('member', [b'e'])
+    attrs.remove_values('member', [b'a'])
+    attrs.add_values('title', [b'Dr.'])
+    del attrs['title']
+    attrs['description'] = [b'foo']
+    attrs['Description'] = [b'bar']
+    del attrs['mail']
+    assert attrs == {'cn': [b'Max'], 'member': [b'b', b'c', b'd', b'e'], 'sn': [b'Mustermann'], 'description': [b'bar']}
+    assert attrs.changes == [
+        (Mod.Add, 'member', [b'd', b'e']),
+        (Mod.Delete, 'member', [b'a']),
+        (Mod.Replace, 'title', None),
+        (Mod.Replace, 'description', [b'bar']),
+        (Mod.Delete, 'mail', None),
+    ]
+    attrs.remove_values('sn', [b'Mustermann'])
+    assert 'sn' not in attrs
+    assert attrs.changes[-1] == (Mod.Delete, 'sn', [b'Mustermann'])
+    assert attrs.track().changes == []
+
+
+def test_track_dict_methods():
+    attrs = Attributes({'cn': [b'Max'], 'member': [b'a'], 'mail': [b'max@freeiam.org'], 'title': [b'Dr.']}).track()
+    attrs.update({'CN': [b'Moritz']}, sn=[b'Mustermann'])
+    attrs |= {'description': [b'foo']}
+    assert attrs.setdefault('Member', [b'x']) == [b'a']
+    assert attrs.setdefault('uid', [b'max']) == [b'max']
+    assert attrs.pop('MAIL') == [b'max@freeiam.org']
+    assert attrs.pop('mail', None) is None
+    assert attrs.popitem() == ('uid', [b'max'])
+    assert attrs.changes == [
+        (Mod.Replace, 'cn', [b'Moritz']),
+        (Mod.Replace, 'sn', [b'Mustermann']),
+        (Mod.Replace, 'description', [b'foo']),
+        (Mod.Delete, 'mail', None),
+        (Mod.Replace, 'uid', None),
+    ]
+    attrs.clear()
+    assert not attrs
+    assert attrs.changes == [
+        (Mod.Delete, 'mail', None),
+        (Mod.Replace, 'uid', None),
+        (Mod.Replace, 'cn', None),
+        (Mod.Delete, 'member', None),
+        (Mod.Delete, 'title', None),
+        (Mod.Replace, 'sn', None),
+        (Mod.Replace, 'description', None),
+    ]
@@ -0,0 +1,135 @@
+import pytest
+
+from freeiam import errors
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.bulk import BulkImport, ImportGraph, as_change_record
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.ldif import ChangeRecord
+
+
+BASE = 'dc=freeiam,dc=org'
+
+
+def add(dn):
+    return ChangeRecord('', LDAPChangeType.Add, DN(f'{dn},{BASE}' if dn else BASE))
+
+
+def modify(dn):
+    return ChangeRecord('', LDAPChangeType.Modify, DN(f'{dn},{BASE}'), [(Mod.Replace, 'description', [b'foo'])])
+
+
+def delete(dn):
+    return ChangeRecord('', LDAPChangeType.Delete, DN(f'{dn},{BASE}'))
+
+
+def drain(graph):
+    records = []
+    while (record := graph.pop()) is not None:
+        records.append(record)
+    return records
+
+
+def test_import_graph():
+    graph = ImportGraph()
+    for record in (add('ou=a'), add('cn=1,ou=a'), add('cn=2,ou=a'), add('cn=x,cn=1,ou=a'), modify('ou=a'), add('ou=b')):
+        graph.add(record)
+    assert len(graph) == 6
+    first = drain(graph)
+    assert first == [add('ou=a'), add('ou=b')]
+    graph.done(first[0])
+    assert drain(graph) == [modify('ou=a')]  # the records of a DN are applied in order
+    graph.done(modify('ou=a'))
+    graph.done(add('ou=b'))
+    assert drain(graph) == [add('cn=1,ou=a'), add('cn=2,ou=a')]
+    graph.done(add('cn=1,ou=a'))
+    graph.done(add('cn=2,ou=a'))
+    assert drain(graph) == [add('cn=x,cn=1,ou=a')]
+    graph.done(add('cn=x,cn=1,ou=a'))
+    assert not graph
+
+
+def test_import_graph_failure():
+    graph = ImportGraph()
+    for record in (add('ou=a'), add('cn=1,ou=a'), add('cn=x,cn=1,ou=a'), modify('ou=a'), add('ou=b')):
+        graph.add(record)
+    assert drain(graph) == [add('ou=a'), add('ou=b')]
+    assert graph.fail(add('ou=a')) == [modify('ou=a'), add('cn=1,ou=a'), add('cn=x,cn=1,ou=a')]
+    assert len(graph) == 1
+
+    # parents added after their children
+    graph = ImportGraph()
+    graph.add(add('cn=1,ou=c'))
+    graph.add(add('ou=c'))
+    assert drain(graph) == [add('cn=1,ou=c'), add('ou=c')]
+    assert graph.wait(add('cn=1,ou=c'))
+    graph.done(add('ou=c'))
+    assert drain(graph) == [add('cn=1,ou=c')]
+    assert not graph.wait(add('cn=1,ou=c'))
+
+
+def test_import_graph_delete():
+    graph = ImportGraph()
+    for record in (delete('ou=a'), delete('cn=1,ou=a'), delete('cn=x,cn=1,ou=a'), modify('cn=2,ou=a'), delete('ou=b')):
+        graph.add(record)
+    # children are deleted before their parent
+    assert drain(graph) == [delete('cn=x,cn=1,ou=a'), modify('cn=2,ou=a'), delete('ou=b')]
+    graph.done(delete('cn=x,cn=1,ou=a'))
+    assert drain(graph) == [delete('cn=1,ou=a')]
+    graph.done(delete('cn=1,ou=a'))
+    assert drain(graph) == []
+    graph.done(modify('cn=2,ou=a'))
+    assert drain(graph) == [delete('ou=a')]
+    graph.done(delete('ou=a'))
+    graph.done(delete('ou=b'))
+    assert not graph
+
+    # entries added and deleted again
+    graph = ImportGraph()
+    for record in (add('ou=c'), add('cn=1,ou=c'), delete('ou=c')):
+        graph.add(record)
+    assert drain(graph) == [add('ou=c')]
+    graph.done(add('ou=c'))
+    assert drain(graph) == [add('cn=1,ou=c')]
+    graph.done(add('cn=1,ou=c'))
+    assert drain(graph) == [delete('ou=c')]
+
+
+def test_bulk_import_retries():
+    records = [add('ou=a'), add('cn=1,ou=a'), add('cn=1,ou=unknown'), add('ou=b')]
+    bulk = BulkImport(records, window=2, max_attempts=2, backoff=0, skip_existing=True)
+    outcomes = {
+        add('ou=a').dn: [errors.Busy({'result': 51, 'desc': 'Server is busy'}), None],
+        add('cn=1,ou=a').dn: [None],
+        add('cn=1,ou=unknown').dn: [errors.NoSuchObject({'result': 32, 'desc': 'No such object'})] * 2,
+        add('ou=b').dn: [errors.AlreadyExists({'result': 68, 'desc': 'Already exists'})],
+    }
+    applied = []
+    while not bulk.finished:
+        ready = bulk.next()
+        assert ready is not None
+        record, attempt = ready
+        applied.append((record.dn, attempt))
+        bulk.complete(record, attempt, outcomes[record.dn].pop(0))
+    assert applied == [
+        (add('ou=a').dn, 1),
+        (add('ou=a').dn, 2),
+        (add('cn=1,ou=a').dn, 1),
+        (add('cn=1,ou=unknown').dn, 1),
+        (add('cn=1,ou=unknown').dn, 2),
+        (add('ou=b').dn, 1),
+    ]
+    report = bulk.report
+    assert (report.applied, report.existing, report.retries) == (2, 1, 2)
+    assert [(record.dn, type(error)) for record, error in report.failed] == [(add('cn=1,ou=unknown').dn, errors.NoSuchObject)]
+    assert not report.ok
+
+    with pytest.raises(ValueError, match='window'):
+        BulkImport([], window=0)
+
+
+def test_as_change_record():
+    result = Result(DN(f'cn=foo,{BASE}'), Attributes({'cn': [b'foo']}), None, None)
+    assert as_change_record(result) == ChangeRecord('', LDAPChangeType.Add, DN(f'cn=foo,{BASE}'), [(Mod.Add, 'cn', [b'foo'])])
+    assert as_change_record(add('ou=a')) == add('ou=a')
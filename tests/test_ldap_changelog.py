@@ -0,0 +1,106 @@
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.changelog import decode_accesslog, decode_changelog
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.ldif import ChangeRecord
+
+
+BASE = 'dc=freeiam,dc=org'
+
+
+def entry(dn, **attrs):
+    values = {key: [value.encode('UTF-8') if isinstance(value, str) else value for value in vals] for key, vals in attrs.items()}
+    return Result(DN(dn), Attributes(values), None, None)
+
+
+def test_decode_accesslog():
+    start = '20250101000000.000001Z'
+    record = decode_accesslog(
+        entry(
+            f'reqStart={start},cn=accesslog',
+            reqStart=[start],
+            reqType=['modify'],
+            reqDN=[f'uid=max,{BASE}'],
+            reqMod=['mail:+ max@freeiam.org', 'mail:+ m@freeiam.org', 'description:-', 'sn:= Mustermann', 'sn:='],
+            reqAuthzID=[f'cn=admin,{BASE}'],
+        )
+    )
+    assert record == ChangeRecord(
+        start,
+        LDAPChangeType.Modify,
+        DN(f'uid=max,{BASE}'),
+        [
+            (Mod.Add, 'mail', [b'max@freeiam.org', b'm@freeiam.org']),
+            (Mod.Delete, 'description', None),
+            (Mod.Replace, 'sn', [b'Mustermann']),
+            (Mod.Replace, 'sn', None),
+        ],
+        time=start,
+        author=f'cn=admin,{BASE}',
+    )
+
+    record = decode_accesslog(
+        entry(
+            'reqStart=1,cn=accesslog',
+            reqstart=[start],
+            reqtype=['modrdn'],
+            reqdn=[f'uid=max,ou=a,{BASE}'],
+            reqNewRDN=['uid=moritz'],
+            reqDeleteOldRDN=['TRUE'],
+            reqNewSuperior=[f'ou=b,{BASE}'],
+        )
+    )
+    assert record is not None
+    assert record.type == LDAPChangeType.ModifyDN
+    assert record.delete_old_rdn
+    assert record.new_dn == DN(f'uid=moritz,ou=b,{BASE}')
+
+    record = decode_accesslog(entry('reqStart=1,cn=accesslog', reqStart=[start], reqType=['add'], reqDN=[f'uid=max,{BASE}'], reqMod=['uid:+ max']))
+    assert record is not None
+    assert record.attr == {'uid': [b'max']}
+    assert record.new_dn is None
+
+    assert decode_accesslog(entry('reqStart=1,cn=accesslog', reqStart=[start], reqType=['search'], reqDN=[BASE])) is None
+    assert decode_accesslog(entry('cn=accesslog', objectClass=['auditContainer'])) is None
+
+
+def test_decode_changelog():
+    record = decode_changelog(
+        entry(
+            'changeNumber=42,cn=changelog',
+            changeNumber=['42'],
+            changeType=['modify'],
+            targetDN=[f'uid=max,{BASE}'],
+            changes=[
+                b'replace: description\ndescription: very long\n  text\n-\nadd: userPassword\nuserPassword:: c2VjcmV0\n-\ndelete: mail\n-\n\x00'
+            ],
+            changeTime=['20250101000000Z'],
+        )
+    )
+    assert record == ChangeRecord(
+        '42',
+        LDAPChangeType.Modify,
+        DN(f'uid=max,{BASE}'),
+        [(Mod.Replace, 'description', [b'very long text']), (Mod.Add, 'userPassword', [b'secret']), (Mod.Delete, 'mail', None)],
+        time='20250101000000Z',
+    )
+
+    record = decode_changelog(
+        entry(
+            'changeNumber=43,cn=changelog',
+            changeNumber=['43'],
+            changeType=['add'],
+            targetDN=[f'uid=max,{BASE}'],
+            changes=[b'objectClass: top\nobjectClass: person\ncn: max\n'],
+        )
+    )
+    assert record is not None
+    assert record.attr == {'objectClass': [b'top', b'person'], 'cn': [b'max']}
+
+    record = decode_changelog(
+        entry('changeNumber=44,cn=changelog', changeNumber=['44'], changeType=['modrdn'], targetDN=[f'uid=max,{BASE}'], newRDN=['uid=moritz'])
+    )
+    assert record is not None
+    assert record.new_dn == DN(f'uid=moritz,{BASE}')
+    assert not record.delete_old_rdn
@@ -1,4 +1,5 @@
 import contextlib
+import gzip
 import inspect
 import logging
 import math
@@ -7,10 +8,13 @@ import time
 
 import ldap as _ldap
 import pytest
+from ldap.schema.subentry import SubSchema
 
 from freeiam import errors, ldap
-from freeiam.ldap.constants import Dereference, Option, OptionValue, Scope, TLSRequireCert, Version
-from freeiam.ldap.controls import Controls, transaction, virtual_list_view
+from freeiam.ldap._wrapper import Result, _Response  # noqa: PLC2701
+from freeiam.ldap.constants import Dereference, LDAPChangeType, Mod, Option, OptionValue, ResponseType, Scope, TLSRequireCert, Version
+from freeiam.ldap.controls import Controls, dereference, server_side_sorting, transaction, virtual_list_view
+from freeiam.ldap.delta import Watermark, WatermarkStore
 from freeiam.ldap.extended_operations import (
     AbortedTransactionNotice,
     ExtendedRequest,
@@ -19,6 +23,14 @@ from freeiam.ldap.extended_operations import (
     transaction_commit,
     transaction_start,
 )
+from freeiam.ldap.ldif import ChangeRecord, LDIFReader
+from freeiam.ldap.membership import GroupGraph
+from freeiam.ldap.pagination import AdaptivePageSize, TypeAhead, VLVCursor
+from freeiam.ldap.partition import Partition
+from freeiam.ldap.psearch import ChangeType
+from freeiam.ldap.replica import LocalReplica
+from freeiam.ldap.schema import Schema
+from freeiam.ldap.syncrepl import CookieStore, SyncEventType
 
 
 log = logging.getLogger(__name__)
@@ -253,6 +265,121 @@ def test_exists(conn, testuser):
     assert not conn.exists('cn=notexists,dc=FreeIAM,dc=Org')
 
 
+@pytest.mark.parametrize('chunk_size', [None, 2])
+def test_get_many(conn, page_users, base_dn, chunk_size):
+    missing = f'cn=notexists,{base_dn}'
+    other_context = 'cn=notexists,o=other'
+    dns = [*page_users[:5], missing, other_context, page_users[5]]
+    results = list(conn.get_many(dns, ['cn'], concurrency=3, chunk_size=chunk_size))
+    assert [dn for dn, _ in results] == [ldap.DN(dn) for dn in dns]
+    for dn, result in results:
+        if dn in {ldap.DN(missing), ldap.DN(other_context)}:
+            assert isinstance(result, errors.NoSuchObject)
+            continue
+        assert result.dn == dn
+        assert result.attr['cn'] == [dn.rdn[1].encode()]
+
+    results = list(conn.get_many(page_users, filter_expr='(sn=notexists)', chunk_size=chunk_size))
+    assert all(isinstance(result, errors.NoSuchObject) for _, result in results)
+
+    gen = conn.get_many(page_users, concurrency=5)
+    for _dn, result in gen:
+        assert result.dn == ldap.DN(page_users[0])
+        break
+    gen.close()
+    assert conn.exists(page_users[1])
+
+
+def test_negative_cache(conn, base_dn):
+    conn.negative_cache_ttl = 60
+    dn = f'ou=neg{TESTUSERNAME},{base_dn}'
+    with contextlib.suppress(errors.NoSuchObject):
+        conn.delete(dn)
+    assert not conn.exists(dn)
+    assert ldap.DN(dn) in conn._negative_cache
+    # children of a missing object are answered from the cache
+    with pytest.raises(errors.NoSuchObject) as exc:
+        conn.get(f'cn=child,{dn}')
+    assert ldap.DN(exc.value.matched) == ldap.DN(base_dn)
+    assert ldap.DN(f'cn=child,{dn}') not in conn._negative_cache
+
+    create_ou(conn, dn)
+    try:
+        assert ldap.DN(dn) not in conn._negative_cache
+        assert conn.exists(dn)
+    finally:
+        conn.delete(dn)
+    conn.negative_cache_ttl = 0
+    assert conn.exists(base_dn)
+
+
+def test_negative_cache_bounded(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr('time.monotonic', lambda: now)
+    conn = ldap.connection.SynchronousConnection(negative_cache_ttl=10, negative_cache_size=3)
+    error = errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'ctrls': []})
+    for i in range(5):
+        conn._cache_no_such_object(ldap.DN(f'cn={i},dc=freeiam,dc=org'), error)
+    assert list(conn._negative_cache) == [ldap.DN(f'cn={i},dc=freeiam,dc=org') for i in (2, 3, 4)]
+
+    cached = conn._get_cached_no_such_object(ldap.DN('cn=x,cn=4,dc=freeiam,dc=org'))
+    assert cached is not None
+    assert cached.controls == []
+
+    now += 20
+    conn._cache_no_such_object(ldap.DN('cn=new,dc=freeiam,dc=org'), error)
+    assert list(conn._negative_cache) == [ldap.DN('cn=new,dc=freeiam,dc=org')]
+
+
+def test_compute_changed_dn():
+    dn = ldap.DN('cn=foo,dc=freeiam,dc=org')
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, [(Mod.Add, 'cn', [b'alias'])]) == dn
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, [(Mod.Delete, 'cn', [b'alias'])]) == dn
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, [(Mod.Replace, 'CN', [b'bar'])]) == ldap.DN('cn=bar,dc=freeiam,dc=org')
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, [(Mod.Delete, 'cn', [b'Foo']), (Mod.Add, 'cn', [b'bar'])]) == ldap.DN(
+        'cn=bar,dc=freeiam,dc=org'
+    )
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, [(Mod.Add, 'cn', [b'bar']), (Mod.Delete, 'cn', None)]) == ldap.DN(
+        'cn=bar,dc=freeiam,dc=org'
+    )
+
+
+def test_tracked_changes_keep_dn():
+    dn = ldap.DN('cn=foo,dc=freeiam,dc=org')
+    attrs = ldap.Attributes({'cn': [b'foo'], 'sn': [b'foo']}).track()
+    attrs.add_values('cn', [b'alias'])
+    attrs.update(sn=[b'bar'])
+    assert ldap.connection.SynchronousConnection._compute_changed_dn(dn, attrs.changes) == dn
+
+
+def test_bulk_import_negative_cache(monkeypatch):
+    conn = ldap.connection.SynchronousConnection()
+    error = errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'ctrls': []})
+    conn._cache_no_such_object(ldap.DN('cn=new,dc=freeiam,dc=org'), error)
+    conn._cache_no_such_object(ldap.DN('cn=renamed,dc=freeiam,dc=org'), error)
+    msgids = iter(range(1, 100))
+
+    def request(self, *args, **kwargs):
+        time.sleep(0)
+        return next(msgids)
+
+    def receive_imports(cls, active):
+        completed = [(record, attempt, None) for record, attempt in active.values()]
+        active.clear()
+        return completed
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_import_request', lambda *_args: (None, (), {}))
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_retry', request)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_receive_imports', classmethod(receive_imports))
+    records = [
+        ChangeRecord('', LDAPChangeType.Add, ldap.DN('cn=new,dc=freeiam,dc=org')),
+        ChangeRecord('', LDAPChangeType.ModifyDN, ldap.DN('cn=old,dc=freeiam,dc=org'), new_rdn='cn=renamed', delete_old_rdn=True),
+    ]
+    report = conn.bulk_import(records)
+    assert report.applied == 2
+    assert not conn._negative_cache
+
+
 def test_search(conn, testuser, base_dn):
     dn, attrs = testuser
 
@@ -298,6 +425,49 @@ def test_modify(conn, testuser):
     assert result.attr == newattrs, result.attr
 
 
+def test_modify_noop(conn, testuser):
+    dn, attrs = testuser
+    result = conn.modify(dn, attrs, {key.upper(): values for key, values in attrs.items()})
+    assert result.dn == dn
+    assert result._response.msgid is None  # no request sent
+
+
+def test_modify_schema(monkeypatch, conn, testuser):
+    monkeypatch.setattr(ldap.Attributes, 'SCHEMA', None)
+    dn, attrs = testuser
+    result = conn.modify(dn, attrs, {**attrs, 'sn': [value.upper() for value in attrs['sn']]})
+    assert result._response.msgid is None  # caseIgnoreMatch of the schema of the server
+
+
+def test_modify_uses_server_schema(monkeypatch):
+    schema = Schema(SubSchema({'attributeTypes': [b"( 2.5.4.3 NAME 'cn' EQUALITY caseIgnoreMatch )"]}))
+
+    def get_schema(self, subschema_dn=None):
+        time.sleep(0)
+        return schema
+
+    monkeypatch.setattr(ldap.Attributes, 'SCHEMA', None)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'get_schema', get_schema)
+    result = ldap.connection.SynchronousConnection().modify('cn=foo,dc=freeiam,dc=org', {'cn': [b'Foo']}, {'cn': [b'foo']})
+    assert result._response.msgid is None
+
+
+def test_modify_tracked(conn, testuser2):
+    attrs = (conn.get(testuser2)).attr.track()
+    attrs.add_values('description', [b'foo', b'bar'])
+    attrs.remove_values('description', [b'foo'])
+    attrs['sn'] = [b'Tracked']
+    conn.modify(testuser2, attrs)
+    assert not attrs.changes
+    result = conn.get(testuser2)
+    assert result.attr['description'] == [b'bar']
+    assert result.attr['sn'] == [b'Tracked']
+    assert (conn.modify(testuser2, attrs))._response.msgid is None
+
+    with pytest.raises(ValueError, match='tracking'):
+        conn.modify(testuser2, {'sn': [b'User']})
+
+
 def test_get_attr(conn, testuser):
     dn = testuser[0]
     result = conn.get_attr(dn, 'uid')
@@ -322,6 +492,62 @@ def test_get_attr_alias(conn, testuser):
     assert result == [TESTUSERNAME_B]
 
 
+def test_iter_attr(conn, testuser):
+    dn = testuser[0]
+    assert list(conn.iter_attr(dn, 'commonName')) == [TESTUSERNAME_B]
+    result = conn.get(dn, ['cn'])
+    assert (conn.resolve_ranges(result)).attr == {'cn': [TESTUSERNAME_B]}
+
+
+def test_iter_attr_ranges(monkeypatch):
+    dn = ldap.DN('cn=group,dc=freeiam,dc=org')
+    members = [f'uid=user{i},dc=freeiam,dc=org'.encode() for i in range(2000)]
+    requested = []
+
+    def get(self, dn, attrs=None, filter_expr='(objectClass=*)', *, unique=False, controls=None):
+        time.sleep(0)
+        requested.append(attrs)
+        if attrs == ['member;range=1500-*']:
+            return Result(dn, ldap.Attributes({'member;range=1500-*': members[1500:]}), None, None)
+        return Result(dn, ldap.Attributes({'cn': [b'group'], 'member;range=0-1499': members[:1500]}), None, None)
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'get', get)
+    conn = ldap.connection.SynchronousConnection()
+    assert list(conn.iter_attr(dn, 'member')) == members
+    assert requested == [['member'], ['member;range=1500-*']]
+
+    requested.clear()
+    result = conn.resolve_ranges(conn.get(dn, ['cn', 'member']))
+    assert result.attr == {'cn': [b'group'], 'member': members}
+    assert requested == [['cn', 'member'], ['member;range=1500-*']]
+
+
+def test_refresh_groups(conn, testuser, base_dn):
+    user = ldap.DN(testuser[0])
+    inner, outer = ldap.DN(f'cn={TESTUSERNAME}inner,{base_dn}'), ldap.DN(f'cn={TESTUSERNAME}outer,{base_dn}')
+    conn.add(inner, {'objectClass': [b'groupOfNames'], 'member': [str(user).encode()]})
+    conn.add(outer, {'objectClass': [b'groupOfNames'], 'member': [str(inner).encode()]})
+    try:
+        graph = conn.refresh_groups(GroupGraph(base_dn, filter_expr=f'(&(objectClass=groupOfNames)(cn={TESTUSERNAME}*))'))
+        assert graph.groups == {inner, outer}
+        assert graph.groups_of(user) == {inner, outer}
+        assert graph.timestamp is not None
+
+        conn.delete(outer)
+        conn.refresh_groups(graph)
+        assert graph.groups == {inner}
+        assert graph.groups_of(user) == {inner}
+    finally:
+        for group in (outer, inner):
+            with contextlib.suppress(errors.NoSuchObject):
+                conn.delete(group)
+
+
+def test_get_supported_controls(conn):
+    supported = conn.get_supported_controls()
+    assert virtual_list_view().controlType in supported
+
+
 def test_get_schema(conn):
     schema = conn.get_schema()
     assert schema, schema
@@ -390,6 +616,57 @@ def test_remove_recursive(conn, ou_structure):
         conn.get(ou_structure)
 
 
+@pytest.mark.timeout(10)
+def test_remove_recursive_pipelined(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}tree,{base_dn}')
+    create_ou(conn, base)
+    for i in range(3):
+        ou = ldap.DN(f'ou=sub{i},{base}')
+        create_ou(conn, ou)
+        create_ou(conn, f'ou=nested,{ou}')
+        for j in range(4):
+            create_user(conn, f'cn={TESTUSERNAME}{j},ou=nested,{ou}')
+    conn.delete_recursive(base, concurrency=3, page_size=5, use_tree_delete=False)
+    assert not conn.exists(base)
+
+
+def test_delete_recursive_paged(monkeypatch):
+    base = ldap.DN('ou=tree,dc=freeiam,dc=org')
+    subtree = [base, *(ldap.DN(f'ou=sub{i},{base}') for i in range(3)), *(ldap.DN(f'cn={j},ou=sub{i},{base}') for i in range(3) for j in range(4))]
+    pages = []
+    deleted = []
+
+    def search_paged(self, dn, scope, *, attrs, page_size, controls):
+        assert controls.server == []
+        assert page_size == 5
+        for start in range(0, len(subtree), page_size):
+            time.sleep(0)
+            pages.append(start)
+            for entry in subtree[start : start + page_size]:
+                yield Result(entry, None, None, None)
+
+    def delete(self, dn, *, controls=None):
+        time.sleep(0)
+        if dn == base and not deleted:
+            raise errors.NotAllowedOnNonleaf({'result': 66, 'desc': 'Operation not allowed on non-leaf', 'ctrls': []})
+        deleted.append(dn)
+        return Result(ldap.DN.get(dn), None, None, None)
+
+    def execute_many(self, conn, requests, concurrency):
+        for _operation, (dn,), _kwargs in requests:
+            time.sleep(0)
+            deleted.append(ldap.DN(dn))
+            yield _Response(ResponseType.Delete, None, None, None)
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'search_paged', search_paged)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'delete', delete)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_execute_many', execute_many)
+    conn = ldap.connection.SynchronousConnection(_conn=_ldap.ldapobject.LDAPObject.__new__(_ldap.ldapobject.LDAPObject))
+    conn.delete_recursive(base, page_size=5, use_tree_delete=False, controls=Controls([]))
+    assert pages == [0, 5, 10, 15]
+    assert deleted == subtree[4:] + subtree[1:4] + [base]
+
+
 def test_unbind(conn):
     conn.unbind()
     assert not (conn.whoami())
@@ -438,6 +715,424 @@ def test_paginated_search(conn, page_users, base_dn):
     assert total_entries == NUM_PAGEUSERS
 
 
+def test_vlv_cursor(conn, page_users, base_dn):
+    results = sorted(page_users)
+    cursor = VLVCursor(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', sorting=[('cn', 'caseIgnoreOrderingMatch', False)], page_size=4)
+    page = conn.search_vlv_page(cursor, 3)
+    assert [entry.dn for entry in page] == results[8:12]
+    assert cursor.content_count == NUM_PAGEUSERS
+    assert cursor.last_page == math.ceil(NUM_PAGEUSERS / 4)
+    assert page[0].page.page == 3
+    assert page[0].page.last_page == cursor.last_page
+    assert conn.search_vlv_page(cursor, 3) is page
+
+    page = conn.search_vlv_page(cursor, cursor.last_page)
+    assert [entry.dn for entry in page] == results[(cursor.last_page - 1) * 4 :]
+    assert conn.search_vlv_page(cursor, cursor.last_page + 1) == []
+    with pytest.raises(ValueError, match='Pages start at 1'):
+        conn.search_vlv_page(cursor, 0)
+
+    window = conn.search_vlv_window(cursor, 6, before=2, after=2)
+    assert [entry.dn for entry in window] == results[3:8]
+
+
+def test_type_ahead(conn, page_users, base_dn):
+    type_ahead = TypeAhead(base_dn, 'cn', filter_expr=f'(cn={PAGEPREFIX}*)', attrs=['sn'], size=5)
+    results = conn.search_type_ahead(type_ahead, f'{PAGEPREFIX.upper()}USER1')
+    assert [entry.attr['cn'][0].decode() for entry in results] == [f'{PAGEPREFIX}user{i}' for i in ('1', '10', '11', '12', '13')]
+    assert type_ahead.context_id is not None
+    assert conn.search_type_ahead(type_ahead, f'{PAGEPREFIX.upper()}USER1') is results
+
+    results = conn.search_type_ahead(type_ahead, f'{PAGEPREFIX}user12')
+    assert [entry.dn for entry in results] == [f'cn={PAGEPREFIX}user12,{base_dn}']
+    assert conn.search_type_ahead(type_ahead, f'{PAGEPREFIX}user2') != []
+    assert conn.search_type_ahead(type_ahead, f'{PAGEPREFIX}userx') == []
+    assert len(conn.search_type_ahead(type_ahead, '')) == 5
+
+
+def test_keyset_search(conn, page_users, base_dn):
+    results = sorted(page_users)
+    entries = list(conn.search_keyset(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', ['sn'], key_attr='cn', page_size=4))
+    assert [entry.dn for entry in entries] == results
+
+    # resume after the fifth entry
+    start = entries[4].attr['cn'][0].decode()
+    search = conn.search_keyset(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', key_attr='cn', page_size=4, start=start, start_dns=[entries[4].dn])
+    assert [entry.dn for entry in search] == results[5:]
+
+    # all entries share the same key
+    search = conn.search_keyset(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', key_attr='sn', page_size=2)
+    dns = [entry.dn for entry in search]
+    assert len(dns) == NUM_PAGEUSERS
+    assert set(dns) == {ldap.DN(dn) for dn in page_users}
+
+
+@pytest.mark.parametrize('connections', [1, 2])
+def test_search_parallel(conn, page_users, base_dn, connections):
+    expected = {ldap.DN(dn) for dn in page_users}
+    filter_expr = f'(cn={PAGEPREFIX}*)'
+
+    # partitioned by the children of the base
+    entries = list(conn.search_parallel(base_dn, Scope.SUBTREE, filter_expr, ['cn'], connections=connections))
+    assert {entry.dn for entry in entries} == expected
+    assert len(entries) == NUM_PAGEUSERS
+
+    # partitioned by value ranges
+    bounds = [f'{PAGEPREFIX}user2', f'{PAGEPREFIX}user5']
+    search = conn.search_parallel(base_dn, Scope.SUBTREE, filter_expr, partition_by='cn', bounds=bounds, connections=connections)
+    dns = [entry.dn for entry in search]
+    assert sorted(map(str, dns)) == sorted(map(str, expected))
+
+    search = conn.search_parallel(base_dn, Scope.SUBTREE, filter_expr, partition_by='entryUUID', partitions=3, concurrency=2, connections=connections)
+    dns = [entry.dn for entry in search]
+    assert sorted(map(str, dns)) == sorted(map(str, expected))
+
+    with pytest.raises(ValueError, match='requires bounds'):
+        next(conn.search_parallel(base_dn, partition_by='cn'))
+
+
+@pytest.mark.parametrize('ordering_rule, last_key', [('caseIgnoreOrderingMatch', 'Max'), ('caseExactOrderingMatch', 'max')])
+def test_keyset_search_keys(monkeypatch, ordering_rule, last_key):
+    entries = {'cn=a,dc=freeiam,dc=org': {'commonName': [b'Max']}, 'cn=b,dc=freeiam,dc=org': {'CN': [b'max']}}
+    filters = []
+
+    def search_iter(self, base, scope, filter_expr, attrs, *, sizelimit, sorting, controls):
+        filters.append(filter_expr)
+        for dn, attr in entries.items():
+            time.sleep(0)
+            yield Result(ldap.DN(dn), ldap.Attributes(attr), None, None)
+        if len(filters) == 1:
+            raise errors.SizelimitExceeded({'result': 4, 'desc': 'Size limit exceeded', 'ctrls': []})
+
+    monkeypatch.setitem(ldap.Attributes.ALIASES, 'commonName', 'cn')
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'search_iter', search_iter)
+    conn = ldap.connection.SynchronousConnection()
+    search = conn.search_keyset('dc=freeiam,dc=org', key_attr='cn', page_size=2, ordering_rule=ordering_rule)
+    assert [entry.dn for entry in search][:2] == [ldap.DN(dn) for dn in entries]
+    assert filters == ['(&(objectClass=*)(cn=*))', f'(&(objectClass=*)(cn>={last_key}))']
+
+    entries['cn=c,dc=freeiam,dc=org'] = {'cn': [b'Moritz', b'Zeta']}
+    with pytest.raises(ValueError, match='not single valued'):
+        _ = list(conn.search_keyset('dc=freeiam,dc=org', key_attr='cn', ordering_rule=ordering_rule))
+
+
+def test_entry_controls_only_if_requested():
+    class LDAPObject:
+        def __init__(self):
+            self.add_ctrls = []
+
+        def search_ext(self, *args, **kwargs):
+            return len(self.add_ctrls) + 1
+
+        def result4(self, msgid, **kwargs):
+            self.add_ctrls.append(kwargs['add_ctrls'])
+            return ResponseType.SearchResult, [], msgid, []
+
+    ldap_object = LDAPObject()
+    conn = ldap.connection.SynchronousConnection()
+    deref = Controls([dereference({'member': ['uid']})])
+    for msgid, controls in [(1, None), (2, deref), (3, Controls([server_side_sorting('cn')]))]:
+        assert conn.request(ldap_object.search_ext, 'dc=freeiam,dc=org', **Controls.expand(controls)) == msgid
+        conn.get_result(ldap_object, msgid, _all=1)
+    assert ldap_object.add_ctrls == [0, 1, 0]
+    assert not conn._entry_control_msgids
+
+
+def test_search_partitions_vanished_child(monkeypatch):
+    def get_result(self, conn, msgid, **kwargs):
+        raise errors.NoSuchObject({'result': 32, 'desc': 'No such object', 'ctrls': []})
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'get_result', get_result)
+    conn = ldap.connection.SynchronousConnection(_conn=_ldap.ldapobject.LDAPObject.__new__(_ldap.ldapobject.LDAPObject))
+    active = {(conn, 1): (0, Partition('ou=deleted,dc=freeiam,dc=org', optional=True))}
+    assert ldap.connection.SynchronousConnection._receive_partitions(active, None) == [(0, None)]
+    assert not active
+
+    active = {(conn, 2): (1, Partition('dc=freeiam,dc=org'))}
+    with pytest.raises(errors.NoSuchObject) as exc:
+        ldap.connection.SynchronousConnection._receive_partitions(active, None)
+    assert exc.value.base_dn == 'dc=freeiam,dc=org'
+
+
+def test_clone_binds_asynchronously(monkeypatch):
+    bound = []
+    restored = []
+
+    def bind(self, authzid, password, *, controls=None):
+        time.sleep(0)
+        bound.append((authzid, password))
+        self._last_auth_state = ('simple_bind_s', authzid, password)
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'bind', bind)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_restore_auth_state', lambda self: restored.append(self._last_auth_state))
+    conn = ldap.connection.SynchronousConnection()
+    conn._last_auth_state = ('simple_bind_s', 'cn=admin,dc=freeiam,dc=org', 'secret')
+    clone = conn._clone()
+    assert restored == [None]  # no blocking bind
+    assert bound == [('cn=admin,dc=freeiam,dc=org', 'secret')]
+    assert clone._last_auth_state == conn._last_auth_state
+
+
+def test_search_many(conn, base_dn):
+    bases = [ldap.DN(f'ou={TESTUSERNAME}tenant{i},{base_dn}') for i in (1, 2)]
+    expected = [ldap.DN(f'cn={TESTUSERNAME}b,{bases[0]}'), ldap.DN(f'cn={TESTUSERNAME}a,{bases[1]}')]
+    for base in bases:
+        create_ou(conn, base)
+    for dn in expected:
+        create_user(conn, dn)
+    filter_expr = f'(cn={TESTUSERNAME}*)'
+    try:
+        dns = [entry.dn for entry in conn.search_many(bases, Scope.SUBTREE, filter_expr, ['cn'])]
+        assert set(dns) == set(expected)
+
+        dns = [entry.dn for entry in conn.search_many(bases, Scope.SUBTREE, filter_expr, ['cn'], sort_key=['-cn'])]
+        assert dns == expected
+        dns = [entry.dn for entry in conn.search_many(bases, Scope.SUBTREE, filter_expr, sort_key=['cn'], concurrency=1, connections=2)]
+        assert dns == expected[::-1]
+    finally:
+        for base in bases:
+            conn.delete_recursive(base)
+
+
+@pytest.mark.parametrize('client_side', [None, True, False])
+def test_search_sorted(conn, page_users, base_dn, client_side):
+    expected = [ldap.DN(dn) for dn in sorted(page_users, reverse=True)]
+    sorting = [('cn', 'caseIgnoreOrderingMatch', True)]
+    search = conn.search_sorted(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', ['cn'], sorting=sorting, client_side=client_side, run_size=4)
+    assert [entry.dn for entry in search] == expected
+
+
+@pytest.mark.parametrize('vlv', [None, True, False])
+def test_count(conn, page_users, base_dn, vlv):
+    assert conn.count(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', vlv=vlv) == NUM_PAGEUSERS
+    assert conn.count(base_dn, Scope.ONELEVEL, f'(cn={PAGEPREFIX}user1*)', vlv=vlv) == 5
+    assert conn.count(base_dn, Scope.SUBTREE, '(cn=doesnotexist)', vlv=False) == 0
+    with pytest.raises(errors.NoSuchObject):
+        conn.count(f'cn=doesnotexist,{base_dn}', vlv=False)
+
+
+@pytest.mark.parametrize('error', [errors.AdminlimitExceeded, errors.SizelimitExceeded])
+def test_count_limit_exceeded(monkeypatch, error):
+    def count_vlv(*args):
+        time.sleep(0)
+        raise error({'result': 11, 'desc': 'Limit exceeded', 'ctrls': []})
+
+    def execute_iter(self, conn, *args, **kwargs):
+        for _ in range(3):
+            time.sleep(0)
+            yield _Response(ResponseType.SearchEntry, [('cn=x', {})], 1, [])
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_count_vlv', count_vlv)
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, '_execute_iter', execute_iter)
+    conn = ldap.connection.SynchronousConnection(_conn=_ldap.ldapobject.LDAPObject.__new__(_ldap.ldapobject.LDAPObject))
+    assert conn.count('dc=freeiam,dc=org') == 3
+    with pytest.raises(error):
+        conn.count('dc=freeiam,dc=org', vlv=True)
+
+
+def test_read_changelog_ordering(monkeypatch):
+    def entry(number):
+        attrs = {'changeNumber': [str(number).encode()], 'changeType': [b'delete'], 'targetDN': [f'cn={number},dc=freeiam,dc=org'.encode()]}
+        return Result(ldap.DN(f'changeNumber={number},cn=changelog'), ldap.Attributes(attrs), None, None)
+
+    requests = []
+
+    def search_iter(self, base, scope, filter_expr, attrs, *, sizelimit=None, sorting=None, controls=None):
+        requests.append((sizelimit, sorting))
+        if sorting:
+            raise errors.UnavailableCriticalExtension({'result': 12, 'desc': 'Unavailable critical extension', 'ctrls': []})
+        for number in (3, 1, 2):  # any order
+            time.sleep(0)
+            yield entry(number)
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'search_iter', search_iter)
+    store = CookieStore()
+    records = list(ldap.connection.SynchronousConnection().read_changelog('cn=changelog', kind='changelog', checkpoint_store=store))
+    assert [record.checkpoint for record in records] == ['1', '2', '3']
+    assert store.get() == '3'
+    assert requests == [(100, ['changeNumber']), (None, None)]
+
+
+def apply_sync_events(entries, events):
+    """Apply synchronization events to a mapping of entryUUID to DN"""
+    present = set()
+    for event in events:
+        if event.type in {SyncEventType.Add, SyncEventType.Modify}:
+            entries[event.uuid] = event.dn
+        if event.type in {SyncEventType.Add, SyncEventType.Modify, SyncEventType.Present}:
+            present.add(event.uuid)
+        elif event.type == SyncEventType.Delete:
+            entries.pop(event.uuid, None)
+        elif event.type == SyncEventType.PresentDone:
+            for uuid in set(entries) - present:
+                del entries[uuid]
+    return entries
+
+
+@pytest.mark.timeout(30)
+def test_syncrepl(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}sync,{base_dn}')
+    first = ldap.DN(f'cn={TESTUSERNAME}1,{base}')
+    second = ldap.DN(f'cn={TESTUSERNAME}2,{base}')
+    filter_expr = '(objectClass=inetOrgPerson)'
+    store = CookieStore()
+    create_ou(conn, base)
+    create_user(conn, first)
+    try:
+        events = list(conn.syncrepl(base, Scope.SUBTREE, filter_expr, ['cn'], cookie_store=store))
+        assert events[-1].type == SyncEventType.RefreshDone
+        entries = apply_sync_events({}, events)
+        assert list(entries.values()) == [first]
+        assert store.get()
+
+        # resume with the cookie
+        create_user(conn, second)
+        conn.delete(first)
+        events = list(conn.syncrepl(base, Scope.SUBTREE, filter_expr, ['cn'], cookie_store=store))
+        assert list(apply_sync_events(entries, events).values()) == [second]
+
+        events = conn.syncrepl(base, Scope.SUBTREE, filter_expr, ['sn'], mode='refreshAndPersist', cookie_store=store)
+        event = next(events)
+        while event.type != SyncEventType.RefreshDone:
+            event = next(events)
+        conn.modify(second, {'sn': [b'before']}, {'sn': [b'after']})
+        event = next(events)
+        assert (event.type, event.dn, event.attr['sn']) == (SyncEventType.Modify, second, [b'after'])
+        events.close()
+    finally:
+        conn.delete_recursive(base)
+
+
+def test_export_delta(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}delta,{base_dn}')
+    first = ldap.DN(f'cn={TESTUSERNAME}1,{base}')
+    second = ldap.DN(f'cn={TESTUSERNAME}2,{base}')
+    filter_expr = '(objectClass=inetOrgPerson)'
+    store = WatermarkStore()
+    create_ou(conn, base)
+    create_user(conn, first)
+    try:
+        delta = conn.export_delta(base, Scope.SUBTREE, filter_expr, ['cn'], store=store)
+        assert delta.full
+        assert [result.dn for result in delta.changed] == [first]
+        assert delta.watermark.dns == {first}
+        assert store.get(base, Scope.SUBTREE, filter_expr) == delta.watermark
+
+        create_user(conn, second)
+        conn.delete(first)
+        delta = conn.export_delta(base, Scope.SUBTREE, filter_expr, ['cn'], store=store)
+        assert not delta.full
+        assert [result.dn for result in delta.changed] == [second]
+        assert delta.deleted == {first}
+
+        # nothing changed after the watermark
+        store.set(base, Scope.SUBTREE, filter_expr, Watermark(delta.watermark.timestamp + 3600, delta.watermark.dns))
+        delta = conn.export_delta(base, Scope.SUBTREE, filter_expr, ['cn'], store=store, overlap=0)
+        assert (delta.changed, delta.deleted) == ([], set())
+    finally:
+        conn.delete_recursive(base)
+
+
+def test_export_ldif(conn, base_dn, tmp_path):
+    base = ldap.DN(f'ou={TESTUSERNAME}ldif,{base_dn}')
+    users = [ldap.DN(f'cn={TESTUSERNAME}{i},{base}') for i in range(5)]
+    create_ou(conn, base)
+    for user in users:
+        create_user(conn, user, description='Jörg', jpegPhoto='foo')
+    try:
+        path = tmp_path / 'export.ldif.gz'
+        count = conn.export_ldif(path, base, Scope.ONELEVEL, '(objectClass=inetOrgPerson)', ['cn', 'description', 'jpegPhoto'], page_size=2)
+        assert count == 5
+        with LDIFReader.open(path) as reader:
+            records = list(reader)
+        assert sorted(record.dn for record in records) == sorted(users)
+        assert all(record.attr['jpegPhoto'] == [b'foo'] and record.attr['description'] == ['Jörg'.encode()] for record in records)
+        with gzip.open(path) as fd:
+            data = fd.read()
+        assert b'jpegPhoto:: Zm9v' in data  # binary syntax
+        assert b'description:: ' in data
+    finally:
+        conn.delete_recursive(base)
+
+
+def test_bulk_import(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}bulk,{base_dn}')
+
+    def ou(dn):
+        return ChangeRecord('', LDAPChangeType.Add, dn, [(Mod.Add, 'objectClass', [b'organizationalUnit']), (Mod.Add, 'ou', [dn.rdn[1].encode()])])
+
+    def user(dn, object_class=b'inetOrgPerson'):
+        name = dn.rdn[1].encode()
+        return ChangeRecord('', LDAPChangeType.Add, dn, [(Mod.Add, 'objectClass', [object_class]), (Mod.Add, 'cn', [name]), (Mod.Add, 'sn', [name])])
+
+    people = ldap.DN(f'ou=people,{base}')
+    broken = ldap.DN(f'cn=broken,{base}')
+    users = [ldap.DN(f'cn={TESTUSERNAME}{i},{people}') for i in range(20)]
+    records = [
+        *(user(dn) for dn in users),  # children before their parents
+        ou(people),
+        ChangeRecord('', LDAPChangeType.Modify, people, [(Mod.Replace, 'description', [b'people'])]),
+        user(broken, b'doesNotExist'),
+        user(ldap.DN(f'cn=child,{broken}')),
+        ou(base),
+    ]
+    try:
+        report = conn.bulk_import(records, connections=2, concurrency=8, backoff=0.01)
+        assert report.applied == 23
+        assert [record.dn for record, _error in report.failed] == [broken]
+        assert [record.dn for record in report.skipped] == [ldap.DN(f'cn=child,{broken}')]
+        assert sorted(conn.search_dn(people, Scope.ONELEVEL)) == sorted(users)
+        assert (conn.get_attr(people, 'description')) == [b'people']
+
+        report = conn.bulk_import(records[:21], skip_existing=True)
+        assert (report.applied, report.existing, report.ok) == (0, 21, True)
+    finally:
+        conn.delete_recursive(base)
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.xfail(raises=errors.UnavailableCriticalExtension)  # not supported by OpenLDAP
+def test_watch(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}watch,{base_dn}')
+    user = ldap.DN(f'cn={TESTUSERNAME}1,{base}')
+    create_ou(conn, base)
+    create_user(conn, user, sn='before')
+    try:
+        changes = conn.watch(user, Scope.BASE, change_types=[LDAPChangeType.Modify], changes_only=False)
+        event = next(changes)
+        assert (event.type, event.dn) == (ChangeType.Present, user)
+        conn.modify(user, {'sn': [b'before']}, {'sn': [b'after']})
+        event = next(changes)
+        assert (event.type, event.dn, event.attr['sn']) == (ChangeType.Modify, user, [b'after'])
+        changes.close()
+    finally:
+        conn.delete_recursive(base)
+
+
+def test_refresh_replica(conn, base_dn):
+    base = ldap.DN(f'ou={TESTUSERNAME}replica,{base_dn}')
+    first = ldap.DN(f'cn={TESTUSERNAME}1,{base}')
+    second = ldap.DN(f'cn={TESTUSERNAME}2,{base}')
+    replica = LocalReplica(base, filter_expr='(objectClass=inetOrgPerson)', indexes=['cn'], max_staleness=60)
+    create_ou(conn, base)
+    create_user(conn, first)
+    try:
+        with pytest.raises(errors.StaleReplica):
+            replica.get(first)
+        assert conn.refresh_replica(replica) is replica
+        assert replica.get(first).dn == first
+        assert [result.dn for result in replica.search(filter_expr=f'(cn={TESTUSERNAME.upper()}1)')] == [first]
+
+        create_user(conn, second)
+        conn.delete(first)
+        conn.refresh_replica(replica)
+        assert [result.dn for result in replica.search()] == [second]
+        with pytest.raises(errors.NoSuchObject):
+            replica.get(first)
+    finally:
+        conn.delete_recursive(base)
+
+
 def test_paginated_error_search(conn, page_users, base_dn):
     pagination = virtual_list_view(
         before_count=0,
@@ -463,13 +1158,24 @@ def test_paginated_search_expect_nothing(conn, base_dn):
         pytest.fail(f'Got {entry}')
 
 
-def test_paged_search(conn, page_users, base_dn):
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_paged_search(monkeypatch, conn, page_users, base_dn, prefetch):
+    requested = []
+    request = ldap.connection.SynchronousConnection.request
+
+    def count_request(self, operation, *args, **kwargs):
+        if operation.__name__ == 'search_ext':
+            requested.append(args[0])
+        return request(self, operation, *args, **kwargs)
+
+    monkeypatch.setattr(ldap.connection.SynchronousConnection, 'request', count_request)
     results = list(page_users)
     page_size = 5
     total_entries = 0
     cur_entry_on_page = 1
-    for entry in conn.search_paged(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=page_size):
+    for entry in conn.search_paged(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=page_size, prefetch=prefetch):
         assert results.pop(0) == entry.dn
+        assert len(requested) <= entry.page.page + prefetch  # at most prefetch pages are buffered or requested ahead
 
         assert entry.page.page_size == page_size
         assert entry.page.page == (1 + total_entries // page_size)
@@ -487,8 +1193,26 @@ def test_paged_search(conn, page_users, base_dn):
     assert total_entries == NUM_PAGEUSERS
 
 
-def test_paged_search_expect_nothing(conn, base_dn):
-    for entry in conn.search_paged(base_dn, Scope.SUBTREE, '(cn=doesnotexists)', page_size=5):
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_adaptive_page_size(conn, page_users, base_dn, prefetch):
+    page_size = AdaptivePageSize(2, minimum=2, maximum=8)
+    search = conn.search_paged(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=page_size, prefetch=prefetch)
+    results = [entry.page.page_size for entry in search]
+    assert len(results) == NUM_PAGEUSERS
+    assert results[:2] == [2, 2]
+    assert max(results) > 2
+
+    page_size = AdaptivePageSize(2, minimum=2, maximum=8)
+    sorting = [('cn', 'caseIgnoreOrderingMatch', False)]
+    entries = list(conn.search_paginated(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=page_size, sorting=sorting))
+    assert [entry.dn for entry in entries] == sorted(page_users)
+    assert entries[-1].page.last_page == entries[-1].page.page
+    assert max(entry.page.page_size for entry in entries) > 2
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_paged_search_expect_nothing(conn, base_dn, prefetch):
+    for entry in conn.search_paged(base_dn, Scope.SUBTREE, '(cn=doesnotexists)', page_size=5, prefetch=prefetch):
         pytest.fail(f'Got {entry}')
 
 
@@ -646,8 +1370,9 @@ def test_paginated_search_close(conn, page_users, base_dn):
         next(gen)
 
 
-def test_paged_search_close(conn, page_users, base_dn):
-    gen = conn.search_paged(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=1)
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_paged_search_close(conn, page_users, base_dn, prefetch):
+    gen = conn.search_paged(base_dn, Scope.SUBTREE, f'(cn={PAGEPREFIX}*)', page_size=1, prefetch=prefetch)
 
     result = next(gen)
     assert result is not None
@@ -1,10 +1,11 @@
 import ldap as _ldap
 import pytest
 from ldap.controls import RelaxRulesControl, SimplePagedResultsControl
+from ldap.controls.deref import DereferenceControl
 
 from freeiam import errors, ldap
-from freeiam.ldap._wrapper import Result  # noqa: PLC2701
-from freeiam.ldap.constants import LDAPChangeType, Mod, Scope
+from freeiam.ldap._wrapper import Result, _Response  # noqa: PLC2701
+from freeiam.ldap.constants import LDAPChangeType, Mod, ResponseType, Scope
 from freeiam.ldap.controls import (
     Controls,
     assertion,
@@ -123,6 +124,36 @@ def test_dereference_control_not_supported(conn, base_dn):
     conn.search(f'ou=groups,{base_dn}', Scope.Subtree, '(objectClass=groupOfNames)', controls=Controls([ctrl]))
 
 
+@pytest.mark.xfail(raises=errors.UnavailableCriticalExtension)
+def test_search_deref_not_supported(conn, base_dn):
+    conn.search(base_dn, Scope.SUBTREE, '(objectClass=groupOfNames)', ['cn'], deref={'member': ['uid', 'mail']})
+
+
+@pytest.mark.xfail(raises=errors.UnavailableCriticalExtension)
+def test_tree_delete_control_not_supported(conn, base_dn):
+    dn = f'ou=treedelete,{base_dn}'
+    conn.add(dn, {'objectClass': [b'organizationalUnit'], 'ou': [b'treedelete']})
+    conn.add(f'ou=child,{dn}', {'objectClass': [b'organizationalUnit'], 'ou': [b'child']})
+    try:
+        conn.delete_recursive(dn, use_tree_delete=True)
+    finally:
+        conn.delete_recursive(dn, use_tree_delete=False)
+
+
+def test_result_dereferenced():
+    ctrl = DereferenceControl()
+    ctrl.derefRes = {'member': [('uid=max,dc=freeiam,dc=org', {'mail': ['max@freeiam.org']}), ('uid=eva,dc=freeiam,dc=org', {})]}
+    dn = 'cn=group,dc=freeiam,dc=org'
+    response = _Response(ResponseType.SearchEntry, [(dn, {'cn': [b'group']}, [ctrl]), ('cn=other', {}, [])], 1, [])
+    assert response.data == [(dn, {'cn': [b'group']}), ('cn=other', {})]
+
+    result = Result.from_response(dn, {'cn': [b'group']}, None, response)
+    members = result.dereferenced['member']
+    assert [member.dn for member in members] == [DN('uid=max,dc=freeiam,dc=org'), DN('uid=eva,dc=freeiam,dc=org')]
+    assert members[0].attr['mail'] == [b'max@freeiam.org']
+    assert Result.from_response('cn=other', {}, None, response).dereferenced == {}
+
+
 def test_matched_values_control(conn, base_dn):
     ctrl = matched_values('(sn=*)', criticality=True)
     results = conn.search(f'ou=users,{base_dn}', Scope.Subtree, '(objectClass=inetOrgPerson)', controls=Controls([ctrl]))
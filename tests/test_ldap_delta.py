@@ -0,0 +1,48 @@
+import pytest
+
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.delta import FileWatermarkStore, Watermark, WatermarkStore
+from freeiam.ldap.dn import DN
+
+
+BASE = 'dc=freeiam,dc=org'
+FILTER = '(objectClass=person)'
+
+
+def test_watermark_store():
+    store = WatermarkStore()
+    assert store.get(BASE, Scope.SUBTREE, FILTER) is None
+    store.set(BASE, Scope.SUBTREE, FILTER, Watermark(1735689600))
+    assert store.get('dc=freeiam, dc=org', Scope.SUBTREE, FILTER) == Watermark(1735689600)
+    assert store.get(BASE, Scope.ONELEVEL, FILTER) is None
+    assert store.get(BASE, Scope.SUBTREE, '(objectClass=*)') is None
+    store.set(BASE, Scope.SUBTREE, FILTER, None)
+    assert store.get(BASE, Scope.SUBTREE, FILTER) is None
+
+
+def test_file_watermark_store(tmp_path):
+    path = tmp_path / 'watermarks.json'
+    watermark = Watermark(1735689600, frozenset({DN(f'uid=max,{BASE}'), DN(f'uid=moritz,{BASE}')}))
+    store = FileWatermarkStore(path)
+    store.set(BASE, Scope.SUBTREE, FILTER, watermark)
+    store.set(BASE, Scope.ONELEVEL, FILTER, Watermark(1735689601))
+    store = FileWatermarkStore(path)
+    assert store.get(BASE, Scope.SUBTREE, FILTER) == watermark
+    assert store.get(BASE, Scope.ONELEVEL, FILTER) == Watermark(1735689601)
+    store.set(BASE, Scope.ONELEVEL, FILTER, None)
+    assert FileWatermarkStore(path).get(BASE, Scope.ONELEVEL, FILTER) is None
+
+
+def test_file_watermark_store_failed_write(tmp_path, monkeypatch):
+    path = tmp_path / 'watermarks.json'
+    store = FileWatermarkStore(path)
+    store.set(BASE, Scope.SUBTREE, FILTER, Watermark(1735689600))
+
+    def fsync(fd):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr('os.fsync', fsync)
+    with pytest.raises(OSError, match='No space left'):
+        store.set(BASE, Scope.ONELEVEL, FILTER, Watermark(1735689601))
+    assert list(tmp_path.iterdir()) == [path]  # the temporary file is removed
+    assert FileWatermarkStore(path).get(BASE, Scope.ONELEVEL, FILTER) is None
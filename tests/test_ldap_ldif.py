@@ -0,0 +1,123 @@
+import asyncio
+import io
+
+import pytest
+
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import LDAPChangeType, Mod
+from freeiam.ldap.dn import DN
+from freeiam.ldap.ldif import ChangeRecord, LDIFReader, LDIFWriter
+
+
+BASE = 'dc=freeiam,dc=org'
+
+
+def results(count):
+    for i in range(count):
+        yield Result(DN(f'uid=user{i},{BASE}'), Attributes({'uid': [f'user{i}'.encode()], 'description': [b'x' * 100]}), None, None)
+
+
+def test_write_entries():
+    fd = io.BytesIO()
+    with LDIFWriter(fd, base64_attrs=['jpegPhoto'], cols=40) as writer:
+        writer.write_entry(
+            f'cn=Jörg,{BASE}',
+            {'cn': ['Jörg'.encode()], 'description': [b' leading space', b'x' * 50], 'jpegPhoto': [b'foo'], 'userCertificate;binary': [b'bar']},
+        )
+    lines = fd.getvalue().split(b'\n')
+    assert lines[0].startswith(b'dn:: ')
+    assert b'cn:: SsO2cmc=' in lines
+    assert b'description:: IGxlYWRpbmcgc3BhY2U=' in lines
+    assert b'description: ' + b'x' * 27 in lines
+    assert b' ' + b'x' * 23 in lines
+    assert b'jpegPhoto:: Zm9v' in lines
+    assert b'userCertificate;binary:: YmFy' in lines
+    assert all(len(line) <= 40 for line in lines)
+    assert writer.records == 1
+
+
+def test_write_results_chunked(tmp_path):
+    path = tmp_path / 'export.ldif.gz'
+    with LDIFWriter.open(path, chunk_size=1024) as writer:
+        assert writer.write_results(results(100)) == 100
+
+        async def aresults():
+            for result in results(10):
+                await asyncio.sleep(0)
+                yield result
+
+        assert asyncio.run(writer.awrite_results(aresults())) == 10
+    assert path.read_bytes()[:2] == b'\x1f\x8b'
+    with LDIFReader.open(path) as reader:
+        records = list(reader)
+    assert len(records) == 110
+    assert records[1].dn == DN(f'uid=user1,{BASE}')
+    assert records[1].attr == {'uid': [b'user1'], 'description': [b'x' * 100]}
+
+
+def test_roundtrip_changes():
+    changes = [
+        ChangeRecord('', LDAPChangeType.Add, DN(f'uid=max,{BASE}'), [(Mod.Add, 'uid', [b'max']), (Mod.Add, 'cn', [b'Max', 'Mäx'.encode()])]),
+        ChangeRecord('', LDAPChangeType.Modify, DN(f'uid=max,{BASE}'), [(Mod.Replace, 'sn', [b'Doe']), (Mod.Delete, 'description', None)]),
+        ChangeRecord(
+            '', LDAPChangeType.ModifyDN, DN(f'uid=max,{BASE}'), new_rdn='uid=moritz', delete_old_rdn=True, new_superior=DN(f'ou=people,{BASE}')
+        ),
+        ChangeRecord('', LDAPChangeType.Delete, DN(f'uid=moritz,ou=people,{BASE}')),
+    ]
+    fd = io.BytesIO()
+    with LDIFWriter(fd) as writer:
+        for change in changes:
+            writer.write_change(change)
+    data = fd.getvalue()
+    records = list(LDIFReader(data))
+    assert [(record.type, record.dn, record.modlist, record.new_dn) for record in records] == [
+        (change.type, change.dn, change.modlist, change.new_dn) for change in changes
+    ]
+    assert [data[int(record.checkpoint) :].split(b'\n', 1)[0] for record in records] == [b'dn: uid=max,dc=freeiam,dc=org'] * 3 + [
+        b'dn: uid=moritz,ou=people,dc=freeiam,dc=org'
+    ]
+
+
+def test_reader_resume(tmp_path):
+    path = tmp_path / 'export.ldif'
+    path.write_bytes(
+        b'version: 1\r\n# comment\r\n#  folded\r\ndn: uid=max,dc=freeiam,dc=org\r\nuid: max\r\ndescrip\r\n tion: foo\r\n\r\n\r\n'
+        b'dn:: dWlkPW1vcml0eixkYz1mcmVlaWFtLGRjPW9yZw==\r\ncontrol: 1.2.3 true\r\n'
+        b'changetype: modify\r\nadd: mail\r\nmail: moritz@freeiam.org\r\n-\r\n'
+    )
+    with LDIFReader.open(path, memory_map=True) as reader:
+        records = iter(reader)
+        first = next(records)
+        assert first.attr == {'uid': [b'max'], 'description': [b'foo']}
+        assert reader.offset == 0  # not consumed yet
+        second = next(records)
+        offset = reader.offset
+    assert int(first.checkpoint) < offset < int(second.checkpoint)
+
+    with LDIFReader.open(path, offset=offset) as reader:
+        assert list(reader) == [second]
+        assert second.dn == DN(f'uid=moritz,{BASE}')
+        assert second.modlist == [(Mod.Add, 'mail', [b'moritz@freeiam.org'])]
+        assert reader.offset == path.stat().st_size
+
+    with pytest.raises(ValueError, match='does not start with a DN'):
+        list(LDIFReader(b'uid: max\n'))
+    with pytest.raises(ValueError, match='changetype'):
+        list(LDIFReader(b'dn: uid=max\nchangetype: foo\n'))
+    with LDIFWriter.open(tmp_path / 'export.ldif.gz') as writer:
+        writer.write_results(results(1))
+    with pytest.raises(ValueError, match='memory-mapped'):
+        LDIFReader.open(tmp_path / 'export.ldif.gz', memory_map=True)
+
+
+def test_reader_url_values(tmp_path):
+    photo = tmp_path / 'photo.jpg'
+    photo.write_bytes(b'\xff\xd8')
+    ldif = f'dn: uid=max,{BASE}\nuid: max\njpegPhoto:< file://{photo}\n'.encode()
+    with pytest.raises(ValueError, match='not processed'):
+        list(LDIFReader(ldif))
+    (record,) = LDIFReader(ldif, process_url_schemes=['file'])
+    assert record.attr == {'uid': [b'max'], 'jpegPhoto': [b'\xff\xd8']}
+    with pytest.raises(ValueError, match='Unsupported URL scheme'):
+        list(LDIFReader(b'dn: uid=max\njpegPhoto:< http://example.org/photo.jpg\n', process_url_schemes=['http']))
@@ -0,0 +1,92 @@
+import pytest
+from ldap.schema.subentry import SubSchema
+
+from freeiam.ldap.matching import Matcher
+from freeiam.ldap.schema import Schema
+
+
+DN = 'uid=max,ou=people,dc=freeiam,dc=org'
+ATTRS = {
+    'objectClass': [b'top', b'person', b'inetOrgPerson'],
+    'uid': [b'max'],
+    'cn': [b'Max  Mustermann'],
+    'sn': [b'Mustermann'],
+    'uidNumber': [b'1000'],
+    'member': [b'CN=Admins, dc=freeiam,dc=org'],
+    'description': [b'Ex*ample (1)'],
+}
+
+
+@pytest.mark.parametrize(
+    'filter_expr, expected',
+    [
+        ('(uid=max)', True),
+        ('(UID=MAX)', True),
+        ('(uid=moritz)', False),
+        ('(cn=max mustermann)', True),
+        ('(cn~=max mustermann)', True),
+        ('(mail=*)', False),
+        ('(uid=*)', True),
+        ('(cn=max*)', True),
+        ('(cn=*mann)', True),
+        ('(cn=m*must*mann)', True),
+        ('(cn=*mann*max*)', False),
+        ('(cn=ma*x*)', True),
+        ('(sn=mustermann*mann)', False),
+        (r'(description=ex\2aample \28*)', True),
+        ('(uidNumber>=999)', True),
+        ('(uidNumber>=1000)', True),
+        ('(uidNumber<=999)', False),
+        ('(uidNumber=01000)', True),
+        ('(member=cn=admins,dc=freeiam,dc=org)', True),
+        ('(&(objectClass=person)(uid=max))', True),
+        ('(&(objectClass=person)(uid=moritz))', False),
+        ('(|(uid=moritz)(uid=max))', True),
+        ('(!(uid=max))', False),
+        ('(!(uid=moritz))', True),
+        ('(uid:caseExactMatch:=max)', True),
+        ('(uid:caseExactMatch:=Max)', False),
+        ('(uid:2.5.13.2:=Max)', True),
+        ('(ou:dn:=people)', True),
+        ('(:dn:2.5.13.5:=people)', True),
+        ('(ou=people)', False),
+    ],
+)
+def test_matches(filter_expr, expected):
+    assert Matcher().matches(filter_expr, DN, ATTRS) is expected
+
+
+@pytest.mark.parametrize(
+    'filter_expr',
+    [
+        '(uidNumber>=abc)',
+        '(uid:unknownMatch:=max)',
+        '(member=invalid)',
+    ],
+)
+def test_undefined(filter_expr):
+    matcher = Matcher()
+    assert not matcher.matches(filter_expr, DN, ATTRS)
+    assert not matcher.matches(f'(!{filter_expr})', DN, ATTRS)
+    assert matcher.matches(f'(|(uid=max){filter_expr})', DN, ATTRS)
+    assert not matcher.matches(f'(&(uid=max){filter_expr})', DN, ATTRS)
+
+
+def test_schema_matching_rules():
+    schema = Schema(
+        SubSchema({
+            'attributeTypes': [
+                b"( 2.5.4.41 NAME 'name' EQUALITY caseIgnoreMatch SUBSTR caseIgnoreSubstringsMatch )",
+                b"( 2.5.4.3 NAME ( 'cn' 'commonName' ) SUP name )",
+                b"( 1.3.6.1.4.1.1466.115.121.1.26 NAME 'codeword' EQUALITY caseExactMatch ORDERING caseExactOrderingMatch )",
+            ],
+        })
+    )
+    assert schema.get_matching_rules('commonName') == ('caseIgnoreMatch', None, 'caseIgnoreSubstringsMatch')
+    assert schema.get_matching_rules('unknown') == (None, None, None)
+    matcher = Matcher(schema)
+    attrs = {'cn': [b'Max'], 'codeword': [b'Secret']}
+    assert matcher.matches('(cn=MAX)', DN, attrs)
+    assert matcher.matches('(codeword=Secret)', DN, attrs)
+    assert not matcher.matches('(codeword=secret)', DN, attrs)
+    assert matcher.matches('(codeword<=Secret)', DN, attrs)
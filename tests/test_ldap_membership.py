@@ -0,0 +1,57 @@
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.dn import DN
+from freeiam.ldap.membership import GroupGraph
+
+
+BASE = 'dc=freeiam,dc=org'
+USER = DN(f'uid=max,{BASE}')
+ADMINS = DN(f'cn=admins,{BASE}')
+STAFF = DN(f'cn=staff,{BASE}')
+ALL = DN(f'cn=all,{BASE}')
+
+
+def test_group_graph_transitive():
+    graph = GroupGraph(BASE)
+    graph.update(ADMINS, [USER])
+    graph.update(STAFF, [ADMINS])
+    graph.update(ALL, [STAFF])
+    assert graph.groups_of(USER) == {ADMINS, STAFF, ALL}
+    assert graph.groups_of(STAFF) == {ALL}
+    assert graph.members_of(ALL) == {STAFF, ADMINS, USER}
+    assert graph.is_member(USER, ALL)
+    assert not graph.is_member(ALL, USER)
+    assert len(graph) == 3
+    assert STAFF in graph
+
+    # changes invalidate the memoized memberships below the changed group
+    graph.update(STAFF, [])
+    assert graph.groups_of(USER) == {ADMINS}
+    graph.update(STAFF, [f'uid=max,{BASE}'])
+    assert graph.groups_of(USER) == {ADMINS, STAFF, ALL}
+    graph.remove(ALL)
+    assert graph.groups_of(USER) == {ADMINS, STAFF}
+    assert ALL not in graph
+
+
+def test_group_graph_cycles():
+    graph = GroupGraph(BASE)
+    graph.update(ADMINS, [USER, STAFF])
+    graph.update(STAFF, [ADMINS])
+    graph.update(ALL, [ALL, STAFF])
+    assert graph.groups_of(USER) == {ADMINS, STAFF, ALL}
+    assert graph.groups_of(ADMINS) == {ADMINS, STAFF, ALL}
+    assert sorted(map(len, graph.cycles())) == [1, 2]
+    assert {ADMINS, STAFF} in graph.cycles()
+    graph.clear()
+    assert not graph.cycles()
+
+
+def test_group_graph_load():
+    graph = GroupGraph(BASE)
+    attrs = {'uniqueMember': [f"uid=max,{BASE}#'0101'B".encode()], 'member': [str(STAFF).encode()], 'modifyTimestamp': [b'20250101000000Z']}
+    graph.load(Result(ADMINS, Attributes(attrs), None, None))
+    assert graph.members(ADMINS) == {USER, STAFF}
+    assert graph.timestamp == '20250101000000Z'
+    graph.load(Result(STAFF, Attributes({'modifyTimestamp': [b'20240101000000Z']}), None, None))
+    assert graph.timestamp == '20250101000000Z'
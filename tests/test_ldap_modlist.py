@@ -0,0 +1,59 @@
+from ldap.schema.subentry import SubSchema
+
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import Mod
+from freeiam.ldap.modlist import modify_modlist
+from freeiam.ldap.schema import Schema
+
+
+SCHEMA = Schema(
+    SubSchema({
+        'attributeTypes': [
+            b"( 2.5.4.41 NAME 'name' EQUALITY caseIgnoreMatch SUBSTR caseIgnoreSubstringsMatch )",
+            b"( 2.5.4.3 NAME ( 'cn' 'commonName' ) SUP name )",
+            b"( 2.5.4.31 NAME 'member' EQUALITY distinguishedNameMatch )",
+            b"( 2.5.4.35 NAME 'userPassword' EQUALITY octetStringMatch )",
+            b"( 0.9.2342.19200300.100.1.60 NAME 'jpegPhoto' )",
+        ],
+    })
+)
+
+
+def members(*names):
+    return [f'uid={name},dc=freeiam,dc=org'.encode() for name in names]
+
+
+def test_noop():
+    old = {'cn': [b'Max Mustermann'], 'member': members('a', 'b')}
+    new = {'CN': [b'max  MUSTERMANN'], 'member': [b'UID=b,dc=freeiam,dc=org', b'uid=a, dc=freeiam, dc=org']}
+    assert modify_modlist(old, new, schema=SCHEMA) == []
+    assert modify_modlist(old, old) == []
+    assert modify_modlist(old, new) == [(Mod.Replace, 'CN', [b'max  MUSTERMANN']), (Mod.Replace, 'member', new['member'])]
+
+
+def test_exact_values():
+    assert modify_modlist({'userPassword': [b'Secret']}, {'userPassword': [b'secret']}, schema=SCHEMA) == [(Mod.Replace, 'userPassword', [b'secret'])]
+    assert modify_modlist({'cn': [b'Max']}, {'cn': [b'Moritz']}, schema=SCHEMA) == [(Mod.Replace, 'cn', [b'Moritz'])]
+
+
+def test_minimal_values():
+    old = {'member': members(*range(100))}
+    new = {'member': members(*range(1, 101))}
+    assert modify_modlist(old, new, schema=SCHEMA) == [(Mod.Delete, 'member', members(0)), (Mod.Add, 'member', members(100))]
+    assert modify_modlist(old, {'member': [*old['member'], *members('x')]}, schema=SCHEMA) == [(Mod.Add, 'member', members('x'))]
+    assert modify_modlist(old, {'member': members(*range(2, 100))}, schema=SCHEMA) == [(Mod.Delete, 'member', members(0, 1))]
+    assert modify_modlist(old, {'member': members(*range(10))}, schema=SCHEMA) == [(Mod.Replace, 'member', members(*range(10)))]
+    assert modify_modlist(old, {'member': members('x')}, schema=SCHEMA) == [(Mod.Replace, 'member', members('x'))]
+
+    # values of attributes without equality matching rule can't be deleted individually
+    photos = [bytes([i]) for i in range(10)]
+    assert modify_modlist({'jpegPhoto': photos}, {'jpegPhoto': photos[1:]}, schema=SCHEMA) == [(Mod.Replace, 'jpegPhoto', photos[1:])]
+
+
+def test_add_and_delete_attributes(monkeypatch):
+    monkeypatch.setitem(Attributes.ALIASES, 'commonName', 'cn')
+    old = {'commonName': [b'Max'], 'description': [b'foo'], 'mail': []}
+    new = {'cn': [b'Max'], 'sn': [b'Mustermann'], 'title': []}
+    assert modify_modlist(old, new, schema=SCHEMA) == [(Mod.Add, 'sn', [b'Mustermann']), (Mod.Delete, 'description', None)]
+    assert modify_modlist(old, new, schema=SCHEMA, ignore_missing=True) == [(Mod.Add, 'sn', [b'Mustermann'])]
+    assert modify_modlist(old, {'description': []}, ignore_missing=True) == [(Mod.Delete, 'description', None)]
@@ -0,0 +1,99 @@
+import pytest
+
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.dn import DN
+from freeiam.ldap.pagination import AdaptivePageSize, TypeAhead, VLVCursor
+
+
+def test_adaptive_page_size_bounds():
+    assert int(AdaptivePageSize(1, minimum=10)) == 10
+    assert int(AdaptivePageSize(10_000, maximum=500)) == 500
+    with pytest.raises(ValueError, match='minimum <= maximum'):
+        AdaptivePageSize(minimum=10, maximum=5)
+
+
+def test_adaptive_page_size_grows():
+    page_size = AdaptivePageSize(100, maximum=300)
+    assert page_size.record(100, 0.01, 100) == 200
+    assert page_size.record(200, 0.01, 100) == 300
+    assert page_size.record(300, 0.01, 100) == 300
+    # an incomplete page is not taken into account
+    assert page_size.record(5, 10.0, 100) == 300
+
+
+def test_adaptive_page_size_shrinks():
+    page_size = AdaptivePageSize(1000, target_latency=1.0, target_bytes=1000)
+    assert page_size.record(1000, 1.5, 100) == 666
+    assert page_size.record(666, 0.8, 100) == 666
+    assert page_size.record(666, 0.1, 2000) == 333
+    assert page_size.record(333, None, 100) == 666
+
+
+def test_adaptive_page_size_limit_exceeded():
+    page_size = AdaptivePageSize(100, minimum=30)
+    assert page_size.limit_exceeded()
+    assert (page_size.size, page_size.maximum) == (50, 99)
+    assert page_size.limit_exceeded()
+    assert (page_size.size, page_size.maximum) == (30, 49)
+    assert not page_size.limit_exceeded()
+    # never grows beyond the server limit again
+    assert page_size.record(30, 0.01, 100) == 49
+
+
+def test_vlv_cursor_cache():
+    cursor = VLVCursor(filter_expr='(uid=*)', sorting=['uid'], page_size=10, cache_size=2)
+    assert cursor.last_page is None
+    cursor.cache(1, ['a'])
+    cursor.cache(2, ['b'])
+    assert cursor.get_cached(1) == ['a']
+    cursor.cache(3, ['c'])
+    assert cursor.get_cached(2) is None
+    assert cursor.get_cached(1) == ['a']
+
+    cursor.update(b'ctx', 25)
+    assert cursor.last_page == 3
+    assert cursor.get_cached(3) == ['c']
+    cursor.update(b'ctx2', 26)  # the result list changed
+    assert cursor.get_cached(3) is None
+    assert cursor.context_id == b'ctx2'
+
+    cursor.cache(1, ['a'])
+    cursor.invalidate()
+    assert cursor.get_cached(1) is None
+    assert cursor.content_count is None
+
+
+def test_type_ahead_cache():
+    def result(uid):
+        return Result(DN(f'uid={uid}'), Attributes({'uid': [uid.encode()]}), None, None)
+
+    type_ahead = TypeAhead('', 'uid', attrs=['cn'], size=3)
+    assert type_ahead.attrs == ['cn', 'uid']
+    assert type_ahead.get_cached('a') is None
+
+    type_ahead.cache('a', [result('Anna'), result('anton'), result('axel')], complete=False)
+    assert type_ahead.get_cached('an') is None  # incomplete results must be asked again
+
+    type_ahead.cache('b', [result('Bert'), result('bob')], complete=True)
+    assert [entry.dn for entry in type_ahead.get_cached('BO')] == [DN('uid=bob')]
+    assert type_ahead.get_cached('bx') == []
+    assert type_ahead.matches(result('Bob'), 'bO')
+    assert not type_ahead.matches(Result(DN('cn=x'), Attributes({}), None, None), 'x')
+
+
+def test_type_ahead_cache_expiry(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr('time.monotonic', lambda: now)
+    type_ahead = TypeAhead('', 'uid', cache_ttl=10)
+    results = [Result(DN('uid=bob'), Attributes({'uid': [b'bob']}), None, None)]
+    type_ahead.cache('b', results, complete=True)
+    now += 5
+    assert type_ahead.get_cached('bo') == results  # derived results expire with the results they are derived from
+    now += 5
+    assert type_ahead.get_cached('b') is None
+    assert type_ahead.get_cached('bo') is None
+
+    type_ahead.cache('b', results, complete=True)
+    type_ahead.clear()
+    assert type_ahead.get_cached('b') is None
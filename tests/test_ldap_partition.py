@@ -0,0 +1,20 @@
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.partition import Partition, range_filters, uuid_bounds
+
+
+def test_partition_narrow():
+    partition = Partition('dc=freeiam,dc=org', Scope.ONELEVEL, '(uid=*)').narrow('(uid>=m)')
+    assert partition == Partition('dc=freeiam,dc=org', Scope.ONELEVEL, '(&(uid=*)(uid>=m))')
+
+
+def test_range_filters():
+    assert range_filters('uid', ['m']) == ['(!(uid>=m))', '(uid>=m)']
+    assert range_filters('cn', ['a*', 'b']) == [r'(!(cn>=a\2a))', r'(&(cn>=a\2a)(!(cn>=b)))', '(cn>=b)']
+
+
+def test_uuid_bounds():
+    assert uuid_bounds(1) == []
+    assert uuid_bounds(2) == ['80000000-0000-0000-0000-000000000000']
+    bounds = uuid_bounds(16)
+    assert len(bounds) == 15
+    assert bounds == sorted(bounds)
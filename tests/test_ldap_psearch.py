@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from ldap.controls.psearch import EntryChangeNotificationControl, EntryChangeNotificationValue
+from pyasn1.codec.ber import encoder
+
+from freeiam import errors
+from freeiam.ldap._wrapper import _Response  # noqa: PLC2701
+from freeiam.ldap.constants import ResponseType
+from freeiam.ldap.dn import DN
+from freeiam.ldap.psearch import ChangeEvent, ChangeFeed, ChangeType, decode_changes
+
+
+BASE = 'dc=freeiam,dc=org'
+
+
+def entry_change(change_type, previous_dn=None, change_number=None):
+    value = EntryChangeNotificationValue()
+    value['changeType'] = change_type
+    if previous_dn:
+        value['previousDN'] = previous_dn
+    if change_number is not None:
+        value['changeNumber'] = change_number
+    ctrl = EntryChangeNotificationControl()
+    ctrl.decodeControlValue(encoder.encode(value))
+    return ctrl
+
+
+def test_decode_changes():
+    dn = f'cn=foo,{BASE}'
+    response = _Response(ResponseType.SearchEntry, [(dn, {'cn': [b'foo']}, [entry_change(8, f'cn=bar,{BASE}', 42)])], 1, [])
+    assert decode_changes(response) == [ChangeEvent(ChangeType.ModifyDN, DN(dn), {'cn': [b'foo']}, DN(f'cn=bar,{BASE}'), 42)]
+
+    response = _Response(ResponseType.SearchEntry, [(dn, {'cn': [b'foo']}, [entry_change(4)])], 1, [])
+    assert decode_changes(response)[0].type == ChangeType.Modify
+
+    response = _Response(ResponseType.SearchEntry, [(dn, {'cn': [b'foo']}, [])], 1, [])
+    assert decode_changes(response) == [ChangeEvent(ChangeType.Present, DN(dn), {'cn': [b'foo']})]
+    assert decode_changes(_Response(ResponseType.SearchResult, [], 1, [])) == []
+
+
+async def changes(count):
+    for i in range(count):
+        await asyncio.sleep(0)
+        yield ChangeEvent(ChangeType.Add, DN(f'cn={i},{BASE}'))
+
+
+@pytest.mark.asyncio
+async def test_change_feed_fan_out():
+    feed = ChangeFeed(changes(5), maxsize=10)
+    first = feed.subscribe()
+    second = feed.subscribe()
+    assert len(feed) == 2
+    assert (await anext(first)).dn == DN(f'cn=0,{BASE}')
+    assert (await anext(first)).dn == DN(f'cn=1,{BASE}')
+    assert len(second) == 2
+
+    # late subscribers only get the following events
+    async with feed.subscribe() as third:
+        assert (await anext(third)).dn == DN(f'cn=2,{BASE}')
+    assert len(feed) == 2
+
+    received = [event.dn async for event in second]
+    assert received == [DN(f'cn={i},{BASE}') for i in range(5)]
+    received = [event.dn async for event in first]
+    assert received == [DN(f'cn={i},{BASE}') for i in range(2, 5)]
+    assert feed.closed
+
+
+@pytest.mark.asyncio
+async def test_change_feed_cancelled_subscriber():
+    received = asyncio.Event()
+
+    async def slow_changes():
+        for i in range(3):
+            await received.wait()
+            received.clear()
+            yield ChangeEvent(ChangeType.Add, DN(f'cn={i},{BASE}'))
+
+    feed = ChangeFeed(slow_changes())
+    cancelled = feed.subscribe()
+    other = feed.subscribe()
+    with pytest.raises(TimeoutError):
+        async with asyncio.timeout(0.01):
+            await anext(cancelled)
+    assert not feed.closed
+
+    received.set()
+    assert (await anext(other)).dn == DN(f'cn=0,{BASE}')
+    assert (await anext(cancelled)).dn == DN(f'cn=0,{BASE}')
+    cancelled.close()
+    received.set()
+    assert (await anext(other)).dn == DN(f'cn=1,{BASE}')
+    await feed.aclose()
+    assert [event async for event in other] == []
+
+
+@pytest.mark.asyncio
+async def test_change_feed_overflow():
+    feed = ChangeFeed(changes(10), maxsize=3)
+    slow = feed.subscribe()
+    fast = feed.subscribe()
+    for _ in range(4):
+        await anext(fast)
+    assert slow.overflowed
+    assert len(feed) == 1
+    with pytest.raises(errors.SubscriberOverflow):
+        await anext(slow)
+    assert len([event async for event in fast]) == 6
+
+    with pytest.raises(ValueError, match='maxsize'):
+        ChangeFeed(changes(1), maxsize=0)
+
+
+@pytest.mark.asyncio
+async def test_change_feed_error():
+    async def failing():
+        yield ChangeEvent(ChangeType.Resync)
+        await asyncio.sleep(0)
+        raise errors.ServerDown({'result': -1, 'desc': "Can't contact LDAP server"})
+
+    feed = ChangeFeed(failing())
+    first = feed.subscribe()
+    second = feed.subscribe()
+    assert (await anext(first)).type == ChangeType.Resync
+    with pytest.raises(errors.ServerDown):
+        await anext(first)
+    assert (await anext(second)).type == ChangeType.Resync
+    with pytest.raises(errors.ServerDown):
+        await anext(second)
@@ -0,0 +1,117 @@
+import pytest
+
+from freeiam import errors
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.constants import Scope
+from freeiam.ldap.dn import DN
+from freeiam.ldap.replica import LocalReplica
+from freeiam.ldap.syncrepl import SyncEvent, SyncEventType
+
+
+BASE = 'dc=freeiam,dc=org'
+PEOPLE = DN(f'ou=people,{BASE}')
+MAX = DN(f'uid=max,{PEOPLE}')
+MORITZ = DN(f'uid=moritz,{PEOPLE}')
+ADMINS = DN(f'cn=admins,{BASE}')
+
+
+def dns(results):
+    return sorted(str(result.dn) for result in results)
+
+
+@pytest.fixture
+def replica():
+    replica = LocalReplica(BASE, indexes=['objectClass', 'uid', 'member'])
+    replica.put(PEOPLE, {'objectClass': [b'organizationalUnit'], 'ou': [b'people']}, 'uuid-people')
+    replica.put(MAX, {'objectClass': [b'person'], 'uid': [b'max'], 'cn': [b'Max']}, 'uuid-max')
+    replica.put(MORITZ, {'objectClass': [b'person'], 'uid': [b'moritz'], 'cn': [b'Moritz']}, 'uuid-moritz')
+    replica.put(ADMINS, {'objectClass': [b'groupOfNames'], 'cn': [b'admins'], 'member': [str(MAX).encode()]}, 'uuid-admins')
+    return replica
+
+
+def test_get(replica):
+    assert len(replica) == 4
+    assert MAX in replica
+    result = replica.get(str(MAX).upper())
+    assert result.dn == MAX
+    assert result.attr['CN'] == [b'Max']
+    assert replica.get(MAX, ['uid']).attr == {'uid': [b'max']}
+    with pytest.raises(errors.NoSuchObject) as exc:
+        replica.get(f'uid=unknown,{PEOPLE}')
+    assert exc.value.base_dn == DN(f'uid=unknown,{PEOPLE}')
+    assert exc.value.controls == []
+
+
+def test_search(replica):
+    assert dns(replica.search(filter_expr='(objectClass=person)')) == [str(MAX), str(MORITZ)]
+    assert dns(replica.search(filter_expr='(&(objectClass=PERSON)(uid=MAX))')) == [str(MAX)]
+    assert dns(replica.search(filter_expr='(|(uid=max)(cn=admins))')) == [str(ADMINS), str(MAX)]
+    assert dns(replica.search(filter_expr=f'(member={str(MAX).upper()})')) == [str(ADMINS)]
+    assert dns(replica.search(filter_expr='(cn=mo*)')) == [str(MORITZ)]
+    assert dns(replica.search(filter_expr='(!(objectClass=person))')) == [str(ADMINS), str(PEOPLE)]
+    assert dns(replica.search(PEOPLE, Scope.ONELEVEL)) == [str(MAX), str(MORITZ)]
+    assert dns(replica.search(PEOPLE, Scope.BASE)) == [str(PEOPLE)]
+    assert dns(replica.search(PEOPLE, Scope.BASE, '(uid=max)')) == []
+    assert len(replica.search()) == 4
+
+
+def test_indexes(replica):
+    replica.put(MAX, {'objectClass': [b'person'], 'uid': [b'maximilian']}, 'uuid-max')
+    assert dns(replica.search(filter_expr='(uid=max)')) == []
+    assert dns(replica.search(filter_expr='(uid=maximilian)')) == [str(MAX)]
+
+    # a rename replaces the old entry
+    renamed = DN(f'uid=maximilian,{PEOPLE}')
+    replica.put(renamed, {'objectClass': [b'person'], 'uid': [b'maximilian']}, 'uuid-max')
+    assert MAX not in replica
+    assert dns(replica.search(filter_expr='(uid=maximilian)')) == [str(renamed)]
+
+    replica.remove(renamed)
+    assert dns(replica.search(filter_expr='(objectClass=person)')) == [str(MORITZ)]
+    replica.clear()
+    assert not replica.search()
+
+
+def test_apply(replica):
+    replica.begin_refresh()
+    replica.apply(SyncEvent(SyncEventType.Present, 'uuid-people', PEOPLE))
+    replica.apply(SyncEvent(SyncEventType.Modify, 'uuid-max', MAX, Attributes({'objectClass': [b'person'], 'uid': [b'max'], 'cn': [b'Maximilian']})))
+    replica.apply(SyncEvent(SyncEventType.Present, 'uuid-admins'))
+    replica.apply(SyncEvent(SyncEventType.PresentDone))
+    assert dns(replica.search()) == [str(ADMINS), str(PEOPLE), str(MAX)]
+    assert replica.get(MAX).attr['cn'] == [b'Maximilian']
+
+    replica.apply(SyncEvent(SyncEventType.Delete, 'uuid-admins'))
+    replica.apply(SyncEvent(SyncEventType.Add, 'uuid-moritz', MORITZ, Attributes({'objectClass': [b'person'], 'uid': [b'moritz']})))
+    replica.apply(SyncEvent(SyncEventType.RefreshDone))
+    assert dns(replica.search()) == [str(PEOPLE), str(MAX), str(MORITZ)]
+    assert replica.synchronized is not None
+    replica.end_refresh()
+
+
+def test_staleness(replica):
+    replica.max_staleness = 60
+    assert replica.stale
+    with pytest.raises(errors.StaleReplica):
+        replica.get(MAX)
+    with pytest.raises(errors.StaleReplica):
+        replica.search()
+
+    replica.begin_refresh()
+    replica.apply(SyncEvent(SyncEventType.RefreshDone))
+    replica.end_refresh()
+    assert not replica.stale
+    assert replica.get(MAX).dn == MAX
+
+    replica.synchronized -= 61
+    assert replica.stale
+
+    # a persistent synchronization keeps the replica current
+    replica.begin_refresh(persist=True)
+    replica.apply(SyncEvent(SyncEventType.RefreshDone))
+    replica.synchronized -= 61
+    assert replica.persisting
+    assert not replica.stale
+    replica.end_refresh()
+    assert not replica.persisting
+    assert not replica.stale
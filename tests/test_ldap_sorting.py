@@ -0,0 +1,61 @@
+import pytest
+
+from freeiam.ldap._wrapper import Result  # noqa: PLC2701
+from freeiam.ldap.attr import Attributes
+from freeiam.ldap.dn import DN
+from freeiam.ldap.sorting import ExternalSort, SortedMerge, parse_sorting, result_key
+
+
+def entry(name, **attrs):
+    return Result(DN(f'cn={name}'), Attributes({'cn': [name.encode()], **{k: [v.encode() for v in vals] for k, vals in attrs.items()}}), None, None)
+
+
+def test_parse_sorting():
+    assert parse_sorting(['cn', '-sn', 'uid:caseExactOrderingMatch']) == [
+        ('cn', None, False),
+        ('sn', None, True),
+        ('uid', 'caseExactOrderingMatch', False),
+    ]
+
+
+def test_result_key():
+    entries = [entry('b'), entry('C'), entry('a', uidNumber=['10', '9']), entry('d', uidNumber=['2'])]
+    assert [str(e.dn) for e in sorted(entries, key=result_key(['cn']))] == ['cn=a', 'cn=b', 'cn=C', 'cn=d']
+    assert [str(e.dn) for e in sorted(entries, key=result_key(['cn:caseExactOrderingMatch']))] == ['cn=C', 'cn=a', 'cn=b', 'cn=d']
+    # missing values last, multi valued attributes by their lowest value
+    key = result_key([('uidNumber', 'integerOrderingMatch', False), 'cn'])
+    assert [str(e.dn) for e in sorted(entries, key=key)] == ['cn=d', 'cn=a', 'cn=b', 'cn=C']
+    # reverse order: missing values first, multi valued attributes by their highest value
+    key = result_key([('uidNumber', 'integerOrderingMatch', True), 'cn'])
+    assert [str(e.dn) for e in sorted(entries, key=key)] == ['cn=b', 'cn=C', 'cn=a', 'cn=d']
+
+
+def test_sorted_merge():
+    merge = SortedMerge(lambda x: x, range(3))
+    merge.push(0, 1)
+    merge.push(1, 2)
+    merge.push(0, 5)
+    assert merge.pop() == []
+    merge.finish(2)
+    assert merge.pop() == [1, 2]
+    merge.push(1, 3)
+    merge.push(1, 7)
+    assert merge.pop() == [3, 5]
+    merge.finish(0)
+    assert merge.pop() == [7]
+    merge.finish(1)
+    assert merge.pop() == []
+
+
+@pytest.mark.parametrize('run_size', [1, 3, 100])
+def test_external_sort(run_size):
+    names = ['m', 'B', 'x', 'a', 'k', 'Z', 'c']
+    with ExternalSort(['-cn'], run_size=run_size) as sorter:
+        for name in names:
+            sorter.add(entry(name))
+        assert len(sorter._runs) == len(names) // run_size
+        assert [str(e.dn) for e in sorter] == [f'cn={name}' for name in sorted(names, key=str.casefold, reverse=True)]
+    assert not sorter._runs
+
+    with pytest.raises(ValueError, match='positive'):
+        ExternalSort(['cn'], run_size=0)
@@ -0,0 +1,92 @@
+from uuid import UUID
+
+from ldap.syncrepl import SyncDoneControl, SyncDoneValue, SyncInfoMessage, SyncInfoValue, SyncStateControl, SyncStateValue
+from pyasn1.codec.ber import encoder
+
+from freeiam.ldap._wrapper import _Response  # noqa: PLC2701
+from freeiam.ldap.constants import ResponseType
+from freeiam.ldap.dn import DN
+from freeiam.ldap.syncrepl import CookieStore, FileCookieStore, SyncEvent, SyncEventType, decode_response
+
+
+UUID1 = str(UUID(int=1))
+UUID2 = str(UUID(int=2))
+
+
+def sync_state(state, uuid, cookie=None):
+    value = SyncStateValue()
+    value['state'] = state
+    value['entryUUID'] = UUID(uuid).bytes
+    if cookie:
+        value['cookie'] = cookie
+    ctrl = SyncStateControl()
+    ctrl.decodeControlValue(encoder.encode(value))
+    return ctrl
+
+
+def sync_info(choice, **components):
+    value = SyncInfoValue()
+    if choice == 'newcookie':
+        value[choice] = components['cookie']
+    else:
+        component = value.getComponentByName(choice)
+        for key, val in components.items():
+            if key == 'syncUUIDs':
+                component[key].extend(UUID(uuid).bytes for uuid in val)
+            else:
+                component[key] = val
+    return _Response(ResponseType.Intermediate, [(SyncInfoMessage.responseName, encoder.encode(value), [])], 1, [])
+
+
+def sync_done(cookie=None, refresh_deletes=False):
+    value = SyncDoneValue()
+    if cookie:
+        value['cookie'] = cookie
+    value['refreshDeletes'] = refresh_deletes
+    ctrl = SyncDoneControl()
+    ctrl.decodeControlValue(encoder.encode(value))
+    return _Response(ResponseType.SearchResult, [], 1, [ctrl])
+
+
+def test_decode_entries():
+    response = _Response(
+        ResponseType.SearchEntry,
+        [('cn=foo,dc=freeiam,dc=org', {'cn': [b'foo']}, [sync_state('add', UUID1, 'cookie1')])],
+        1,
+        [],
+    )
+    events, cookie = decode_response(response)
+    assert cookie == 'cookie1'
+    assert events == [SyncEvent(SyncEventType.Add, UUID1, DN('cn=foo,dc=freeiam,dc=org'), events[0].attr)]
+    assert events[0].attr['CN'] == [b'foo']
+
+    response = _Response(ResponseType.SearchEntry, [('cn=foo,dc=freeiam,dc=org', {}, [sync_state('delete', UUID1)])], 1, [])
+    assert decode_response(response) == ([SyncEvent(SyncEventType.Delete, UUID1, DN('cn=foo,dc=freeiam,dc=org'))], None)
+
+
+def test_decode_info():
+    assert decode_response(sync_info('newcookie', cookie='cookie2')) == ([], 'cookie2')
+    assert decode_response(sync_info('refreshPresent', refreshDone=False)) == ([SyncEvent(SyncEventType.PresentDone)], None)
+    assert decode_response(sync_info('refreshDelete', cookie='cookie3')) == ([SyncEvent(SyncEventType.RefreshDone)], 'cookie3')
+    events, cookie = decode_response(sync_info('syncIdSet', refreshDeletes=True, syncUUIDs=[UUID1, UUID2], cookie='cookie4'))
+    assert cookie == 'cookie4'
+    assert sorted(events, key=lambda event: event.uuid) == [SyncEvent(SyncEventType.Delete, UUID1), SyncEvent(SyncEventType.Delete, UUID2)]
+    events, _cookie = decode_response(sync_info('syncIdSet', syncUUIDs=[UUID1]))
+    assert events == [SyncEvent(SyncEventType.Present, UUID1)]
+
+
+def test_decode_done():
+    assert decode_response(sync_done('cookie5')) == ([SyncEvent(SyncEventType.PresentDone), SyncEvent(SyncEventType.RefreshDone)], 'cookie5')
+    assert decode_response(sync_done(refresh_deletes=True)) == ([SyncEvent(SyncEventType.RefreshDone)], None)
+
+
+def test_file_cookie_store(tmp_path):
+    path = tmp_path / 'cookie'
+    store = FileCookieStore(path)
+    assert store.get() is None
+    store.set('rid=001,csn=20250101000000.000000Z#000000#000#000000')
+    assert FileCookieStore(path).get() == 'rid=001,csn=20250101000000.000000Z#000000#000#000000'
+    store.set(None)
+    assert not path.exists()
+    assert FileCookieStore(path).get() is None
+    assert CookieStore('cookie').get() == 'cookie'